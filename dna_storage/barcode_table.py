@@ -0,0 +1,94 @@
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+
+from dna_storage import utils
+
+#################################################################
+# @ Class: EncodedBarcodeTable
+# @ Description: The RS symbols of every barcode, keyed by barcode index.
+#                Built lazily, CHUNK_LEN barcodes at a time. With a
+#                cache_file the table is a memory-mapped file (plus a
+#                '.built' file marking the chunks already computed), so
+#                it is shared by all the runs and worker processes using
+#                the same RS parameters.
+#################################################################
+
+CHUNK_LEN = 4096
+
+
+class EncodedBarcodeTable:
+    def __init__(self, barcode_len: int, barcode_rs_len: int, encode_barcode: Callable[[str], str],
+                 cache_file: Optional[Union[Path, str]] = None):
+        self.barcode_len = barcode_len
+        self.barcode_rs_len = barcode_rs_len
+        self.encode_barcode = encode_barcode
+        self.cache_file = cache_file
+        self.number_of_barcodes = 4 ** barcode_len
+        self.number_of_chunks = -(-self.number_of_barcodes // CHUNK_LEN)
+        self._chunks: Dict[int, np.ndarray] = {}
+        self._rs = None
+        self._built = None
+        if cache_file is not None:
+            self._rs = self._open_memmap(cache_file, shape=(self.number_of_barcodes, barcode_rs_len))
+            self._built = self._open_memmap(f'{cache_file}.built', shape=(self.number_of_chunks,))
+
+    @staticmethod
+    def _open_memmap(file: Union[Path, str], shape) -> np.memmap:
+        """ Grows (never truncates) the file to the table size, so concurrent openers don't clobber each other."""
+        Path(file).parent.mkdir(parents=True, exist_ok=True)
+        size = int(np.prod(shape))
+        with open(file, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+        return np.memmap(file, dtype=np.uint8, mode='r+', shape=shape)
+
+    def _build_chunk(self, chunk: int) -> np.ndarray:
+        start = chunk * CHUNK_LEN
+        stop = min(start + CHUNK_LEN, self.number_of_barcodes)
+        barcodes = utils.index_range_to_dna_sequences(start, stop, sequence_len=self.barcode_len)
+        rs = ''.join(self.encode_barcode(barcode)[self.barcode_len:] for barcode in barcodes)
+        return np.frombuffer(rs.encode('ascii'), dtype=np.uint8).reshape(stop - start, self.barcode_rs_len)
+
+    def _chunk_rs(self, chunk: int) -> np.ndarray:
+        if self._rs is None:
+            if chunk not in self._chunks:
+                self._chunks[chunk] = self._build_chunk(chunk)
+            return self._chunks[chunk]
+        start = chunk * CHUNK_LEN
+        rs = self._rs[start:start + CHUNK_LEN]
+        if not self._built[chunk]:
+            rs[:] = self._build_chunk(chunk)
+            self._built[chunk] = 1
+        return rs
+
+    def rs_range(self, start: int, stop: int) -> np.ndarray:
+        """ The RS letters of the barcodes start..stop-1 as a (stop - start, barcode_rs_len) ASCII array."""
+        if not 0 <= start <= stop <= self.number_of_barcodes:
+            raise ValueError(f'Range {start}..{stop} is out of range for barcodes of length {self.barcode_len}')
+        if start == stop:
+            return np.zeros((0, self.barcode_rs_len), dtype=np.uint8)
+        first_chunk, last_chunk = start // CHUNK_LEN, (stop - 1) // CHUNK_LEN
+        rs = np.concatenate([self._chunk_rs(chunk) for chunk in range(first_chunk, last_chunk + 1)])
+        offset = first_chunk * CHUNK_LEN
+        return rs[start - offset:stop - offset]
+
+    def encoded_range(self, start: int, stop: int) -> np.ndarray:
+        """ The encoded barcodes (barcode + RS letters) start..stop-1 as an ASCII array."""
+        digits = utils.index_range_to_digits(start, stop, sequence_len=self.barcode_len)
+        letters = np.frombuffer(''.join(utils.DNA_SYMBOLS).encode('ascii'), dtype=np.uint8)[digits]
+        return np.hstack((letters, self.rs_range(start, stop)))
+
+    def __getstate__(self):
+        # the memory maps are reopened by the receiving process instead of being pickled
+        state = self.__dict__.copy()
+        state['_rs'] = state['_built'] = None
+        state['_chunks'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.cache_file is not None:
+            self._rs = self._open_memmap(self.cache_file, shape=(self.number_of_barcodes, self.barcode_rs_len))
+            self._built = self._open_memmap(f'{self.cache_file}.built', shape=(self.number_of_chunks,))
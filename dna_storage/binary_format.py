@@ -0,0 +1,171 @@
+import struct
+from typing import Iterator, Optional
+
+import numpy as np
+
+from dna_storage.config import PathLike
+
+#################################################################
+# Packed binary intermediate format ("simulation_data.1.binary.dna")
+#
+# header:  magic, version, record_bits, number_of_records,
+#          number_of_padding_rows, z_fill
+# records: number_of_records fixed-width rows of record_bits bits,
+#          every row packed (np.packbits) into ceil(record_bits / 8) bytes
+#
+# The z_fill trailer row is kept as the last record, since it is encoded
+# into the pool like any other oligo, and is repeated in the header so the
+# padding can be read without scanning the file.
+#################################################################
+
+PACKED_MAGIC = b'DNAB'
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct('<4sB3xIQII')
+
+BINARY_FORMATS = ('packed', 'text')
+
+
+def record_bytes_len(record_bits: int) -> int:
+    return (record_bits + 7) // 8
+
+
+def is_packed_binary_file(file: PathLike) -> bool:
+    with open(file, 'rb') as f:
+        return f.read(len(PACKED_MAGIC)) == PACKED_MAGIC
+
+
+def z_fill_trailer_bits(n_zeros: int, record_bits: int) -> np.ndarray:
+    """ The trailer row: the total number of padded zeros, big endian, record_bits wide."""
+    shifts = np.arange(record_bits - 1, -1, -1, dtype=np.uint64)
+    return ((np.uint64(n_zeros) >> shifts) & np.uint64(1)).astype(np.uint8)
+
+
+class PackedBinaryWriter:
+    def __init__(self, output_file: PathLike, record_bits: int):
+        self.output_file = output_file
+        self.record_bits = record_bits
+        self.number_of_records = 0
+        self._file = open(self.output_file, 'wb')
+        self._write_header(number_of_padding_rows=0, z_fill=0)
+
+    def _write_header(self, number_of_padding_rows: int, z_fill: int) -> None:
+        self._file.write(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, self.record_bits,
+                                            self.number_of_records, number_of_padding_rows, z_fill))
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        rows = np.asarray(rows, dtype=np.uint8).reshape(-1, self.record_bits)
+        self.write_packed_rows(np.packbits(rows, axis=1))
+
+    def write_packed_rows(self, packed_rows: np.ndarray) -> None:
+        self._file.write(np.ascontiguousarray(packed_rows, dtype=np.uint8).tobytes())
+        self.number_of_records += packed_rows.shape[0]
+
+    def close(self, number_of_padding_rows: int = 0, z_fill: int = 0) -> None:
+        self._file.seek(0)
+        self._write_header(number_of_padding_rows=number_of_padding_rows, z_fill=z_fill)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self._file.closed:
+            self._file.close()
+
+
+class TextBinaryWriter:
+    """ The legacy '0'/'1' text form, one row per line. Kept for debugging."""
+    def __init__(self, output_file: PathLike, record_bits: int):
+        self.output_file = output_file
+        self.record_bits = record_bits
+        self.number_of_records = 0
+        self._file = open(self.output_file, 'w', encoding='utf-8')
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        rows = np.asarray(rows, dtype=np.uint8).reshape(-1, self.record_bits)
+        if rows.shape[0] == 0:
+            return
+        lines = np.full((rows.shape[0], self.record_bits + 1), ord('\n'), dtype=np.uint8)
+        lines[:, :self.record_bits] = rows + ord('0')
+        self._file.write(lines.tobytes().decode('ascii'))
+        self.number_of_records += rows.shape[0]
+
+    def write_packed_rows(self, packed_rows: np.ndarray) -> None:
+        self.write_rows(np.unpackbits(packed_rows, axis=1, count=self.record_bits))
+
+    def close(self, number_of_padding_rows: int = 0, z_fill: int = 0) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if not self._file.closed:
+            self._file.close()
+
+
+def open_binary_writer(output_file: PathLike, record_bits: int, binary_format: str = 'packed'):
+    if binary_format == 'packed':
+        return PackedBinaryWriter(output_file=output_file, record_bits=record_bits)
+    elif binary_format == 'text':
+        return TextBinaryWriter(output_file=output_file, record_bits=record_bits)
+    raise ValueError(f'Unknown binary format {binary_format}, expected one of {BINARY_FORMATS}')
+
+
+class BinaryFileReader:
+    """ Reads both the packed and the text form, yielding rows as (n, record_bits) uint8 bit arrays."""
+    def __init__(self, input_file: PathLike, record_bits: Optional[int] = None):
+        self.input_file = input_file
+        self.is_packed = is_packed_binary_file(input_file)
+        self.number_of_padding_rows = None
+        self.z_fill = None
+        self.number_of_records = None
+        self.record_bits = record_bits
+        if self.is_packed:
+            with open(self.input_file, 'rb') as f:
+                (_, version, record_bits_in_file, self.number_of_records,
+                 self.number_of_padding_rows, self.z_fill) = PACKED_HEADER.unpack(f.read(PACKED_HEADER.size))
+            if version != PACKED_VERSION:
+                raise ValueError(f'Unsupported packed binary version {version} in {input_file}')
+            if record_bits is not None and record_bits != record_bits_in_file:
+                raise ValueError(f'{input_file} has records of {record_bits_in_file} bits, expected {record_bits}')
+            self.record_bits = record_bits_in_file
+        elif self.record_bits is None:
+            raise ValueError(f'record_bits must be given for the text binary file {input_file}')
+
+    def iter_rows(self, rows_per_chunk: int = 4096, first_row: int = 0) -> Iterator[np.ndarray]:
+        """ first_row skips the rows before it with a seek, both forms have fixed size rows."""
+        if self.is_packed:
+            yield from self._iter_packed_rows(rows_per_chunk=rows_per_chunk, first_row=first_row)
+        else:
+            yield from self._iter_text_rows(rows_per_chunk=rows_per_chunk, first_row=first_row)
+
+    def _iter_packed_rows(self, rows_per_chunk: int, first_row: int) -> Iterator[np.ndarray]:
+        row_bytes = record_bytes_len(self.record_bits)
+        with open(self.input_file, 'rb') as f:
+            f.seek(PACKED_HEADER.size + first_row * row_bytes)
+            rows_left = self.number_of_records - first_row
+            while rows_left > 0:
+                n_rows = min(rows_per_chunk, rows_left)
+                buffer = np.frombuffer(f.read(n_rows * row_bytes), dtype=np.uint8)
+                if buffer.size != n_rows * row_bytes:
+                    raise ValueError(f'{self.input_file} is truncated')
+                yield np.unpackbits(buffer.reshape(n_rows, row_bytes), axis=1, count=self.record_bits)
+                rows_left -= n_rows
+
+    def _iter_text_rows(self, rows_per_chunk: int, first_row: int) -> Iterator[np.ndarray]:
+        # binary mode, a row is record_bits ASCII digits and a newline, so the seek offset is a byte offset
+        with open(self.input_file, 'rb') as f:
+            f.seek(first_row * (self.record_bits + 1))
+            lines = []
+            for line in f:
+                lines.append(line.rstrip(b'\n'))
+                if len(lines) == rows_per_chunk:
+                    yield self._text_lines_to_rows(lines)
+                    lines = []
+            if lines:
+                yield self._text_lines_to_rows(lines)
+
+    def _text_lines_to_rows(self, lines) -> np.ndarray:
+        buffer = np.frombuffer(b''.join(lines), dtype=np.uint8) - ord('0')
+        return buffer.reshape(len(lines), self.record_bits)
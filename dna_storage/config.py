@@ -4,7 +4,7 @@ from typing import Union
 
 from dna_storage.rs_adapter import RSBarcodeAdapter, RSPayloadAdapter, RSWideAdapter
 from dna_storage.vt_syndrome import VTSyndrome
-from dna_storage.vt_syndrome_utils import VTSyndromeUtils as vtsu
+from dna_storage.vt_syndrome_utils import VTSyndromeUtils as vtsu, max_bits_per_syndrome
 
 PathLike = Union[str, pathlib.Path]
 
@@ -51,18 +51,20 @@ def build_config(
                          'TTC': 'X7',
                          'TGG': 'X8'}
 
-    # TODO: make sure to delete this hard coded subset_size=4 and bits_per_z=6, vt_syndrome_n = 8
-    #     vt_syndrome_k = 4
-    #     bits_per_syndrome = 3, and that the code will still run
-    subset_size = 4
-    bits_per_z = 6
-    vt_syndrome_n = 8
-    vt_syndrome_k = 4
-    bits_per_syndrome = 3
-
-
     shrink_dict_size = len(shrink_dict_3_mer)
 
+    # the VT codewords are subset_size of the shrink_dict_size k-mers, a Z symbol is a syndrome and the index of a
+    # codeword of that syndrome, bits_per_syndrome bits each
+    vt_syndrome_n = shrink_dict_size
+    vt_syndrome_k = subset_size
+    bits_per_syndrome = max_bits_per_syndrome(n=vt_syndrome_n, k=vt_syndrome_k)
+    if bits_per_z != 2 * bits_per_syndrome:
+        raise ValueError(f'subsets of {subset_size} of the {shrink_dict_size} k-mers carry '
+                         f'{2 * bits_per_syndrome} bits per Z, not bits_per_z={bits_per_z}')
+    # the VT tables are cached on disk, keyed by (n, k, bits_per_syndrome)
+    vt_table_cache_dir = None
+    # vt_table_cache_dir = pathlib.Path(r"data/cache")
+
     # k_mer_representative = itertools.combinations(['X' + str(i) for i in range(1, shrink_dict_size + 1)], subset_size)
     # x_combinations = [set(k) for k in k_mer_representative]
     # all_binary_combinations = itertools.product([0, 1], repeat=bits_per_z)
@@ -78,7 +80,8 @@ def build_config(
     # k_mer_representative_to_z = dict(zip(k_mer_representative, z))
     # z_to_k_mer_representative = dict(zip(z, k_mer_representative))
 
-    vtsu_instance = vtsu(n=vt_syndrome_n, k=vt_syndrome_k, bits_per_syndrome=bits_per_syndrome)
+    vtsu_instance = vtsu(n=vt_syndrome_n, k=vt_syndrome_k, bits_per_syndrome=bits_per_syndrome,
+                         cache_dir=vt_table_cache_dir)
     (z_to_k_mer_representative, k_mer_representative_to_z, z_to_binary, binary_to_z, binary_to_k_mer_representation,
      k_mer_representation_to_kmer_vector_representation, kmer_vector_representation_to_mer_representation) = (
         vtsu_instance.generate_z_list_from_table())
@@ -96,8 +99,36 @@ def build_config(
         'file_name_sorted': output_dir / 'small_data_3_barcode_9_oligo.dna',
         'input_text_file': input_text_file,
         'binary_file_name': output_dir / 'simulation_data.1.binary.dna',
+        'input_file_mode': 'text',
+        # 'input_file_mode': 'bytes',
+        'binary_file_format': 'packed',
+        # 'binary_file_format': 'text',
+        'text_to_binary_number_of_processes': 1,
+        'encoder_number_of_processes': 1,
+        'synthesis_number_of_processes': 1,
+        'pool_count_compressed': False,
+        # 'pool_count_compressed': True,  # a line per distinct read with its copy count, sampled without a shuffle
+        'encoder_stream_to_synthesizer': False,
+        # 'encoder_stream_to_synthesizer': True,
+        'encoder_write_files': True,
+        'encoder_checkpoint_interval_blocks': 0,
+        # 'encoder_checkpoint_interval_blocks': 1000,
+        'encoder_resume': False,
+        'encoder_append': False,
+        'encoder_block_index_offset': None,  # None: after the blocks of the pool manifest when appending
+        'decode_pool_segment': None,
+        # 'decode_pool_segment': 0,
+        'barcode_rs_cache_dir': None,
+        # 'barcode_rs_cache_dir': pathlib.Path(r"data/cache"),
+        'barcode_decode_cache_size': 2 ** 16,
+        # 'barcode_decode_cache_size': None,  # unbounded
+        'vt_table_cache_dir': vt_table_cache_dir,
+        'rs_backend': 'numpy',
+        # 'rs_backend': 'unireedsolomon',  # legacy, single-threaded
         'encoder_results_file_without_rs_wide': output_dir / 'simulation_data.2.encoder_results_file_without_rs_wide.dna',
         'encoder_results_file': output_dir / 'simulation_data.3.encoder_results_file.dna',
+        'encoder_results_file_compressed': None,
+        # 'encoder_results_file_compressed': output_dir / 'simulation_data.3.encoder_results_file.dna.gz',
         'synthesis_results_file': output_dir / 'simulation_data.4.synthesis_results_file.dna',
         'shuffle_db_file': output_dir / 'temp_shuffle_db',
         'shuffle_results_file': output_dir / 'simulation_data.5.shuffle_results_file.dna',
@@ -141,7 +172,8 @@ def build_config(
                       'letter_substitution_error_ratio': letter_substitution_error_ratio,
                       'letter_deletion_error_ratio': letter_deletion_error_ratio,
                       'letter_insertion_error_ratio': letter_insertion_error_ratio,
-                      'seed': 0
+                      'seed': 0,  # the same draws every run
+                      # 'seed': None,  # a fresh seed every run, written to the .seed file of the results
                       }
 
     }
@@ -160,9 +192,9 @@ def build_config(
         config['oligos_per_block_len'] = wide_n_k[subset_size]['block_len']
         config['oligos_per_block_rs_len'] = wide_n_k[subset_size]['block_rs_len']
         config['number_of_sampled_oligos_from_file'] = number_of_sampled_oligos_from_file * (wide_n_k[subset_size]['block_len'] + (wide_n_k[subset_size]['block_rs_len']))
-        config['vt_syndrome_n'] = 8
-        config['vt_syndrome_k'] = subset_size
-        config['bits_per_syndrome'] = 3
+        config['vt_syndrome_n'] = vt_syndrome_n
+        config['vt_syndrome_k'] = vt_syndrome_k
+        config['bits_per_syndrome'] = bits_per_syndrome
     elif config['mode'] == 'test':
         config['barcode_len'] = 12  # in ACGT
         config['barcode_rs_len'] = 4  # in ACGT
@@ -176,7 +208,10 @@ def build_config(
     config['payload_total_len'] = config['payload_len'] + config['payload_rs_len'] - config['payload_redundancy_len']  # in Z
 
     config['barcode_coder'] = RSBarcodeAdapter(bits_per_z=bits_per_z, barcode_len=config['barcode_len'],
-                                               barcode_rs_len=config['barcode_rs_len'])
+                                               barcode_rs_len=config['barcode_rs_len'],
+                                               cache_dir=config['barcode_rs_cache_dir'],
+                                               backend=config['rs_backend'],
+                                               decode_cache_size=config['barcode_decode_cache_size'])
     config['payload_coder_rs'] = RSPayloadAdapter(bits_per_z=bits_per_z, payload_len=config['payload_len'],
                                                payload_rs_len=config['payload_rs_len'],
                                                payload_redundancy_len=config['payload_redundancy_len'],
@@ -186,14 +221,17 @@ def build_config(
                                                binary_to_z=config['algorithm_config']['binary_to_z'],
                                                z_to_k_mer_representative=config['algorithm_config']['z_to_k_mer_representative'],
                                                binary_to_k_mer_representation=config['algorithm_config']['binary_to_k_mer_representation'],
-                                               bits_per_syndrome=config['bits_per_syndrome'])
+                                               bits_per_syndrome=config['bits_per_syndrome'],
+                                               backend=config['rs_backend'])
     config['wide_coder'] = RSWideAdapter(bits_per_z=bits_per_z, payload_len=config['oligos_per_block_len'],
-                                         payload_rs_len=config['oligos_per_block_rs_len'])
+                                         payload_rs_len=config['oligos_per_block_rs_len'],
+                                         backend=config['rs_backend'])
     config['payload_coder_vt_syndrome'] = VTSyndrome(n=config['vt_syndrome_n'], k=config['vt_syndrome_k'],
                                                      bits_per_syndrome=config['bits_per_syndrome'],
                                                      payload_len=config['payload_len'],
                                                      payload_redundancy_len=config['payload_redundancy_len'],
-                                                     binary_to_k_mer_representation=config['algorithm_config']['binary_to_k_mer_representation'])
+                                                     binary_to_k_mer_representation=config['algorithm_config']['binary_to_k_mer_representation'],
+                                                     cache_dir=config['vt_table_cache_dir'])
 
     # vt_syndrome_coder = VTSyndrome(n=8, k=4, bits_per_syndrome=3)
 
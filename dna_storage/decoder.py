@@ -1,14 +1,18 @@
 import itertools
 from collections import Counter
-import re
-from typing import Union, Dict, List, Tuple, Any
+from typing import Union, Dict, List, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
+
 from dna_storage.vt_syndrome import VTSyndrome
 from unireedsolomon.unireedsolomon import RSCodecError
 
+from dna_storage.oligo_pool import parse_pool_line
 from dna_storage.rs_adapter import RSBarcodeAdapter, RSPayloadAdapter, RSWideAdapter
 from dna_storage import utils
+from dna_storage.symbols import (Z_ERASURE, X_ERASURE, X_DUMMY, x_from_name, x_tuple_from_names, z_from_name,
+                                 x_tuple_keys_to_int, x_tuple_values_to_int, z_keys_to_int, oligo_to_line)
 from dna_storage.utils import chunker
 
 
@@ -44,6 +48,7 @@ class Decoder:
                  results_file_z_after_rs_wide: Union[Path, str],
                  results_file_z_before_rs_payload: Union[Path, str],
                  results_file_z_after_rs_payload: Union[Path, str],
+                 first_barcode_index: int = 0,
                  ):
         self.input_file = input_file
         self.barcode_len = barcode_len
@@ -51,14 +56,17 @@ class Decoder:
         self.payload_len = payload_len
         self.payload_total_len = payload_total_len
         self.payload_rs_len = payload_rs_len
-        self.shrink_dict = shrink_dict
+        self.shrink_dict = {k_letters: x_from_name(x) for k_letters, x in shrink_dict.items()}
         self.min_number_of_oligos_per_barcode = min_number_of_oligos_per_barcode
         self.k_mer = k_mer
-        self.k_mer_representative_to_z = k_mer_representative_to_z
-        self.z_to_binary = z_to_binary
-        self.z_to_k_mer_representative = z_to_k_mer_representative
-        self.k_mer_representation_to_kmer_vector_representation = k_mer_representation_to_kmer_vector_representation
-        self.kmer_vector_representation_to_mer_representation = kmer_vector_representation_to_mer_representation
+        self.k_mer_representative_to_z = {x_tuple_from_names(x_tuple): z_from_name(z)
+                                          for x_tuple, z in k_mer_representative_to_z.items()}
+        self.z_to_binary = z_keys_to_int(z_to_binary)
+        self.z_to_k_mer_representative = x_tuple_values_to_int(z_keys_to_int(z_to_k_mer_representative))
+        self.k_mer_representation_to_kmer_vector_representation = x_tuple_keys_to_int(
+            k_mer_representation_to_kmer_vector_representation)
+        self.kmer_vector_representation_to_mer_representation = x_tuple_values_to_int(
+            kmer_vector_representation_to_mer_representation)
         self.subset_size = subset_size
         self.oligos_per_block_len = oligos_per_block_len
         self.oligos_per_block_rs_len = oligos_per_block_rs_len
@@ -71,36 +79,52 @@ class Decoder:
         open(self.results_file_z_before_rs_payload, 'w').close()
         open(self.results_file_z_after_rs_payload, 'w').close()
         open(self.results_file_z_after_rs_wide, 'w').close()
-        self.barcode_generator = utils.dna_sequence_generator(sequence_len=self.barcode_len)
+        self.expected_barcode_index = first_barcode_index
         self.barcode_coder = barcode_coder
         self.payload_coder_rs = payload_coder_rs
         self.wide_coder = wide_coder
         self.payload_coder_vt_syndrome = payload_coder_vt_syndrome
         self.payload_total_len_nuc = (payload_total_len * k_mer)
 
+        # the VT codeword bitmasks (bit i set for X{i+1}), sorted, and their Z: any other bitmask is no codeword
+        codeword_bitmask_to_z = {utils.bits_to_int(codeword_vector[::-1]): self.k_mer_representative_to_z.get(
+            k_mer_rep, Z_ERASURE) for codeword_vector, k_mer_rep in
+            self.kmer_vector_representation_to_mer_representation.items()}
+        self._codeword_bitmasks = np.array(sorted(codeword_bitmask_to_z), dtype=np.int64)
+        self._codeword_bitmask_zs = np.array([codeword_bitmask_to_z[bitmask] for bitmask in
+                                              self._codeword_bitmasks.tolist()], dtype=np.int64)
+        # for a small n, the Z of every (codeword bitmask, RS syndrome mod n) pair after VT decoding, dense over all the
+        # possible inputs; None otherwise and vt_decode_to_z() searches the decoded bitmasks in the sorted ones
+        self._vt_decode_to_z = None
+        if payload_coder_vt_syndrome.decode_table is not None:
+            bitmask_to_z = np.full(2 ** payload_coder_vt_syndrome.n, Z_ERASURE, dtype=np.int64)
+            bitmask_to_z[self._codeword_bitmasks] = self._codeword_bitmask_zs
+            self._vt_decode_to_z = bitmask_to_z[payload_coder_vt_syndrome.decode_table]
+
     def run(self):
         barcode_prev = ''
         payload_accumulation = []
-        dummy_payload = ['Z0' for _ in range(self.payload_total_len - self.payload_rs_len)]
+        payload_counts = []
+        dummy_payload = [Z_ERASURE for _ in range(self.payload_total_len - self.payload_rs_len)]
         total_oligos_per_block_with_rs_oligos = self.oligos_per_block_len + self.oligos_per_block_rs_len
         with open(self.input_file, 'r', encoding='utf-8') as file:
             unique_payload_block_with_rs = []
             unique_barcode_block_with_rs = []
             unique_payload_block_rs = []
             for idx, line in enumerate(file):
-                barcode_and_payload = line.split(sep=' ')[0].rstrip()
+                barcode_and_payload, count = parse_pool_line(line)
                 barcode = barcode_and_payload[:self.barcode_len]
                 payload = barcode_and_payload[self.barcode_len:]
 
                 if barcode != barcode_prev:
-                    next_barcode_should_be = "".join(next(self.barcode_generator))
+                    next_barcode_should_be = self.next_expected_barcode()
                     if next_barcode_should_be != barcode:
                         unique_payload_block_with_rs.append(dummy_payload)
                         unique_barcode_block_with_rs.append(next_barcode_should_be)
                         # unique_payload_block_rs.append(dummy_payload)
-                    if len(payload_accumulation) > self.min_number_of_oligos_per_barcode:
+                    if sum(payload_counts) > self.min_number_of_oligos_per_barcode:
                         unique_payload, payload_k_mer_rep = self.dna_to_unique_payload(
-                            payload_accumulation=payload_accumulation)
+                            payload_accumulation=payload_accumulation, payload_counts=payload_counts)
                         self.save_z_before_rs(barcode=barcode_prev, payload=unique_payload)
                         unique_payload_corrected, payload_rs = self.error_correction_payload(payload=unique_payload,
                                                                                              payload_k_mer_rep=payload_k_mer_rep)
@@ -126,13 +150,15 @@ class Decoder:
                                                            total_oligos_per_block_with_rs_oligos:]
                             unique_payload_block_rs = unique_payload_block_rs[total_oligos_per_block_with_rs_oligos:]
                     payload_accumulation = [payload]
+                    payload_counts = [count]
                     barcode_prev = barcode
                 else:
                     payload_accumulation.append(payload)
+                    payload_counts.append(count)
 
-            if len(payload_accumulation) > self.min_number_of_oligos_per_barcode:
+            if sum(payload_counts) > self.min_number_of_oligos_per_barcode:
                 unique_payload, payload_k_mer_rep = self.dna_to_unique_payload(
-                    payload_accumulation=payload_accumulation)
+                    payload_accumulation=payload_accumulation, payload_counts=payload_counts)
                 self.save_z_before_rs(barcode=barcode_prev, payload=unique_payload)
                 unique_payload_corrected, payload_rs = self.error_correction_payload(payload=unique_payload,
                                                                                      payload_k_mer_rep=payload_k_mer_rep)
@@ -147,7 +173,7 @@ class Decoder:
                 unique_barcode_block_with_rs.append(barcode_prev)
                 while len(unique_payload_block_with_rs) < total_oligos_per_block_with_rs_oligos:
                     unique_payload_block_with_rs.append(dummy_payload)
-                    next_barcode_should_be = "".join(next(self.barcode_generator))
+                    next_barcode_should_be = self.next_expected_barcode()
                     unique_barcode_block_with_rs.append(next_barcode_should_be)
                 self.save_block_to_binary(
                     unique_barcode_block_with_rs[:total_oligos_per_block_with_rs_oligos],
@@ -158,8 +184,9 @@ class Decoder:
     def run_new_decoding(self):
         barcode_prev = ''
         payload_accumulation = []
-        dummy_payload = ['Z0' for _ in range(self.payload_total_len - self.payload_rs_len)]
-        dummy_payload_with_rs = ['Z0' for _ in range(self.payload_total_len)]
+        payload_counts = []
+        dummy_payload = [Z_ERASURE for _ in range(self.payload_total_len - self.payload_rs_len)]
+        dummy_payload_with_rs = [Z_ERASURE for _ in range(self.payload_total_len)]
         total_oligos_per_block_with_rs_oligos = self.oligos_per_block_len + self.oligos_per_block_rs_len
         with open(self.input_file, 'r', encoding='utf-8') as file:
             unique_payload_block_with_rs = []
@@ -168,20 +195,20 @@ class Decoder:
             unique_payload_block_rs = []
             payload_k_mer_rep_block = []
             for idx, line in enumerate(file):
-                barcode_and_payload = line.split(sep=' ')[0].rstrip()
+                barcode_and_payload, count = parse_pool_line(line)
                 barcode = barcode_and_payload[:self.barcode_len]
                 payload = barcode_and_payload[self.barcode_len:]
 
                 if barcode != barcode_prev:
-                    next_barcode_should_be = "".join(next(self.barcode_generator))
+                    next_barcode_should_be = self.next_expected_barcode()
                     if next_barcode_should_be != barcode:
                         unique_payload_block.append(dummy_payload)
                         unique_payload_block_with_rs.append(dummy_payload_with_rs)
                         unique_barcode_block_with_rs.append(next_barcode_should_be)
                         # unique_payload_block_rs.append(dummy_payload)
-                    if len(payload_accumulation) > self.min_number_of_oligos_per_barcode:
+                    if sum(payload_counts) > self.min_number_of_oligos_per_barcode:
                         unique_payload, payload_k_mer_rep = self.dna_to_unique_payload(
-                            payload_accumulation=payload_accumulation)
+                            payload_accumulation=payload_accumulation, payload_counts=payload_counts)
                         self.save_z_before_rs(barcode=barcode_prev, payload=unique_payload)
                         unique_payload_corrected, payload_rs = self.error_correction_payload(payload=unique_payload,
                                                                                              payload_k_mer_rep=payload_k_mer_rep)
@@ -201,15 +228,17 @@ class Decoder:
 
                             unique_payload_block, payload_k_mer_block = self.wide_rs(unique_payload_block_with_rs[:total_oligos_per_block_with_rs_oligos], payload_k_mer_rep_block[:total_oligos_per_block_with_rs_oligos])
 
-                            for unique_barcode, unique_payload, unique_payload_rs, payload_k_mer_rep in zip(unique_barcode_block_with_rs[:total_oligos_per_block_with_rs_oligos],
-                                                                                         unique_payload_block,
-                                                                                         unique_payload_block_rs[:total_oligos_per_block_with_rs_oligos],
-                                                                                         payload_k_mer_block):
+                            block_oligos = list(zip(
+                                unique_barcode_block_with_rs[:total_oligos_per_block_with_rs_oligos],
+                                unique_payload_block,
+                                unique_payload_block_rs[:total_oligos_per_block_with_rs_oligos],
+                                payload_k_mer_block))
+                            block_corrected = self.error_correction_payload_block(
+                                payloads=[unique_payload for _, unique_payload, _, _ in block_oligos],
+                                payload_k_mer_reps=[payload_k_mer_rep for _, _, _, payload_k_mer_rep in block_oligos])
+                            for (unique_barcode, unique_payload, _, _), (unique_payload_corrected, payload_rs) in zip(
+                                    block_oligos, block_corrected):
                                 self.save_z_after_rs_wide(barcode=unique_barcode, payload=unique_payload)
-
-                                unique_payload_corrected, payload_rs = self.error_correction_payload(
-                                    payload=unique_payload,
-                                    payload_k_mer_rep=payload_k_mer_rep)
                                 self.save_z_after_rs(barcode=unique_barcode, payload=unique_payload_corrected)
 
                                 binary = self.unique_payload_to_binary(payload=unique_payload_corrected,
@@ -227,13 +256,15 @@ class Decoder:
                             unique_payload_block_rs = unique_payload_block_rs[total_oligos_per_block_with_rs_oligos:]
                             payload_k_mer_rep_block = payload_k_mer_rep_block[total_oligos_per_block_with_rs_oligos:]
                     payload_accumulation = [payload]
+                    payload_counts = [count]
                     barcode_prev = barcode
                 else:
                     payload_accumulation.append(payload)
+                    payload_counts.append(count)
 
-            if len(payload_accumulation) > self.min_number_of_oligos_per_barcode:
+            if sum(payload_counts) > self.min_number_of_oligos_per_barcode:
                 unique_payload, payload_k_mer_rep = self.dna_to_unique_payload(
-                    payload_accumulation=payload_accumulation)
+                    payload_accumulation=payload_accumulation, payload_counts=payload_counts)
                 self.save_z_before_rs(barcode=barcode_prev, payload=unique_payload)
                 unique_payload_corrected, payload_rs = self.error_correction_payload(payload=unique_payload,
                                                                                      payload_k_mer_rep=payload_k_mer_rep)
@@ -255,16 +286,16 @@ class Decoder:
                         unique_payload_block_with_rs[:total_oligos_per_block_with_rs_oligos],
                         payload_k_mer_rep_block[:total_oligos_per_block_with_rs_oligos])
 
-                    for unique_barcode, unique_payload, unique_payload_rs, payload_k_mer_rep in zip(
-                            unique_barcode_block_with_rs[:total_oligos_per_block_with_rs_oligos],
-                            unique_payload_block,
-                            unique_payload_block_rs[:total_oligos_per_block_with_rs_oligos],
-                            payload_k_mer_block):
+                    block_oligos = list(zip(unique_barcode_block_with_rs[:total_oligos_per_block_with_rs_oligos],
+                                            unique_payload_block,
+                                            unique_payload_block_rs[:total_oligos_per_block_with_rs_oligos],
+                                            payload_k_mer_block))
+                    block_corrected = self.error_correction_payload_block(
+                        payloads=[unique_payload for _, unique_payload, _, _ in block_oligos],
+                        payload_k_mer_reps=[payload_k_mer_rep for _, _, _, payload_k_mer_rep in block_oligos])
+                    for (unique_barcode, unique_payload, _, _), (unique_payload_corrected, payload_rs) in zip(
+                            block_oligos, block_corrected):
                         self.save_z_after_rs_wide(barcode=unique_barcode, payload=unique_payload)
-
-                        unique_payload_corrected, payload_rs = self.error_correction_payload(
-                            payload=unique_payload,
-                            payload_k_mer_rep=payload_k_mer_rep)
                         self.save_z_after_rs(barcode=unique_barcode, payload=unique_payload_corrected)
 
                         binary = self.unique_payload_to_binary(payload=unique_payload_corrected,
@@ -272,15 +303,25 @@ class Decoder:
 
                         self.save_binary(binary=binary, barcode_prev=unique_barcode)
 
-    def dna_to_unique_payload(self, payload_accumulation: List[str]) -> tuple[
-        list[str | Any], list[Any] | tuple[str, ...]]:
-        shrunk_payload = self.shrink_payload(payload_accumulation=payload_accumulation)
-        shrunk_payload_histogram = self.payload_histogram(payload=shrunk_payload)
+    def next_expected_barcode(self) -> str:
+        """ The barcode that should come next in the sorted input, counted from first_barcode_index."""
+        barcode = utils.index_to_dna_sequence(self.expected_barcode_index, sequence_len=self.barcode_len)
+        self.expected_barcode_index += 1
+        return barcode
+
+    def dna_to_unique_payload(self, payload_accumulation: List[str],
+                              payload_counts: Optional[List[int]] = None) -> Tuple[List[int], List[Tuple[int, ...]]]:
+        """ payload_counts: the number of copies of every payload of a count-compressed pool (1 each by default)."""
+        if payload_counts is None:
+            payload_counts = [1] * len(payload_accumulation)
+        shrunk_payload, shrunk_counts = self.shrink_payload(payload_accumulation=payload_accumulation,
+                                                            payload_counts=payload_counts)
+        shrunk_payload_histogram = self.payload_histogram(payload=shrunk_payload, counts=shrunk_counts)
         unique_payload, k_mer_rep = self.payload_histogram_to_payload(payload_histogram=shrunk_payload_histogram)
         return unique_payload, k_mer_rep
 
     def save_block_to_binary(self, unique_barcode_block_with_rs: List[str],
-                             unique_payload_block_with_rs: List[List[str]],
+                             unique_payload_block_with_rs: List[List[int]],
                              unique_payload_block_rs: List) -> None:
         unique_payload_block, _ = self.wide_rs(unique_payload_block_with_rs)
         for unique_barcode, unique_payload, unique_payload_rs in zip(unique_barcode_block_with_rs, unique_payload_block,
@@ -292,14 +333,11 @@ class Decoder:
     def wide_rs(self, unique_payload_block_with_rs, payload_k_mer_rep_block = []) -> tuple:
         rs_removed = [[] for _ in range(int(self.oligos_per_block_len))]
         payload_k_mer_removed = [[] for _ in range(int(self.oligos_per_block_len))]
-        for col in range(len(unique_payload_block_with_rs[0])):
-            # for idx, elem in enumerate(unique_payload_block_with_rs):
-            #     if len(elem) <= col:
-            #         print(
-            #             f"Sublist at index {idx} is too short: {elem}, length = {len(elem)}")  # TODO: DELETE this line
-            payload = [elem[col] for elem in unique_payload_block_with_rs]
+        # a column of the block per row, all of them decoded at once
+        columns = np.array(unique_payload_block_with_rs, dtype=np.int64).T
+        columns_without_rs = self.error_correction_wide_block(columns)
+        for col, (payload, col_without_rs) in enumerate(zip(columns.tolist(), columns_without_rs)):
             payload_k_mer = [elem[col] for elem in payload_k_mer_rep_block]
-            col_without_rs, payload_rs = self.error_correction_payload(payload=payload, payload_or_wide='wide')
             if len(col_without_rs) > self.oligos_per_block_len:
                 import logging
                 logger = logging.getLogger()
@@ -316,7 +354,7 @@ class Decoder:
                         payload_k_mer_removed[idx].append(payload_k_mer[idx])
         return rs_removed, payload_k_mer_removed
 
-    def unique_payload_to_binary(self, payload: List[str], payload_rs: List[str]) -> str:
+    def unique_payload_to_binary(self, payload: List[int], payload_rs: List[int]) -> str:
         binary = []
         for z in payload:
             try:
@@ -324,7 +362,7 @@ class Decoder:
                 binary.append(self.z_to_binary[z])
             except KeyError:
                 # return ''
-                binary.append(self.z_to_binary['Z1'])
+                binary.append(self.z_to_binary[1])
         extract_info_bit_from_z_rs = self.payload_rs_extract_redundancy_bit(payload_rs=payload_rs)
         binary = ''.join(["".join(map(str, tup)) for tup in binary]) + extract_info_bit_from_z_rs
 
@@ -332,7 +370,7 @@ class Decoder:
 
         return binary
 
-    def payload_rs_extract_redundancy_bit(self, payload_rs: List[str]) -> str:
+    def payload_rs_extract_redundancy_bit(self, payload_rs: List[int]) -> str:
         z_to_entire_binary = []
         z_to_binary = []
         for z in payload_rs:
@@ -346,16 +384,19 @@ class Decoder:
     def wrong_barcode_and_payload_len(self, barcode_and_payload: str) -> bool:
         return len(barcode_and_payload) != self.barcode_len + self.payload_total_len_nuc
 
-    def shrink_payload(self, payload_accumulation: List[str]) -> List[List[str]]:
+    def shrink_payload(self, payload_accumulation: List[str],
+                       payload_counts: List[int]) -> Tuple[List[List[int]], List[int]]:
+        """ The k-mers (X) of the payloads that are kept, with their numbers of copies."""
         if self.k_mer == 1:
-            return [payload_accumulation]
+            return [payload_accumulation], [1]
         k_mer_accumulation = []
+        k_mer_counts = []
         # When we inserted errors per nuc (not per entire Z). we used those 3 algorithms to fix some of the errors.
         # for payload in payload_accumulation:
         #     k_mer_list = self.get_transformed_oligo_with_correct_len(payload)
         #     k_mer_accumulation.append(k_mer_list)
         # return k_mer_accumulation
-        for payload in payload_accumulation:
+        for payload, count in zip(payload_accumulation, payload_counts):
             k_mer_list = []
             oligo_valid = True
             if self.drop_if_not_exact_number_of_chunks:
@@ -365,12 +406,13 @@ class Decoder:
             else:
                 payload = payload.ljust(self.payload_total_len_nuc, 'R')[:self.payload_total_len_nuc]
             for k_letters in chunker(payload, size=self.k_mer):
-                k_mer_list.append(self.shrink_dict.get(k_letters, "Xdummy"))
+                k_mer_list.append(self.shrink_dict.get(k_letters, X_DUMMY))
             if oligo_valid:
                 k_mer_accumulation.append(k_mer_list)
-        return k_mer_accumulation
+                k_mer_counts.append(count)
+        return k_mer_accumulation, k_mer_counts
 
-    def get_transformed_oligo_with_correct_len(self, payload: str) -> List[str]:
+    def get_transformed_oligo_with_correct_len(self, payload: str) -> List[int]:
         k_mer_list = []
         payload_len = len(payload)
         delta = payload_len - self.payload_total_len_nuc
@@ -384,14 +426,14 @@ class Decoder:
                 if delta < 0:
                     delta += 1
                     i -= 1
-                    k_mer_list.append("Xdummy")
+                    k_mer_list.append(X_DUMMY)
                 elif delta > 0:
                     delta -= 1
                     i += 1
                     try:
                         next_letter = payload[i + self.k_mer]
                     except IndexError:
-                        k_mer_list.append("Xdummy")
+                        k_mer_list.append(X_DUMMY)
                     else:
                         success = False
                         for letters in itertools.combinations(k_letters, self.k_mer - 1):
@@ -403,27 +445,32 @@ class Decoder:
                             except KeyError:
                                 pass
                         if not success:
-                            k_mer_list.append("Xdummy")
+                            k_mer_list.append(X_DUMMY)
                 else:
-                    k_mer_list.append("Xdummy")
+                    k_mer_list.append(X_DUMMY)
             i += 3
             if len(k_mer_list) >= self.payload_total_len:
                 return k_mer_list
 
-    def payload_histogram(self, payload: List[List[str]]) -> List[Counter]:
+    def payload_histogram(self, payload: List[List[int]], counts: Optional[List[int]] = None) -> List[Counter]:
+        """ The X counts of every column of payload, each payload weighted by its number of copies in counts."""
         hist = []
         for col_idx in range(self.payload_total_len):
             col = [letter[col_idx] for letter in payload]
-            letter_counts = Counter(col)
+            if counts is None:
+                letter_counts = Counter(col)
+            else:
+                letter_counts = Counter()
+                for letter, count in zip(col, counts):
+                    letter_counts[letter] += count
             hist.append(letter_counts)
 
         return hist
 
-    def error_correction_payload(self, payload: Union[str, List[str]], payload_k_mer_rep: List[str] = None,
-                                 payload_or_wide: str = 'payload') -> Tuple[List[str], List[str]]:
+    def error_correction_payload(self, payload: List[int], payload_k_mer_rep: List[Tuple[int, ...]] = None,
+                                 payload_or_wide: str = 'payload') -> Tuple[List[int], List[int]]:
         # Find the indices where 'ZErasure' is located
-        erasures_positions = [index for index, value in enumerate(payload) if value == 'Z0']
-        print('erasures_positions=\n', erasures_positions)
+        erasures_positions = [index for index, value in enumerate(payload) if value == Z_ERASURE]
 
         if len(erasures_positions) > self.payload_rs_len:
             return payload[:-self.payload_rs_len], payload[-self.payload_rs_len:]
@@ -433,67 +480,77 @@ class Decoder:
         payload_decoded = []
         payload_rs = []
         if payload_or_wide == 'payload':
-            codewords = []
-            codewords_syndrome = []
-            print(f'payload_k_mer_rep=\n{payload_k_mer_rep}')
-
-            # Set the k_mer rep corresponding indices to 1
-            for k_mer_rep in payload_k_mer_rep:
-                try:
-                    codeword_vector = self.k_mer_representation_to_kmer_vector_representation[k_mer_rep]
-                except:
-                    # if we have X0 erasure then convert the k_mer to a vector like this,
-                    # or if it doesn't have any representation in syndrome table
-                    codeword_vector = [0] * self.payload_coder_vt_syndrome.n
-                    filtered_k_mer_rep = tuple(x for x in k_mer_rep if 'X0' not in x)
-                    for x in filtered_k_mer_rep:
-                        index = int(x[1:]) - 1  # Convert 'X' index to zero-based index
-                        codeword_vector[index] = 1
-
-                codewords.append(tuple(codeword_vector))
-                codewords_syndrome.append(self.payload_coder_vt_syndrome.codeword_to_syndrome(codeword=codewords[-1]))
-
-            print(f'codewords=\n{codewords}')
-            print(f'codewords_syndrome=\n{codewords_syndrome}')
+            codeword_bitmasks = self.k_mer_rep_to_codeword_bitmask(payload_k_mer_rep)
+            codewords_syndrome = self.payload_coder_vt_syndrome.syndrome_block(codeword_bitmasks)
 
             # Find the indices where 'ZErasure' is located
-            erasures_positions = [index for index, value in enumerate(payload) if value == 'Z0']
-            print('erasures_positions=\n', erasures_positions)
-            print('payload=\n', payload)
-            syn_outputs_after_rs = self.payload_coder_rs.decode(payload_encoded=codewords_syndrome,
+            erasures_positions = [index for index, value in enumerate(payload) if value == Z_ERASURE]
+            syn_outputs_after_rs = self.payload_coder_rs.decode(payload_encoded=codewords_syndrome.tolist(),
                                                                 erasures_pos=erasures_positions)
-            print('syn_outputs_after_rs=\n', syn_outputs_after_rs)
-            # syn_output_from_rs = self.payload_coder_vt_syndrome.codeword_to_syndrome(codeword=codeword)
-
-            decoded_codewords_vector = []
-            decoded_codewords = []
-            for i, (codeword, syn_output_from_rs) in enumerate(zip(codewords, syn_outputs_after_rs)):
-                decoded_codewords_vector.append(self.payload_coder_vt_syndrome.decode(codeword=codeword,
-                                                                                      syn_output_from_rs=syn_output_from_rs))
-                # if sum(decoded_codewords_vector[-1]) < self.payload_coder_vt_syndrome.k:
-                #     decoded_codewords.append(payload_k_mer_rep[i])
-                #     payload_decoded.append('Z0')
-                # else:
-                try:
-                    # I succeeded in the decoding process,
-                    # then I will convert the decoded codeword to the payload_decoded
-                    decoded_codewords.append(
-                        self.kmer_vector_representation_to_mer_representation[decoded_codewords_vector[-1]])
-                    payload_decoded.append(self.k_mer_representative_to_z[decoded_codewords[-1]])
-                except:
-                    # Failed in the decoding, thus putting Z0 which is erasure error
-                    decoded_codewords.append(payload_k_mer_rep[i])
-                    payload_decoded.append('Z0')
-            print(f'decoded_codewords=\n{decoded_codewords}')
+
+            # Z_ERASURE where the decoding failed
+            payload_decoded = self.vt_decode_to_z(codeword_bitmasks, np.array(syn_outputs_after_rs, dtype=np.int64))
+            payload_decoded = payload_decoded.tolist()
             payload_rs = payload_decoded[-self.payload_rs_len:]
             payload_decoded = payload_decoded[:-self.payload_rs_len]
         else:
-            erasures_positions = [index for index, value in enumerate(payload) if value == 'Z0']
+            erasures_positions = [index for index, value in enumerate(payload) if value == Z_ERASURE]
             payload_decoded = self.wide_coder.decode(payload_encoded=payload, erasures_pos=erasures_positions)
             x = 4
 
         return payload_decoded, payload_rs
 
+    def error_correction_payload_block(self, payloads: List[List[int]], payload_k_mer_reps: List[List[Tuple[int, ...]]]
+                                       ) -> List[Tuple[List[int], List[int]]]:
+        """ error_correction_payload() of every payload of a block, the RS decoding of the VT syndromes of all of them
+        at once (see RSPayloadAdapter.decode_block)."""
+        if not payloads:
+            return []
+        erasures = np.array(payloads, dtype=np.int64) == Z_ERASURE
+        decodable = erasures.sum(axis=1) <= self.payload_rs_len
+        codeword_bitmasks = np.array([self.k_mer_rep_to_codeword_bitmask(payload_k_mer_rep)
+                                      for payload_k_mer_rep in payload_k_mer_reps], dtype=np.int64)
+        syn_outputs_after_rs = self.payload_coder_vt_syndrome.syndrome_block(codeword_bitmasks)
+        syn_outputs_after_rs[decodable] = self.payload_coder_rs.decode_block(syn_outputs_after_rs[decodable],
+                                                                             erasures[decodable])
+        # Z_ERASURE where the decoding failed
+        payloads_decoded = self.vt_decode_to_z(codeword_bitmasks, syn_outputs_after_rs).tolist()
+        return [(payload_decoded[:-self.payload_rs_len], payload_decoded[-self.payload_rs_len:]) if is_decodable
+                else (payload[:-self.payload_rs_len], payload[-self.payload_rs_len:])
+                for payload, payload_decoded, is_decodable in zip(payloads, payloads_decoded, decodable.tolist())]
+
+    def error_correction_wide_block(self, columns: np.ndarray) -> List[List[int]]:
+        """ error_correction_payload(payload_or_wide='wide') of every column of a block (a row of columns each), the
+        RS decoding of all of them at once (see RSWideAdapter.decode_block)."""
+        erasures = columns == Z_ERASURE
+        decodable = erasures.sum(axis=1) <= self.payload_rs_len
+        decoded = iter(self.wide_coder.decode_block(columns[decodable], erasures[decodable]))
+        return [next(decoded) if is_decodable else column[:-self.payload_rs_len]
+                for column, is_decodable in zip(columns.tolist(), decodable.tolist())]
+
+    def k_mer_rep_to_codeword_bitmask(self, payload_k_mer_rep: List[Tuple[int, ...]]) -> np.ndarray:
+        """ The VT codeword bitmask of every X tuple, bit i set for X{i+1}; the erasures (X0) set no bit."""
+        codeword_bitmasks = np.zeros(len(payload_k_mer_rep), dtype=np.int64)
+        for i, k_mer_rep in enumerate(payload_k_mer_rep):
+            for x in k_mer_rep:
+                if x != X_ERASURE:
+                    codeword_bitmasks[i] |= 1 << (x - 1)
+        return codeword_bitmasks
+
+    def vt_decode_to_z(self, codeword_bitmasks: np.ndarray, syn_outputs_from_rs: np.ndarray) -> np.ndarray:
+        """ VT decoding of arrays of codeword bitmasks and RS syndromes (of any shape) straight to Z, Z_ERASURE where
+        the decoded bitmask is no codeword."""
+        if self._vt_decode_to_z is not None:
+            syn_outputs_from_rs = np.mod(syn_outputs_from_rs, self.payload_coder_vt_syndrome.n)
+            return self._vt_decode_to_z[codeword_bitmasks, syn_outputs_from_rs]
+        return self._vt_decode_to_z_search(codeword_bitmasks, syn_outputs_from_rs)
+
+    def _vt_decode_to_z_search(self, codeword_bitmasks: np.ndarray, syn_outputs_from_rs: np.ndarray) -> np.ndarray:
+        """ vt_decode_to_z() without the dense table, for any n."""
+        decoded = self.payload_coder_vt_syndrome.decode_block(codeword_bitmasks, syn_outputs_from_rs)
+        index = np.minimum(np.searchsorted(self._codeword_bitmasks, decoded), len(self._codeword_bitmasks) - 1)
+        return np.where(self._codeword_bitmasks[index] == decoded, self._codeword_bitmask_zs[index], Z_ERASURE)
+
     def error_correction_barcode(self, barcode: Union[str, List[str]]) -> str:
         if isinstance(barcode, str):
             barcode = [c for c in barcode]
@@ -507,12 +564,11 @@ class Decoder:
             barcode_decoded = ''.join(barcode_decoded)
         return barcode_decoded
 
-    def payload_histogram_to_payload(self, payload_histogram: List[Counter]) -> tuple[
-        list[str | Any], list[Any] | tuple[str, ...]]:
+    def payload_histogram_to_payload(self, payload_histogram: List[Counter]) -> Tuple[List[int], List[Tuple[int, ...]]]:
         result_payload = []
         k_mer_rep = []
         for counter in payload_histogram:
-            del counter['Xdummy']
+            del counter[X_DUMMY]
             reps = counter.most_common(self.subset_size)
             if len(reps) != self.subset_size:
                 # BAD
@@ -520,41 +576,30 @@ class Decoder:
                 # OK
                 # reps = [('XErasure' + str(i), i) for i in range(1, self.subset_size + 1)]
                 # BEST
-                # s = set(['X0' + str(i) for i in range(1, self.subset_size + 1)])
-                s = set(['X0' + str(i) for i in range(1, self.subset_size + 1)])
-                # s = set(['XErasure'] * self.subset_size)
-                t = set([r[0] for r in reps])
-                diff = sorted(list(s - t))
+                # the missing k-mers are erasures (X0)
                 for missing_rep_idx in range(self.subset_size - len(reps)):
-                    reps.append((diff[missing_rep_idx], 1))
-            k_mer_rep.append(tuple(self.sorted_human([rep[0] for rep in reps])))
+                    reps.append((X_ERASURE, 1))
+            k_mer_rep.append(tuple(sorted([rep[0] for rep in reps])))
             try:
                 z = self.k_mer_representative_to_z[k_mer_rep[-1]]
             except KeyError:
-                z = 'Z0'  # The X tuple is out of range
+                z = Z_ERASURE  # The X tuple is out of range
             result_payload.append(z)
 
         return result_payload, k_mer_rep
 
-    def save_z_before_rs(self, payload: List[str], barcode: str) -> None:
+    def save_z_before_rs(self, payload: List[int], barcode: str) -> None:
         with open(self.results_file_z_before_rs_payload, 'a+', encoding='utf-8') as f:
-            f.write(barcode + "," + ",".join(payload) + '\n')
+            f.write(oligo_to_line(barcode, payload) + '\n')
 
-    def save_z_after_rs(self, payload: List[str], barcode: str) -> None:
+    def save_z_after_rs(self, payload: List[int], barcode: str) -> None:
         with open(self.results_file_z_after_rs_payload, 'a+', encoding='utf-8') as f:
-            f.write(barcode + "," + ",".join(payload) + '\n')
+            f.write(oligo_to_line(barcode, payload) + '\n')
 
-    def save_z_after_rs_wide(self, payload: List[str], barcode: str) -> None:
+    def save_z_after_rs_wide(self, payload: List[int], barcode: str) -> None:
         with open(self.results_file_z_after_rs_wide, 'a+', encoding='utf-8') as f:
-            f.write(barcode + "," + ",".join(payload) + '\n')
+            f.write(oligo_to_line(barcode, payload) + '\n')
 
     def save_binary(self, binary: str, barcode_prev: str) -> None:
         with open(self.results_file, 'a+', encoding='utf-8') as f:
             f.write(barcode_prev + binary + '\n')
-
-    @staticmethod
-    def sorted_human(iterable: List[str]) -> List[str]:
-        """ Sort the given iterable in the way that humans expect."""
-        convert = lambda text: int(text) if text.isdigit() else text
-        alphanum_key = lambda key: [convert(c) for c in re.split('([0-9]+)', key)]
-        return sorted(iterable, key=alphanum_key)
@@ -1,12 +1,27 @@
-from textwrap import wrap
-from typing import Union, Dict, List, Tuple
+import contextlib
+import os
+from typing import Union, Dict, List, Optional, Tuple, Iterator, NamedTuple
+from multiprocessing import Pool
 from pathlib import Path
 
+import numpy as np
+
+from dna_storage.binary_format import BinaryFileReader
+from dna_storage.encoder_checkpoint import EncoderCheckpoint
+from dna_storage.oligo_writer import OligoWriter, open_oligo_writer
+from dna_storage.pool_manifest import PoolManifest
 from dna_storage.rs_adapter import RSBarcodeAdapter, RSPayloadAdapter, RSWideAdapter
 from dna_storage import utils
+from dna_storage.symbols import z_keys_to_int, z_values_to_int, oligo_to_line
 from dna_storage.vt_syndrome import VTSyndrome
 
 
+class EncodedOligo(NamedTuple):
+    barcode_index: int
+    barcode: str  # encoded, barcode + barcode rs
+    payload: np.ndarray  # int Z symbols, payload rs included
+
+
 #################################################################
 # @ Class: Encoder
 # @ Description: Retrieve the oligo to the oligo that was written
@@ -35,7 +50,17 @@ class Encoder:
                  results_file_without_rs_wide: Union[Path, str],
                  z_to_binary: Dict,
                  z_to_k_mer_in_binary_representative: Dict,
+                 results_file_compressed: Union[Path, str, None] = None,
+                 number_of_processes: int = 1,
+                 blocks_per_task: int = 16,
+                 checkpoint_interval_blocks: int = 0,
+                 resume: bool = False,
+                 append: Optional[bool] = None,
+                 block_index_offset: Optional[int] = None,
                  ):
+        """ append: encode after the blocks of the pool manifest, starting at block block_index_offset (by default the
+        number of blocks of the pool). When resuming, both are the ones of the resumed run: None takes them from it,
+        and given values must be the same."""
         self.file_name = binary_file_name
         self.barcode_len = barcode_len
         self.barcode_rs_len = barcode_rs_len
@@ -43,167 +68,262 @@ class Encoder:
         self.payload_rs_len = payload_rs_len
         self.shrink_dict = shrink_dict
         self.k_mer = k_mer
-        self.k_mer_representative_to_z = k_mer_representative_to_z
-        self.binary_to_z_dict = binary_to_z
+        self.k_mer_representative_to_z = z_values_to_int(k_mer_representative_to_z)
+        self.binary_to_z_dict = z_values_to_int(binary_to_z)
         self.subset_size = subset_size
         self.bits_per_z = bits_per_z
         self.oligos_per_block_len = oligos_per_block_len
         self.oligos_per_block_rs_len = oligos_per_block_rs_len
         self.results_file = results_file
         self.results_file_without_rs_wide = results_file_without_rs_wide
-        open(self.results_file, 'w').close()
-        self.barcode_generator = utils.dna_sequence_generator(sequence_len=self.barcode_len)
+        self.results_file_compressed = results_file_compressed
+        self.results_sinks = ('results',) if results_file_compressed is None else ('results', 'results_compressed')
+        self.oligos_per_block_total_len = self.oligos_per_block_len + self.oligos_per_block_rs_len
+        self.number_of_processes = number_of_processes
+        self.blocks_per_task = blocks_per_task
+        self.number_of_blocks = 0
+        self.checkpoint_interval_blocks = checkpoint_interval_blocks
+        self.resume = resume
+        if resume and results_file_compressed is not None:
+            raise ValueError('Resuming an encoding run is not supported with a compressed results file')
+        self.checkpoint = EncoderCheckpoint(checkpoint_file=f'{results_file}.checkpoint',
+                                            binary_file_name=binary_file_name,
+                                            oligos_per_block_len=oligos_per_block_len,
+                                            oligos_per_block_rs_len=oligos_per_block_rs_len)
+        self.manifest = PoolManifest(manifest_file=f'{results_file}.manifest',
+                                     oligos_per_block_len=oligos_per_block_len,
+                                     oligos_per_block_rs_len=oligos_per_block_rs_len)
+        self.checkpoint_state = self.load_checkpoint() if resume else None
+        if self.checkpoint_state is not None:
+            # the manifest may already hold the segment of the resumed run, it keeps the place it was started at
+            for name, value in [('append', append), ('block_index_offset', block_index_offset)]:
+                if value is not None and value != self.checkpoint_state[name]:
+                    raise ValueError(f'The run of {binary_file_name} to resume has {name}='
+                                     f'{self.checkpoint_state[name]}, not {value}')
+            append = self.checkpoint_state['append']
+            block_index_offset = self.checkpoint_state['block_index_offset']
+        self.append = bool(append)
+        self.manifest_state = self.manifest.load() if self.append else None
+        if self.append and self.manifest_state is None:
+            raise ValueError(f'Cannot append, there is no pool manifest {self.manifest.manifest_file}')
+        if block_index_offset and not self.append:
+            raise ValueError(f'block_index_offset={block_index_offset} is the first block of an appended run')
+        if block_index_offset is None:
+            # the blocks of an appended run start after the blocks already in the pool
+            block_index_offset = self.manifest_state['number_of_blocks'] if self.append else 0
+        elif self.checkpoint_state is None and self.append \
+                and block_index_offset < self.manifest_state['number_of_blocks']:
+            raise ValueError(f'block_index_offset={block_index_offset} is inside the '
+                             f"{self.manifest_state['number_of_blocks']} blocks of the pool")
+        self.block_index_offset = block_index_offset
         self.barcode_coder = barcode_coder
         self.payload_coder_rs = payload_coder_rs
         self.wide_coder = wide_coder
         self.payload_coder_vt_syndrome = payload_coder_vt_syndrome
-        self.z_to_binary = z_to_binary
-        self.z_to_k_mer_in_binary_representative = z_to_k_mer_in_binary_representative
+        self.z_to_binary = z_keys_to_int(z_to_binary)
+        self.z_to_k_mer_in_binary_representative = z_keys_to_int(z_to_k_mer_in_binary_representative)
+        # Z <-> the integer value of its bits_per_z bits (MSB first), the form the blocks are encoded in
+        self._value_to_z = np.zeros(2 ** self.bits_per_z, dtype=np.int64)
+        for binary, z in self.binary_to_z_dict.items():
+            self._value_to_z[utils.bits_to_int(binary)] = z
+        self._z_to_value = np.zeros(2 ** self.bits_per_z + 1, dtype=np.int64)
+        for z, binary in self.z_to_binary.items():
+            self._z_to_value[z] = utils.bits_to_int(binary)
+        self._bits_weights = 1 << np.arange(self.bits_per_z - 1, -1, -1)
 
     def run(self):
-        number_of_blocks = 0
-        with open(self.file_name, 'r', encoding='utf-8') as file:
-            z_list_accumulation_per_block = []
-            binary_list_per_block = []
-            for line in file:
-                line = line.strip('\n')
-                z_list = []
-                binary_list = []
-                # line = '011101000111100101011000010110100111' #TODO: delete this - for tests only!!!!!
-                for binary_to_transform in wrap(line, self.bits_per_z):
-                    z = self.binary_to_z(binary=binary_to_transform)
-                    z_list.append(z)
-                    binary_list.append(binary_to_transform)
-                z_list_accumulation_per_block.append(z_list)
-                binary_list_per_block.append(binary_list)
-                if len(z_list_accumulation_per_block) == self.oligos_per_block_len:
-                    number_of_blocks += 1
-                    z_list_accumulation_with_rs = self.wide_block_rs(z_list_accumulation_per_block) #TODO: I am doing wide rs and then the payload rs,
-
-                    binary_z_list_only_rs = []
-                    for z_list_only_rs in z_list_accumulation_with_rs[self.oligos_per_block_len:]:
-                        binary_z_list_only_rs.append([''.join(map(str, self.z_to_binary[z])) for z in z_list_only_rs])
-                    binary_list_per_block = binary_list_per_block + binary_z_list_only_rs
-                    # TODO: which then the 2 oligos I add I don't have bits of information to add the bits for it.
-                    #  TODO: I need to change and do the rs on the payload, and then on the block.
-                    amount_oligos_per_block_len_to_write = self.oligos_per_block_len
-                    for z_list, binary_list in zip(z_list_accumulation_with_rs, binary_list_per_block):
-                        oligo = self.z_to_oligo(z_list, binary_list)
-                        self.save_oligo(results_file=self.results_file, oligo=oligo)
-                        if amount_oligos_per_block_len_to_write > 0:
-                            self.save_oligo(results_file=self.results_file_without_rs_wide, oligo=oligo)
-                            amount_oligos_per_block_len_to_write = amount_oligos_per_block_len_to_write - 1
-                    z_list_accumulation_per_block = []
-                    binary_list_per_block = []
-        return number_of_blocks
+        return self.write_blocks(encoding='encode_block')
 
     def run_new_encoding(self):
-        number_of_blocks = 0
-        with open(self.file_name, 'r', encoding='utf-8') as file:
-            z_list_accumulation_per_block = []
-            binary_list_per_block = []
-            z_list_accumulation_per_block_after_ec = []
-            for line in file:
-                line = line.strip('\n')
-                z_list = []
-                binary_list = []
-                # line = '011101000111100101011000010110100111' #TODO: delete this - for tests only!!!!!
-                for binary_to_transform in wrap(line, self.bits_per_z):
-                    z = self.binary_to_z(binary=binary_to_transform)
-                    z_list.append(z)
-                    binary_list.append(binary_to_transform)
-                z_list_accumulation_per_block.append(z_list)
-                binary_list_per_block.append(binary_list)
-                if len(z_list_accumulation_per_block) == self.oligos_per_block_len:
-                    number_of_blocks += 1
-                    # z_list_accumulation_with_rs = self.wide_block_rs(z_list_accumulation_per_block) #TODO: I am doing wide rs and then the payload rs,
-
-                    binary_z_list_only_rs = []
-                    # for z_list_only_rs in z_list_accumulation_with_rs[self.oligos_per_block_len:]:
-                    #     binary_z_list_only_rs.append([''.join(map(str, self.z_to_binary[z])) for z in z_list_only_rs])
-                    binary_list_per_block = binary_list_per_block + binary_z_list_only_rs
-                    # TODO: which then the 2 oligos I add I don't have bits of information to add the bits for it.
-                    #  TODO: I need to change and do the rs on the payload, and then on the block.
-                    amount_oligos_per_block_len_to_write = self.oligos_per_block_len
-                    for z_list, binary_list in zip(z_list_accumulation_per_block, binary_list_per_block):
-                        oligo = self.add_payload_rs_symbols_for_error_correction(payload=z_list,
-                                                                                 binary_list=binary_list)
-                        z_list_accumulation_per_block_after_ec.append(oligo.copy())
-                        barcode = next(self.barcode_generator)
-                        barcode = self.add_barcode_rs_symbols_for_error_correction(barcode=barcode)
-                        barcode = "".join(barcode)
-                        oligo.insert(0, barcode)
-                        oligo = ",".join(oligo)
-
-                        self.save_oligo(results_file=self.results_file, oligo=oligo)
-                        if amount_oligos_per_block_len_to_write > 0:
-                            self.save_oligo(results_file=self.results_file_without_rs_wide, oligo=oligo)
-                            amount_oligos_per_block_len_to_write = amount_oligos_per_block_len_to_write - 1
-
-                    z_list_accumulation_with_rs = self.wide_block_rs(z_list_accumulation_per_block_after_ec)
-
-                    for z_list in z_list_accumulation_with_rs[self.oligos_per_block_len:]:
-                        oligo = z_list
-                        barcode = next(self.barcode_generator)
-                        barcode = self.add_barcode_rs_symbols_for_error_correction(barcode=barcode)
-                        barcode = "".join(barcode)
-                        oligo.insert(0, barcode)
-                        oligo = ",".join(oligo)
-                        self.save_oligo(results_file=self.results_file, oligo=oligo)
-                        if amount_oligos_per_block_len_to_write > 0:
-                            self.save_oligo(results_file=self.results_file_without_rs_wide, oligo=oligo)
-                            amount_oligos_per_block_len_to_write = amount_oligos_per_block_len_to_write - 1
-
-                    z_list_accumulation_per_block = []
-                    binary_list_per_block = []
-                    z_list_accumulation_per_block_after_ec = []
-        return number_of_blocks
-
-    def binary_to_z(self, binary: str) -> str:
-        binary_tuple = tuple([int(b) for b in binary])
-        return self.binary_to_z_dict[binary_tuple]
-
-    def z_to_oligo(self, z_list: List[str], binary_list: List[str]) -> str:
-        oligo = self.add_payload_rs_symbols_for_error_correction(payload=z_list, binary_list=binary_list)
-        barcode = next(self.barcode_generator)
-        barcode = self.add_barcode_rs_symbols_for_error_correction(barcode=barcode)
-        barcode = "".join(barcode)
-        oligo.insert(0, barcode)
-        return ",".join(oligo)
-
-    def wide_block_rs(self, z_list_accumulation_per_block: List[List[str]]) -> List[List[str]]:
-        rs_append = [[] for _ in range(int(self.oligos_per_block_len + self.oligos_per_block_rs_len))]
-        for col in range(len(z_list_accumulation_per_block[0])):
-            z_list = [elem[col] for elem in z_list_accumulation_per_block]
-            col_with_rs = self.add_payload_rs_symbols_for_error_correction(payload=z_list, payload_or_wide='wide')
-            for idx, z in enumerate(col_with_rs):
-                rs_append[idx].append(z)
-        return rs_append
-
-    def add_payload_rs_symbols_for_error_correction(self, payload: Union[str, List[str]],
-                                                    binary_list: List[str] = None,
-                                                    payload_or_wide: str = 'payload') -> List[str]:
-        if isinstance(payload, str):
-            payload = [c for c in payload]
-        if payload_or_wide == 'payload':
-            ###########################we want to do reed solomon on the 6 bits?
-            # for sigma in payload:
-            #     print(bin(int(sigma[1:])-1).zfill(6))
-            ###########################
-            payload_encoded_after_vt_syndrome, xs_array = self.payload_coder_vt_syndrome.encode(binary_list=binary_list)
-            payload_encoded = self.payload_coder_rs.encode(payload=payload,
-                                                           payload_encoded_after_vt_syndrome=payload_encoded_after_vt_syndrome,
-                                                           binary_list=binary_list, xs_array=xs_array)
-        else:
-            payload_encoded = self.wide_coder.encode(payload=payload)
-
-        return payload_encoded
-
-    def add_barcode_rs_symbols_for_error_correction(self, barcode: Tuple[str]) -> List[str]:
-        barcode = list(barcode)
-        barcode_encoded = self.barcode_coder.encode(barcode=barcode)
-        return barcode_encoded
-
-    def save_oligo(self, results_file: Union[Path, str], oligo: str) -> None:
-        with open(results_file, 'a+', encoding='utf-8') as f:
-            f.write(oligo + '\n')
+        return self.write_blocks(encoding='encode_block_new_encoding')
+
+    def write_blocks(self, encoding: str) -> int:
+        first_block_index = self.start_block_index()
+        number_of_blocks = first_block_index
+        with self.open_writer(mode=self.writer_mode(first_block_index)) as writer:
+            for oligos in self.iter_encoded_blocks(encoding=encoding, first_block_index=first_block_index):
+                number_of_blocks += 1
+                self.save_block(writer=writer, oligos=oligos)
+                self.save_checkpoint(number_of_blocks=number_of_blocks)
+        self.finish(number_of_blocks=number_of_blocks)
+        self.number_of_blocks = self.block_index_offset + number_of_blocks
+        return self.number_of_blocks
+
+    def stream(self, encoding: str = 'encode_block', write_files: bool = True) -> Iterator[EncodedOligo]:
+        """ Yields the encoded oligos block by block, instead of only writing them. With write_files the results
+        files are written on the way. self.number_of_blocks is set once the stream is exhausted."""
+        first_block_index = self.start_block_index() if write_files else 0
+        number_of_blocks = first_block_index
+        with self.open_writer(mode=self.writer_mode(first_block_index)) if write_files \
+                else contextlib.nullcontext() as writer:
+            for block_index, oligos in enumerate(self.iter_encoded_blocks(encoding=encoding,
+                                                                          first_block_index=first_block_index),
+                                                 self.block_index_offset + first_block_index):
+                number_of_blocks += 1
+                self.number_of_blocks = self.block_index_offset + number_of_blocks
+                if writer is not None:
+                    self.save_block(writer=writer, oligos=oligos)
+                    self.save_checkpoint(number_of_blocks=number_of_blocks)
+                first_barcode_index = block_index * self.oligos_per_block_total_len
+                for offset, (barcode, z_list) in enumerate(oligos):
+                    yield EncodedOligo(barcode_index=first_barcode_index + offset, barcode=barcode,
+                                       payload=np.array(z_list, dtype=np.int64))
+        if write_files:
+            self.finish(number_of_blocks=number_of_blocks)
+
+    def finish(self, number_of_blocks: int) -> None:
+        """ Records the run in the pool manifest. The checkpoint is kept until then, a run stopped in between is
+        resumed from it."""
+        self.save_checkpoint(number_of_blocks=number_of_blocks, force=True)
+        self.save_manifest(number_of_blocks=number_of_blocks)
+        self.checkpoint.remove()
+
+    def writer_mode(self, first_block_index: int) -> str:
+        return 'a' if self.append or first_block_index > 0 else 'w'
+
+    def start_block_index(self) -> int:
+        """ 0, or when resuming, the number of blocks in the checkpoint. The results files are cut back to the
+        checkpoint, dropping a block that was only partially written."""
+        if not self.resume:
+            self.checkpoint.remove()
+            return 0
+        state = self.checkpoint_state
+        if state is None:
+            return 0
+        if state['file_sizes'] is not None:
+            for name, file_name in self.results_files().items():
+                os.truncate(file_name, state['file_sizes'][name])
+        return state['number_of_blocks']
+
+    def load_checkpoint(self) -> Optional[Dict]:
+        """ The state of the run to resume, None to start from scratch. A checkpoint is matched to the input by the
+        size and SHA-256 of the binary file. A checkpoint of another input was either left by a run that stopped right
+        after it was recorded in the pool manifest, and is ignored, or by an interrupted run, that can't be resumed with
+        this input. The checkpoint is removed once a run is finished, so without one, a run whose input is the last
+        segment of the pool is finished: it is resumed with no blocks left (and its files are not cut)."""
+        manifest_state = self.manifest.load()
+        segments = manifest_state['segments'] if manifest_state is not None else []
+        state = self.checkpoint.load()
+        if state is not None and not self.checkpoint.is_of_input(state):
+            recorded = {'binary_file_name': state['binary_file_name'],
+                        'binary_file_size': state['binary_file_size'],
+                        'binary_file_sha256': state['binary_file_sha256'],
+                        'first_block_index': state['block_index_offset'],
+                        'number_of_blocks': state['number_of_blocks']}
+            if not any(recorded.items() <= segment.items() for segment in segments):
+                raise ValueError(f'{self.checkpoint.checkpoint_file} was written for another input than '
+                                 f'{self.file_name}, remove it to encode from scratch')
+            state = None
+        if state is None and segments and self.checkpoint.is_of_input(segments[-1]):
+            segment = segments[-1]
+            state = {'append': segment['first_block_index'] > 0, 'block_index_offset': segment['first_block_index'],
+                     'number_of_blocks': segment['number_of_blocks'], 'file_sizes': None}
+        return state
+
+    def save_checkpoint(self, number_of_blocks: int, force: bool = False) -> None:
+        if self.checkpoint_interval_blocks <= 0:
+            return
+        if force or number_of_blocks % self.checkpoint_interval_blocks == 0:
+            self.checkpoint.save(number_of_blocks=number_of_blocks,
+                                 next_barcode_index=(self.block_index_offset + number_of_blocks)
+                                 * self.oligos_per_block_total_len,
+                                 file_sizes={name: os.path.getsize(file_name)
+                                             for name, file_name in self.results_files().items()},
+                                 append=self.append, block_index_offset=self.block_index_offset)
+
+    def save_manifest(self, number_of_blocks: int) -> None:
+        """ Records the blocks of this run as a segment of the pool, in place of the segment of a resumed run."""
+        reader = BinaryFileReader(self.file_name, record_bits=self.payload_len * self.bits_per_z)
+        self.manifest.add_segment(state=self.manifest_state, binary_file_name=self.file_name,
+                                  first_block_index=self.block_index_offset, number_of_blocks=number_of_blocks,
+                                  number_of_padding_rows=reader.number_of_padding_rows, z_fill=reader.z_fill,
+                                  input_identity=self.checkpoint.input_identity)
+
+    def results_files(self) -> Dict[str, Union[Path, str]]:
+        return {'results': self.results_file, 'without_rs_wide': self.results_file_without_rs_wide}
+
+    def iter_encoded_blocks(self, encoding: str, first_block_index: int = 0) -> Iterator[List[Tuple[str, List[int]]]]:
+        """ The oligos of every block, in block order. Blocks are encoded in a process pool when number_of_processes > 1."""
+        if self.number_of_processes == 1:
+            encode_block = getattr(self, encoding)
+            for block_index, values in self.read_blocks(first_block_index):
+                yield encode_block(block_index, values)
+            return
+        with Pool(self.number_of_processes, initializer=init_block_encoder_worker, initargs=(self, encoding)) as pool:
+            yield from pool.imap(encode_block_in_worker, self.read_blocks(first_block_index),
+                                 chunksize=self.blocks_per_task)
+
+    def read_blocks(self, first_block_index: int = 0) -> Iterator[Tuple[int, np.ndarray]]:
+        """ The symbol values (oligos_per_block_len, payload_len) of every block. first_block_index counts the
+        blocks of the binary file, the yielded block index is the block of the pool."""
+        block_index = self.block_index_offset + first_block_index
+        pending = np.zeros((0, self.payload_len), dtype=np.int64)
+        for values in self.read_binary_values(first_row=first_block_index * self.oligos_per_block_len):
+            pending = np.vstack((pending, values))
+            number_of_full_blocks = len(pending) // self.oligos_per_block_len
+            for block in range(number_of_full_blocks):
+                yield block_index, pending[block * self.oligos_per_block_len:(block + 1) * self.oligos_per_block_len]
+                block_index += 1
+            pending = pending[number_of_full_blocks * self.oligos_per_block_len:]
+
+    def encode_block(self, block_index: int, values: np.ndarray) -> List[Tuple[str, List[int]]]:
+        # wide rs first, then the payload rs of every oligo, the wide rs oligos included
+        z_block_with_rs = self.wide_coder.encode_block(self._value_to_z[values])
+        payloads = self.payload_coder_rs.encode_block(self._z_to_value[z_block_with_rs])
+        barcodes = self.block_barcodes(block_index=block_index)
+        return list(zip(barcodes, payloads.tolist()))
+
+    def encode_block_new_encoding(self, block_index: int, values: np.ndarray) -> List[Tuple[str, List[int]]]:
+        # the payload rs of every oligo first, then the wide rs over the encoded payloads
+        payloads = self.payload_coder_rs.encode_block(values)
+        payloads_with_rs = self.wide_coder.encode_block(payloads)
+        barcodes = self.block_barcodes(block_index=block_index)
+        return list(zip(barcodes, payloads_with_rs.tolist()))
+
+    def read_binary_values(self, first_row: int = 0) -> Iterator[np.ndarray]:
+        """ The binary file as (rows, payload_len) chunks of symbol values, a value per bits_per_z bits."""
+        reader = BinaryFileReader(self.file_name, record_bits=self.payload_len * self.bits_per_z)
+        for rows in reader.iter_rows(first_row=first_row):
+            yield rows.reshape(rows.shape[0], self.payload_len, self.bits_per_z) @ self._bits_weights
+
+    def block_barcodes(self, block_index: int) -> List[str]:
+        """ The encoded barcodes of block block_index, rs oligos included. Blocks can be encoded in any order."""
+        first_barcode_index = block_index * self.oligos_per_block_total_len
+        return self.barcode_coder.encode_range(first_barcode_index,
+                                               first_barcode_index + self.oligos_per_block_total_len)
+
+    def open_writer(self, mode: str = 'w') -> OligoWriter:
+        return open_oligo_writer(results_file=self.results_file,
+                                 results_file_without_rs_wide=self.results_file_without_rs_wide,
+                                 results_file_compressed=self.results_file_compressed,
+                                 mode=mode)
+
+    def save_oligo(self, writer: OligoWriter, oligo: str, sinks: Tuple[str, ...]) -> None:
+        writer.write(oligo, *sinks)
+
+    def save_block(self, writer: OligoWriter, oligos: List[Tuple[str, List[int]]]) -> None:
+        lines = [oligo_to_line(barcode, z_list) for barcode, z_list in oligos]
+        for oligo in lines:
+            self.save_oligo(writer=writer, oligo=oligo, sinks=self.results_sinks)
+        for oligo in lines[:self.oligos_per_block_len]:
+            self.save_oligo(writer=writer, oligo=oligo, sinks=('without_rs_wide',))
+        writer.flush()
+
+
+#################################################################
+# Process pool workers: every worker gets its own copy of the encoder once
+# (initializer) and then only receives the blocks.
+#################################################################
+
+_worker_encoder = None
+_worker_encoding = None
+
+
+def init_block_encoder_worker(encoder: Encoder, encoding: str) -> None:
+    global _worker_encoder, _worker_encoding
+    _worker_encoder = encoder
+    _worker_encoding = encoding
+
+
+def encode_block_in_worker(block: Tuple[int, np.ndarray]) -> List[Tuple[str, List[int]]]:
+    return getattr(_worker_encoder, _worker_encoding)(*block)
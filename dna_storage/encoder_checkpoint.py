@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+#################################################################
+# @ Class: EncoderCheckpoint
+# @ Description: Sidecar file of a (long) encoding run. Written after a
+#                block was fully written and flushed: the number of
+#                blocks written, the next barcode index and the size
+#                of every results file at that point, so a resumed run
+#                can cut off a partially written block and go on, and
+#                the place of the run in the pool (append flag and
+#                first block index), so it is resumed at the same place.
+#                The size and SHA-256 of the binary file identify the
+#                input, the file name alone does not (every run of the
+#                pipeline writes the same binary file). Removed once the
+#                run is finished.
+#################################################################
+
+
+def binary_file_identity(binary_file_name: Union[Path, str], chunk_size: int = 2 ** 20) -> Dict:
+    """ The size and SHA-256 of a binary file, as recorded in checkpoints and pool manifest segments."""
+    sha256 = hashlib.sha256()
+    with open(binary_file_name, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return {'binary_file_size': os.path.getsize(binary_file_name), 'binary_file_sha256': sha256.hexdigest()}
+
+
+class EncoderCheckpoint:
+    def __init__(self, checkpoint_file: Union[Path, str],
+                 binary_file_name: Union[Path, str],
+                 oligos_per_block_len: int,
+                 oligos_per_block_rs_len: int):
+        self.checkpoint_file = checkpoint_file
+        self.binary_file_name = str(binary_file_name)
+        self.oligos_per_block_len = oligos_per_block_len
+        self.oligos_per_block_rs_len = oligos_per_block_rs_len
+        self._input_identity = None
+
+    @property
+    def input_identity(self) -> Dict:
+        """ The binary file name, size and SHA-256, computed once."""
+        if self._input_identity is None:
+            self._input_identity = {'binary_file_name': self.binary_file_name,
+                                    **binary_file_identity(self.binary_file_name)}
+        return self._input_identity
+
+    def is_of_input(self, state: Dict) -> bool:
+        """ Whether a checkpoint (or a pool manifest segment) was written for this binary file, as it is now."""
+        return all(state.get(key) == value for key, value in self.input_identity.items())
+
+    def load(self) -> Optional[Dict]:
+        if not os.path.exists(self.checkpoint_file):
+            return None
+        with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        for key in ['oligos_per_block_len', 'oligos_per_block_rs_len']:
+            if state[key] != getattr(self, key):
+                raise ValueError(f'{self.checkpoint_file} was written for {key}={state[key]}, '
+                                 f'not {getattr(self, key)}')
+        return state
+
+    def remove(self) -> None:
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+    def save(self, number_of_blocks: int, next_barcode_index: int, file_sizes: Dict[str, int], append: bool,
+             block_index_offset: int) -> None:
+        state = {**self.input_identity,
+                 'oligos_per_block_len': self.oligos_per_block_len,
+                 'oligos_per_block_rs_len': self.oligos_per_block_rs_len,
+                 'append': append,
+                 'block_index_offset': block_index_offset,
+                 'number_of_blocks': number_of_blocks,
+                 'next_barcode_index': next_barcode_index,
+                 'file_sizes': file_sizes}
+        temp_file = f'{self.checkpoint_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_file, self.checkpoint_file)
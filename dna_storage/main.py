@@ -1,9 +1,11 @@
 from dna_storage.fastq_handling import FastqHandling
-from dna_storage.text_handling import TextFileToBinaryFile, DecoderResultToBinary, BinaryResultToText
+from dna_storage.text_handling import TextFileToBinaryFile, DecoderResultToBinary, BinaryResultToText, BinaryResultToBytes
 from dna_storage.decoder import Decoder
 from dna_storage.encoder import Encoder
 from dna_storage.mock_synthesizer import Synthesizer
-from dna_storage.shuffle_and_sort import shuffle, sort_oligo_file, sample_oligos_from_file
+from dna_storage.pool_manifest import PoolManifest
+from dna_storage.shuffle_and_sort import shuffle, sort_oligo_file, sample_oligos_from_file, \
+    sample_oligos_from_counted_pool
 
 
 def main(config):
@@ -16,7 +18,10 @@ def main(config):
                                                    payload_len=config['payload_len'],
                                                    bits_per_z=config['algorithm_config']['bits_per_z'],
                                                    oligos_per_block_len=config['oligos_per_block_len'],
-                                                   k_mer=config['k_mer'])
+                                                   k_mer=config['k_mer'],
+                                                   binary_format=config['binary_file_format'],
+                                                   input_mode=config['input_file_mode'],
+                                                   number_of_processes=config['text_to_binary_number_of_processes'])
         text_file_to_binary.run()
 
     # Encode
@@ -42,9 +47,19 @@ def main(config):
                           payload_coder_vt_syndrome=config['payload_coder_vt_syndrome'],
                           results_file=config['encoder_results_file'],
                           results_file_without_rs_wide=config['encoder_results_file_without_rs_wide'],
+                          results_file_compressed=config['encoder_results_file_compressed'],
+                          number_of_processes=config['encoder_number_of_processes'],
+                          checkpoint_interval_blocks=config['encoder_checkpoint_interval_blocks'],
+                          resume=config['encoder_resume'],
+                          append=config['encoder_append'],
+                          block_index_offset=config['encoder_block_index_offset'],
                           z_to_binary=config['algorithm_config']['z_to_binary'],
                           z_to_k_mer_in_binary_representative=config['algorithm_config']['z_to_k_mer_representative'])
-        if IS_NEW_ENCODING_DECODING:
+        if config['do_synthesize'] and config['encoder_stream_to_synthesizer']:
+            # encoded lazily while the synthesizer consumes the oligos, see number_of_blocks below
+            encoded_oligos = encoder.stream(encoding='encode_block_new_encoding' if IS_NEW_ENCODING_DECODING
+                                            else 'encode_block', write_files=config['encoder_write_files'])
+        elif IS_NEW_ENCODING_DECODING:
             number_of_blocks = encoder.run_new_encoding()
         else:
             number_of_blocks = encoder.run()
@@ -57,14 +72,19 @@ def main(config):
                                   synthesis_config=config['synthesis'],
                                   barcode_total_len=config['barcode_total_len'],
                                   subset_size=config['algorithm_config']['subset_size'],
-                                  k_mer_representative_to_z=config['algorithm_config']['k_mer_representative_to_z'],
+                                  z_to_k_mer_representative=config['algorithm_config']['z_to_k_mer_representative'],
                                   k_mer_to_dna=config['algorithm_config']['k_mer_to_dna'],
                                   k_mer=config['k_mer'],
-                                  mode=config['mode'])
-        synthesizer.synthesize()
+                                  number_of_processes=config['synthesis_number_of_processes'],
+                                  count_compressed=config['pool_count_compressed'])
+        if config['do_encode'] and config['encoder_stream_to_synthesizer']:
+            synthesizer.synthesize(oligos=encoded_oligos)
+            number_of_blocks = encoder.number_of_blocks
+        else:
+            synthesizer.synthesize()
 
     # Shuffling the sorted synthesis results
-    if config['do_shuffle']:
+    if config['do_shuffle'] and not config['pool_count_compressed']:
         print(f"4. shuffle")
         shuffle(shuffle_db_file=config['shuffle_db_file'],
                 input_file=config['synthesis_results_file'],
@@ -73,10 +93,17 @@ def main(config):
     # Sample from the shuffled synthesis results
     if config['do_sample_oligos_from_file']:
         print(f"5. sample oligos from file")
-        sample_oligos_from_file(input_file=config['shuffle_results_file'],
-                                output_file=config['sample_oligos_results_file'],
-                                number_of_oligos=config['number_of_sampled_oligos_from_file'],
-                                number_of_blocks=number_of_blocks)
+        if config['pool_count_compressed']:
+            sample_oligos_from_counted_pool(input_file=config['synthesis_results_file'],
+                                            output_file=config['sample_oligos_results_file'],
+                                            number_of_oligos=config['number_of_sampled_oligos_from_file'],
+                                            number_of_blocks=number_of_blocks,
+                                            seed=config['synthesis']['seed'])
+        else:
+            sample_oligos_from_file(input_file=config['shuffle_results_file'],
+                                    output_file=config['sample_oligos_results_file'],
+                                    number_of_oligos=config['number_of_sampled_oligos_from_file'],
+                                    number_of_blocks=number_of_blocks)
 
     # Sorting the shuffled synthesis results
     if config['do_sort_oligo_file']:
@@ -134,18 +161,34 @@ def main(config):
 
     if config['decoder_results_to_binary']:
         print(f"9. results to binary")
+        barcode_index_range = None
+        if config['decode_pool_segment'] is not None:
+            # only the data of one encoding run of an appended pool, it has its own padding trailer
+            barcode_index_range = PoolManifest(manifest_file=f"{config['encoder_results_file']}.manifest",
+                                               oligos_per_block_len=config['oligos_per_block_len'],
+                                               oligos_per_block_rs_len=config['oligos_per_block_rs_len'],
+                                               ).barcode_index_range(segment_index=config['decode_pool_segment'])
         decoder_results_to_binary = DecoderResultToBinary(input_file=config['decoder_results_file'],
                                                           output_file=config['binary_results_file'],
-                                                          barcode_len=config['barcode_len'])
+                                                          barcode_len=config['barcode_len'],
+                                                          barcode_index_range=barcode_index_range)
         decoder_results_to_binary.run()
 
     if config['binary_results_to_text']:
-        print(f"10. binary results to text")
-        binary_results_to_text = BinaryResultToText(input_file=config['binary_results_file'],
-                                                    output_file=config['text_results_file'],
-                                                    barcode_len=config['barcode_len'],
-                                                    payload_len=config['payload_len'],
-                                                    bits_per_z=config['algorithm_config']['bits_per_z'])
+        if config['input_file_mode'] == 'bytes':
+            print(f"10. binary results to bytes")
+            binary_results_to_text = BinaryResultToBytes(input_file=config['binary_results_file'],
+                                                         output_file=config['text_results_file'],
+                                                         barcode_len=config['barcode_len'],
+                                                         payload_len=config['payload_len'],
+                                                         bits_per_z=config['algorithm_config']['bits_per_z'])
+        else:
+            print(f"10. binary results to text")
+            binary_results_to_text = BinaryResultToText(input_file=config['binary_results_file'],
+                                                        output_file=config['text_results_file'],
+                                                        barcode_len=config['barcode_len'],
+                                                        payload_len=config['payload_len'],
+                                                        bits_per_z=config['algorithm_config']['bits_per_z'])
         binary_results_to_text.run()
 
 
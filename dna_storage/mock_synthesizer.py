@@ -1,11 +1,20 @@
-import itertools
+from multiprocessing import Pool
 from pathlib import Path
 import random
-from typing import Union, Dict, List
+from typing import Union, Dict, List, Iterable, Iterator, Optional, Sequence, Tuple
 
 import numpy as np
 
-from dna_storage.utils import chunker
+from dna_storage.encoder import EncodedOligo
+from dna_storage.oligo_pool import count_reads
+from dna_storage.utils import seed_sequence
+from dna_storage.symbols import X_ERASURE, line_to_oligo, x_from_name, x_tuple_values_to_int, z_keys_to_int
+
+_BASES = np.frombuffer(b'ACGT', dtype=np.uint8)
+# _OTHER_BASES[letter] = the three other bases (ASCII codes), the choices of a substitution of letter
+_OTHER_BASES = np.repeat(np.arange(256, dtype=np.uint8)[:, np.newaxis], 3, axis=1)
+for _base in _BASES:
+    _OTHER_BASES[_base] = _BASES[_BASES != _base]
 
 
 class Synthesizer:
@@ -14,73 +23,125 @@ class Synthesizer:
                  synthesis_config: Dict,
                  barcode_total_len: int,
                  subset_size: int,
-                 k_mer_representative_to_z: Dict,
+                 z_to_k_mer_representative: Dict,
                  k_mer_to_dna: Dict,
                  k_mer: int,
-                 mode: str):
+                 number_of_processes: int = 1,
+                 oligos_per_task: int = 64,
+                 count_compressed: bool = False):
         self.input_file = input_file
         self.results_file = results_file
         open(self.results_file, 'w').close()
         self.synthesis_config = synthesis_config
         self.barcode_total_len = barcode_total_len
         self.subset_size = subset_size
-        self.k_mer_representative_to_z = k_mer_representative_to_z
         self.k_mer_to_dna = k_mer_to_dna
         self.k_mer = k_mer
-        self.mode = mode
+        self.number_of_processes = number_of_processes
+        self.oligos_per_task = oligos_per_task
+        self.count_compressed = count_compressed
+        # dense inverse index: the X tuple (integer X symbols) of every integer Z, (Z, subset_size)
+        z_to_x_tuple = x_tuple_values_to_int(z_keys_to_int(z_to_k_mer_representative))
+        self._z_to_x_tuple = np.full((max(z_to_x_tuple) + 1, subset_size), X_ERASURE, dtype=np.int64)
+        for z, x_tuple in z_to_x_tuple.items():
+            self._z_to_x_tuple[z] = x_tuple
+        # the nucleotides (ASCII codes) of every X, (X, k_mer)
+        x_to_dna = {x_from_name(x): dna for x, dna in k_mer_to_dna.items()}
+        self._x_to_dna = np.zeros((max(x_to_dna) + 1, k_mer), dtype=np.uint8)
+        for x, dna in x_to_dna.items():
+            self._x_to_dna[x] = np.frombuffer(dna.encode('ascii'), dtype=np.uint8)
+        # the nucleotides of the choice-th k-mer of the subset of Z: (Z, subset_size, k_mer)
+        self._z_choice_to_dna = self._x_to_dna[self._z_to_x_tuple]
+        # the k-mers of the dictionary, the choices of a k-mer insertion
+        self._k_mers_dna = self._x_to_dna[sorted(x_to_dna)]
+
+    def synthesize(self, oligos: Optional[Iterable[EncodedOligo]] = None):
+        """ Synthesizes the oligos of input_file, or the records of Encoder.stream() when oligos is given. The i-th
+        oligo draws from its own generator, the i-th child of the SeedSequence of synthesis_config['seed'], so the
+        results only depend on the seed, whatever the number of processes (seed None: a fresh seed). The seed is
+        written to results_file.seed."""
+        root_seed = seed_sequence(self.synthesis_config['seed'], results_file=self.results_file)
+        if oligos is None:
+            barcodes_and_payloads = self.read_input_oligos()
+        else:
+            barcodes_and_payloads = ((oligo.barcode, oligo.payload) for oligo in oligos)
+        with open(self.results_file, 'w+', encoding='utf-8') as results_file:
+            for reads in self.iter_synthesized_oligos(enumerate(barcodes_and_payloads), root_seed):
+                results_file.write(reads)
+
+    def iter_synthesized_oligos(self, indexed_oligos: Iterable[Tuple[int, Tuple[str, Sequence[int]]]],
+                                root_seed: np.random.SeedSequence) -> Iterator[str]:
+        """ The reads of every oligo, in order. Oligos are synthesized in a process pool when number_of_processes > 1."""
+        if self.number_of_processes == 1:
+            for index, (barcode, payload) in indexed_oligos:
+                yield self.synthesize_oligo(barcode=barcode, payload=payload, rng=oligo_rng(root_seed, index))
+            return
+        with Pool(self.number_of_processes, initializer=init_synthesizer_worker, initargs=(self, root_seed)) as pool:
+            yield from pool.imap(synthesize_oligo_in_worker, indexed_oligos, chunksize=self.oligos_per_task)
+
+    def synthesize_oligo(self, barcode: str, payload: Sequence[int], rng: np.random.Generator) -> str:
+        """ The synthesized copies of one oligo, a line each, or a line per distinct copy with its number of copies
+        when count_compressed. Every copy draws each payload k-mer uniformly from the subset of its Z."""
+        number_of_copies = max(1, int(round(rng.normal(self.synthesis_config['number_of_oligos_per_barcode'],
+                                                       scale=10))))
+        barcode_mat = np.frombuffer(barcode.encode('ascii'), dtype=np.uint8)[np.newaxis, :].repeat(number_of_copies,
+                                                                                                    axis=0)
+        choices = rng.integers(0, self.subset_size, size=(number_of_copies, len(payload)))
+        payload_mat = self._z_choice_to_dna[np.asarray(payload)[np.newaxis, :], choices].reshape(number_of_copies, -1)
+
+        barcode_letters, barcode_valid = self.insertion_deletion_substitution(barcode_mat, group_size=1, rng=rng)
+        payload_letters, payload_valid = self.insertion_deletion_substitution(payload_mat, group_size=self.k_mer,
+                                                                              rng=rng)
+        if self.count_compressed:
+            return count_reads(np.hstack((barcode_letters, payload_letters)), np.hstack((barcode_valid, payload_valid)))
+        newline = np.full((number_of_copies, 1), ord('\n'), dtype=np.uint8)
+        letters = np.hstack((barcode_letters, payload_letters, newline))
+        valid = np.hstack((barcode_valid, payload_valid, np.ones(newline.shape, dtype=bool)))
+        return letters[valid].tobytes().decode('ascii')
 
-    def synthesize(self):
-        if self.mode == 'test':
-            np.random.seed(self.synthesis_config['seed'])
-            random.seed(self.synthesis_config['seed'])
-        with open(self.input_file, 'r', encoding='utf-8') as input_file, open(self.results_file, 'w+', encoding='utf-8') as results_file:
+    def read_input_oligos(self) -> Iterator[Tuple[str, List[int]]]:
+        with open(self.input_file, 'r', encoding='utf-8') as input_file:
             for line in input_file:
-                line_list = line.strip('\n').split(',')
-                barcode, payload = line_list[0], line_list[1:]
-                x_list = self.get_x_list(payload=payload)
-                number_of_nuc = max(1, int(round(np.random.normal(self.synthesis_config['number_of_oligos_per_barcode'],scale=10))))
-                x_mat = np.empty([number_of_nuc, self.barcode_total_len], dtype=np.dtype(('U', 5)))
-                x_mat[:] = np.array(tuple(barcode))
-                for idx, x_tuple in enumerate(x_list, 1):
-                    vec = np.random.choice(x_tuple, size=(number_of_nuc,))
-                    col = np.array([tuple(self.k_mer_to_dna[k_mer]) for k_mer in vec])
-                    x_mat = np.hstack((x_mat, col))
-
-                barcode_list = [''.join(row) for row in x_mat[:, :self.barcode_total_len]]
-                payload_list = [''.join(row) for row in x_mat[:, self.barcode_total_len:]]
-                barcode_list = self.insertion_deletion_substitution(barcode_list, group_size=1)
-                payload_list = self.insertion_deletion_substitution(payload_list, group_size=self.k_mer)
-                dna_list = [b + p for b, p in zip(barcode_list, payload_list)]
-                results_file.write('\n'.join(dna_list) + '\n')
-
-    def insertion_deletion_substitution(self, dna_list: List[str], group_size: int = 1):
-        choose_from = 'ACGT' if group_size == 1 else list(self.k_mer_to_dna.values())
-        choose_from_set = set(choose_from)
-        bitmap_length = int(len(dna_list[0]) / group_size)
-        for row_idx, oligo in enumerate(dna_list):
-            deletion = np.random.binomial(1, self.synthesis_config['letter_deletion_error_ratio'], bitmap_length)
-            oligo = ''.join([group if deletion[idx] == 0 else '' for idx, group in enumerate(chunker(oligo, group_size))])
-            insertion_idx = np.random.binomial(1, self.synthesis_config['letter_insertion_error_ratio'], bitmap_length)
-            insertion = [random.choice(choose_from) if i == 1 else '' for i in insertion_idx]
-            oligo = ''.join(''.join(x) for x in itertools.zip_longest(chunker(oligo, group_size), insertion, fillvalue=''))
-            substitution_idx = np.random.binomial(1, self.synthesis_config['letter_substitution_error_ratio'], len(oligo))
-            oligo_with_letters_substitution = [''] * len(oligo)
-            for letter_idx, letter in enumerate(oligo):
-                if substitution_idx[letter_idx] == 1:
-                    diff = {'A', 'C', 'G', 'T'} - set(letter)
-                    oligo_with_letters_substitution[letter_idx] = random.choice(''.join(diff))
-                else:
-                    oligo_with_letters_substitution[letter_idx] = letter
-            dna_list[row_idx] = ''.join(oligo_with_letters_substitution)
-        return dna_list
-
-    def get_x_list(self, payload: List[str]):
-        x_list = []
-        for z in payload:
-            for key, val, in self.k_mer_representative_to_z.items():
-                if val == z:
-                    x_list.append(key)
-        return x_list
+                yield line_to_oligo(line)
+
+    def insertion_deletion_substitution(self, mat: np.ndarray, group_size: int,
+                                        rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """ Synthesis errors of all the rows of mat (ASCII codes) at once. Groups of group_size letters are deleted
+        with letter_deletion_error_ratio; the i-th remaining group is followed by a random letter (group_size 1) or
+        dictionary k-mer with letter_insertion_error_ratio; every letter is then substituted by another base with
+        letter_substitution_error_ratio. Returns the letters (rows, 2 * row length), each group followed by its
+        insertion slot, and the mask of the letters that are in the reads."""
+        rows, number_of_groups = mat.shape[0], mat.shape[1] // group_size
+        groups = mat.reshape(rows, number_of_groups, group_size)
+        deleted = self._error_mask('letter_deletion_error_ratio', (rows, number_of_groups), rng)
+        # the remaining groups move to the left, in order
+        order = np.argsort(deleted, axis=1, kind='stable')
+        kept = np.take_along_axis(groups, order[:, :, np.newaxis], axis=1)
+        kept_valid = np.arange(number_of_groups)[np.newaxis, :] < (~deleted).sum(axis=1)[:, np.newaxis]
+
+        inserted_valid = self._error_mask('letter_insertion_error_ratio', (rows, number_of_groups), rng)
+        choose_from = _BASES[:, np.newaxis] if group_size == 1 else self._k_mers_dna
+        inserted = np.zeros_like(kept)
+        if inserted_valid.any():
+            inserted = choose_from[rng.integers(0, len(choose_from), size=(rows, number_of_groups))]
+
+        letters = np.stack((kept, inserted), axis=2).reshape(rows, -1)
+        valid = np.repeat(np.stack((kept_valid, inserted_valid), axis=2).reshape(rows, -1), group_size, axis=1)
+        substituted = self._error_mask('letter_substitution_error_ratio', letters.shape, rng)
+        if substituted.any():
+            other_bases = _OTHER_BASES[letters, rng.integers(0, 3, size=letters.shape)]
+            letters = np.where(substituted, other_bases, letters)
+        return letters, valid
+
+    def _error_mask(self, error_ratio_key: str, shape: Tuple[int, ...], rng: np.random.Generator) -> np.ndarray:
+        error_ratio = self.synthesis_config[error_ratio_key]
+        if error_ratio == 0:
+            return np.zeros(shape, dtype=bool)
+        return rng.random(shape) < error_ratio
+
+    def get_x_list(self, payload: Sequence[int]) -> List[Tuple[int, ...]]:
+        """ The X tuples of the Z symbols of payload."""
+        return [tuple(x_tuple) for x_tuple in self._z_to_x_tuple[np.asarray(payload)].tolist()]
 
     def constrained_sum_sample_pos(self, n, total):
         """Return a randomly chosen list of n positive integers summing to total.
@@ -88,3 +149,29 @@ class Synthesizer:
 
         dividers = sorted(random.sample(range(1, total), n - 1))
         return [a - b for a, b in zip(dividers + [total], [0] + dividers)]
+
+
+def oligo_rng(root_seed: np.random.SeedSequence, index: int) -> np.random.Generator:
+    """ The generator of the index-th oligo: the index-th child of root_seed.spawn, without spawning the ones before."""
+    return np.random.default_rng(np.random.SeedSequence(root_seed.entropy, spawn_key=root_seed.spawn_key + (index,)))
+
+
+#################################################################
+# Process pool workers: every worker gets its own copy of the synthesizer
+# once (initializer) and then only receives the indexed oligos.
+#################################################################
+
+_worker_synthesizer = None
+_worker_root_seed = None
+
+
+def init_synthesizer_worker(synthesizer: Synthesizer, root_seed: np.random.SeedSequence) -> None:
+    global _worker_synthesizer, _worker_root_seed
+    _worker_synthesizer = synthesizer
+    _worker_root_seed = root_seed
+
+
+def synthesize_oligo_in_worker(indexed_oligo: Tuple[int, Tuple[str, Sequence[int]]]) -> str:
+    index, (barcode, payload) = indexed_oligo
+    return _worker_synthesizer.synthesize_oligo(barcode=barcode, payload=payload,
+                                                rng=oligo_rng(_worker_root_seed, index))
@@ -0,0 +1,57 @@
+from pathlib import Path
+from typing import Tuple, Union
+
+import numpy as np
+
+#################################################################
+# Count-compressed oligo pools
+#
+# A pool file (synthesis, sampling and sorting results) holds a read per
+# line. In a count-compressed pool every distinct read is written once,
+# followed by a space and its number of copies: 'ACGT...TGA 37'. A line
+# without a count is a single copy, so plain pools are count-compressed
+# pools too, and every reader of pool files reads both.
+#################################################################
+
+
+def pool_line(read: str, count: int) -> str:
+    return read if count == 1 else f'{read} {count}'
+
+
+def parse_pool_line(line: str) -> Tuple[str, int]:
+    """ The read and the number of copies of a pool line."""
+    fields = line.rstrip('\n').split(sep=' ')
+    count = int(fields[1]) if len(fields) > 1 and fields[1] else 1
+    return fields[0].rstrip(), count
+
+
+def count_reads(letters: np.ndarray, valid: np.ndarray) -> str:
+    """ The pool lines of the distinct reads of a matrix of letters (ASCII codes), the letters of every read being the
+    ones of its row where valid is set, with their numbers of copies."""
+    # move the letters of every read to the left, so equal reads get equal rows
+    order = np.argsort(~valid, axis=1, kind='stable')
+    compact = np.where(np.take_along_axis(valid, order, axis=1), np.take_along_axis(letters, order, axis=1), 0)
+    reads, counts = np.unique(compact, axis=0, return_counts=True)
+    return ''.join([pool_line(read.tobytes().rstrip(b'\0').decode('ascii'), int(count)) + '\n'
+                    for read, count in zip(reads, counts)])
+
+
+def sample_pool(input_file: Union[Path, str], output_file: Union[Path, str], number_of_oligos: int,
+                rng: np.random.Generator) -> None:
+    """ Draws number_of_oligos of the copies of a pool without replacement, as the first number_of_oligos lines of a
+    shuffled plain pool would be (all the copies if there are fewer): a multivariate hypergeometric draw over the
+    counts, made line by line so the pool is streamed (twice) and never held in memory. Writes a count-compressed
+    pool of the drawn reads."""
+    with open(input_file, 'r', encoding='utf-8') as f:
+        remaining_copies = sum(parse_pool_line(line)[1] for line in f)
+    remaining_oligos = min(number_of_oligos, remaining_copies)
+    with open(input_file, 'r', encoding='utf-8') as f, open(output_file, 'w', encoding='utf-8') as out:
+        for line in f:
+            if remaining_oligos == 0:
+                break
+            read, count = parse_pool_line(line)
+            drawn = int(rng.hypergeometric(count, remaining_copies - count, remaining_oligos))
+            remaining_oligos -= drawn
+            remaining_copies -= count
+            if drawn > 0:
+                out.write(pool_line(read, drawn) + '\n')
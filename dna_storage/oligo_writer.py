@@ -0,0 +1,80 @@
+import gzip
+from typing import Dict, List, Optional
+
+from dna_storage.config import PathLike
+
+#################################################################
+# @ Class: OligoWriter
+# @ Description: Buffered writer for the encoder results files.
+#                Every sink is opened once for the whole run, lines
+#                are batched in memory and written on flush (the
+#                encoder flushes on every block boundary).
+#################################################################
+
+
+class OligoFileSink:
+    """ A single output file, plain text or gzip compressed (compress=True)."""
+    def __init__(self, file_name: PathLike, compress: bool = False, mode: str = 'w'):
+        self.file_name = file_name
+        self.compress = compress
+        if compress:
+            self._file = gzip.open(file_name, mode + 't', encoding='utf-8')
+        else:
+            self._file = open(file_name, mode, encoding='utf-8')
+        self.number_of_lines = 0
+
+    def write_lines(self, lines: List[str]) -> None:
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+        self.number_of_lines += len(lines)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class OligoWriter:
+    def __init__(self, sinks: Dict[str, OligoFileSink], max_buffered_lines: int = 2 ** 16):
+        self.sinks = sinks
+        self.max_buffered_lines = max_buffered_lines
+        self._buffers = {name: [] for name in sinks}
+
+    def write(self, oligo: str, *sink_names: str) -> None:
+        for name in sink_names:
+            buffer = self._buffers[name]
+            buffer.append(oligo)
+            if len(buffer) >= self.max_buffered_lines:
+                self._flush_sink(name)
+
+    def flush(self) -> None:
+        for name in self.sinks:
+            self._flush_sink(name)
+
+    def _flush_sink(self, name: str) -> None:
+        buffer = self._buffers[name]
+        if buffer:
+            self.sinks[name].write_lines(buffer)
+            self._buffers[name] = []
+
+    def close(self) -> None:
+        self.flush()
+        for sink in self.sinks.values():
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def open_oligo_writer(results_file: PathLike,
+                      results_file_without_rs_wide: PathLike,
+                      results_file_compressed: Optional[PathLike] = None,
+                      mode: str = 'w') -> OligoWriter:
+    """ The encoder sinks: 'results' (every oligo), 'without_rs_wide' (no wide RS oligos) and the
+    optional gzip copy of 'results'."""
+    sinks = {'results': OligoFileSink(results_file, mode=mode),
+             'without_rs_wide': OligoFileSink(results_file_without_rs_wide, mode=mode)}
+    if results_file_compressed is not None:
+        sinks['results_compressed'] = OligoFileSink(results_file_compressed, compress=True, mode=mode)
+    return OligoWriter(sinks=sinks)
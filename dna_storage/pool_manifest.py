@@ -0,0 +1,72 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+#################################################################
+# @ Class: PoolManifest
+# @ Description: Sidecar file of an encoded oligo pool, rewritten at the
+#                end of every encoding run. It holds the number of
+#                blocks and the next free barcode index, so new data can
+#                be appended in new blocks, and one segment per encoding
+#                run: the barcode range of the run and its padding
+#                trailer (every run pads its own last block).
+#################################################################
+
+
+class PoolManifest:
+    def __init__(self, manifest_file: Union[Path, str],
+                 oligos_per_block_len: int,
+                 oligos_per_block_rs_len: int):
+        self.manifest_file = manifest_file
+        self.oligos_per_block_len = oligos_per_block_len
+        self.oligos_per_block_rs_len = oligos_per_block_rs_len
+
+    def load(self) -> Optional[Dict]:
+        if not os.path.exists(self.manifest_file):
+            return None
+        with open(self.manifest_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        for key in ['oligos_per_block_len', 'oligos_per_block_rs_len']:
+            if state[key] != getattr(self, key):
+                raise ValueError(f'The pool of {self.manifest_file} has {key}={state[key]}, not {getattr(self, key)}')
+        return state
+
+    def add_segment(self, state: Optional[Dict], binary_file_name: Union[Path, str], first_block_index: int,
+                    number_of_blocks: int, number_of_padding_rows: Optional[int], z_fill: Optional[int],
+                    input_identity: Optional[Dict] = None) -> Dict:
+        """ Adds the blocks of one encoding run to state (None for a new pool) and writes the manifest. The segment
+        of the same binary file at the same first block, written by the run before it was resumed, is replaced.
+        input_identity: the size and SHA-256 of the binary file (see binary_file_identity), kept in the segment."""
+        oligos_per_block_total_len = self.oligos_per_block_len + self.oligos_per_block_rs_len
+        if state is None:
+            state = {'oligos_per_block_len': self.oligos_per_block_len,
+                     'oligos_per_block_rs_len': self.oligos_per_block_rs_len,
+                     'segments': []}
+        state['segments'] = [segment for segment in state['segments']
+                             if (segment['binary_file_name'], segment['first_block_index'])
+                             != (str(binary_file_name), first_block_index)]
+        state['segments'].append({'binary_file_name': str(binary_file_name),
+                                  'first_block_index': first_block_index,
+                                  'number_of_blocks': number_of_blocks,
+                                  'first_barcode_index': first_block_index * oligos_per_block_total_len,
+                                  'number_of_padding_rows': number_of_padding_rows,
+                                  'z_fill': z_fill,
+                                  **(input_identity or {})})
+        state['number_of_blocks'] = first_block_index + number_of_blocks
+        state['next_barcode_index'] = state['number_of_blocks'] * oligos_per_block_total_len
+        temp_file = f'{self.manifest_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=1)
+        os.replace(temp_file, self.manifest_file)
+        return state
+
+    def barcode_index_range(self, segment_index: int) -> Tuple[int, int]:
+        """ The barcode indices [first, stop) of one segment, e.g. for DecoderResultToBinary."""
+        state = self.load()
+        if state is None:
+            raise ValueError(f'There is no pool manifest {self.manifest_file}')
+        segment = state['segments'][segment_index]
+        oligos_per_block_total_len = self.oligos_per_block_len + self.oligos_per_block_rs_len
+        return (segment['first_barcode_index'],
+                segment['first_barcode_index'] + segment['number_of_blocks'] * oligos_per_block_total_len)
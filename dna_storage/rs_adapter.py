@@ -1,16 +1,87 @@
+import functools
 import itertools
-from typing import Dict
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
 
 import numpy as np
 from unireedsolomon.unireedsolomon import rs, RSCodecError
 from unireedsolomon.unireedsolomon import ff
+from dna_storage.barcode_table import EncodedBarcodeTable
+from dna_storage.rs_engine import RSCodec
 from dna_storage.vt_syndrome import VTSyndrome
 from dna_storage import utils as uts
+from dna_storage.symbols import Z_ERASURE, z_values_to_int
+
+
+#################################################################
+# @ Class: GlobalFieldRSCoder
+# @ Description: unireedsolomon's RSCoder, whose field tables are module
+#                globals of unireedsolomon.ff: every call installs the
+#                tables of this coder, so coders of different fields can
+#                be used side by side. The legacy 'unireedsolomon'
+#                backend, kept to check the NumPy engine against: it is
+#                single-threaded, the lock shared by all the instances
+#                only keeps a stray second thread from corrupting the
+#                globals and serializes every call. Threaded callers
+#                use the 'numpy' backend, the default everywhere.
+#################################################################
+
+_ff_lock = threading.Lock()
+
+
+class GlobalFieldRSCoder:
+    def __init__(self, n: int, k: int, generator: int, prim: int, c_exp: int):
+        with _ff_lock:
+            self._coder = rs.RSCoder(n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+            self._ff_globals = ff.get_globals()
+
+    def _call(self, method: str, *args, **kwargs):
+        with _ff_lock:
+            ff.set_globals(*self._ff_globals)
+            return getattr(self._coder, method)(*args, **kwargs)
+
+    def encode(self, *args, **kwargs):
+        return self._call('encode', *args, **kwargs)
+
+    def encode_fast(self, *args, **kwargs):
+        return self._call('encode_fast', *args, **kwargs)
+
+    def check(self, *args, **kwargs):
+        return self._call('check', *args, **kwargs)
+
+    def check_fast(self, *args, **kwargs):
+        return self._call('check_fast', *args, **kwargs)
+
+    def decode(self, *args, **kwargs):
+        return self._call('decode', *args, **kwargs)
+
+
+def rs_coder(backend: str, n: int, k: int, generator: int, prim: int,
+             c_exp: int) -> Union[GlobalFieldRSCoder, RSCodec]:
+    """ The RS coder of the adapters: 'numpy' (dna_storage.rs_engine, thread safe) or the single-threaded legacy
+    'unireedsolomon' (GlobalFieldRSCoder), with identical results."""
+    if backend == 'numpy':
+        return RSCodec(n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+    if backend == 'unireedsolomon':
+        return GlobalFieldRSCoder(n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+    raise ValueError(f'Unknown RS backend {backend}')
+
+
+def block_coder(coder: Union[GlobalFieldRSCoder, RSCodec], n: int, k: int, generator: int, prim: int,
+                c_exp: int) -> RSCodec:
+    """ The coder of the *_block methods, which always run on the NumPy engine."""
+    if isinstance(coder, RSCodec):
+        return coder
+    return RSCodec(n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+
 
 class RSBarcodeAdapter:
-    def __init__(self, bits_per_z, barcode_len, barcode_rs_len):
+    def __init__(self, bits_per_z, barcode_len, barcode_rs_len, cache_dir: Optional[Union[Path, str]] = None,
+                 backend: str = 'numpy', decode_cache_size: Optional[int] = 2 ** 16):
         self.bits_per_z = bits_per_z
         self._barcode_len = barcode_len
+        self._barcode_rs_len = barcode_rs_len
         alphabet = list(itertools.product('ACGT', 'ACGT'))
         n = int((barcode_len + barcode_rs_len) / 2)
         k = int(barcode_len / 2)
@@ -18,36 +89,88 @@ class RSBarcodeAdapter:
         generator = 3
         prim = ff.find_prime_polynomials(generator=generator, c_exp=c_exp, fast_primes=False, single=True)
 
-        self._barcode_coder = rs.RSCoder(n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
-        self.ff_globals = ff.get_globals()
+        self._barcode_coder = rs_coder(backend, n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+        self._block_coder = block_coder(self._barcode_coder, n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
         self._barcode_pair_to_int = {''.join(vv): i for i, vv in enumerate(alphabet)}
+        # the index of every base by its ASCII code, -1 for any other byte; a pair of bases is 4 * first + second
+        self._base_to_int = np.full(256, -1, dtype=np.int64)
+        for i, base in enumerate('ACGT'):
+            self._base_to_int[ord(base)] = i
         self._int_to_barcode_pairs = {i: vv for vv, i in self._barcode_pair_to_int.items()}
+        cache_file = None
+        if cache_dir is not None:
+            cache_file = Path(cache_dir) / f'barcode_rs_{barcode_len}_{barcode_rs_len}_g{generator}_p{prim}_c{c_exp}.dat'
+        self._encoded_barcode_table = EncodedBarcodeTable(barcode_len=barcode_len, barcode_rs_len=barcode_rs_len,
+                                                          encode_barcode=self.encode, cache_file=cache_file)
+        # decode_cache_size=None: unbounded
+        self._decode_cache_size = decode_cache_size
+        self._decode_cached = functools.lru_cache(maxsize=decode_cache_size)(self._decode)
+
+    def __getstate__(self):
+        # the decode cache wraps a bound method, which can't be pickled: the receiving process starts a new one
+        state = self.__dict__.copy()
+        del state['_decode_cached']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._decode_cached = functools.lru_cache(maxsize=self._decode_cache_size)(self._decode)
+
+    def encode_range(self, start: int, stop: int) -> List[str]:
+        """ The encoded barcodes of the barcode indices start..stop-1, looked up in the encoded barcode table."""
+        barcode_total_len = self._barcode_len + self._barcode_rs_len
+        data = self._encoded_barcode_table.encoded_range(start, stop).tobytes().decode('ascii')
+        return [data[pos:pos + barcode_total_len] for pos in range(0, len(data), barcode_total_len)]
 
     def encode(self, barcode):
-        ff.set_globals(*self.ff_globals)
         barcode_as_int = [self._barcode_pair_to_int[''.join(barcode[i:i + 2])] for i in range(0, len(barcode), 2)]
         barcode_encoded_as_polynomial = self._barcode_coder.encode(barcode_as_int, return_string=False)
         barcode_encoded = ''.join([self._int_to_barcode_pairs[z] for z in barcode_encoded_as_polynomial])
         return barcode_encoded
 
-    def decode(self, barcode_encoded):
-        ff.set_globals(*self.ff_globals)
-        barcode_encoded_as_int = [self._barcode_pair_to_int[''.join(barcode_encoded[i:i + 2])]
+    def decode(self, barcode_encoded) -> List[str]:
+        """ The decoded barcode (a list of bases) of a received barcode (a string or a list of bases). Reads of the
+        same barcode mostly carry the same few received barcodes, so the results are kept in a bounded LRU cache,
+        keyed by the received barcode string (see decode_cache_info)."""
+        barcode = self._decode_cached(''.join(barcode_encoded))
+        if barcode is None:
+            raise RSCodecError
+        return list(barcode)
+
+    def decode_block(self, barcodes_encoded: List[str]) -> List[Optional[str]]:
+        """ decode() of every received barcode string, None where it can't be decoded. The received barcodes that are
+        codewords are found by one syndrome check over all of them and cut as they are; only the others are decoded,
+        one by one through the decode cache."""
+        barcode_total_len = self._barcode_len + self._barcode_rs_len
+        candidates = [i for i, barcode in enumerate(barcodes_encoded) if len(barcode) == barcode_total_len]
+        is_codeword = np.zeros(len(barcodes_encoded), dtype=bool)
+        if candidates:
+            data = ''.join([barcodes_encoded[i] for i in candidates]).encode('ascii', errors='replace')
+            bases = self._base_to_int[np.frombuffer(data, dtype=np.uint8)].reshape(len(candidates), barcode_total_len)
+            valid = (bases >= 0).all(axis=1)
+            symbols = np.where(valid[:, np.newaxis], 4 * bases[:, 0::2] + bases[:, 1::2], 0)
+            is_codeword[candidates] = valid & self._block_coder.check_block(symbols)
+        return [barcode[:self._barcode_len] if codeword else self._decode_cached(barcode)
+                for barcode, codeword in zip(barcodes_encoded, is_codeword.tolist())]
+
+    def decode_cache_info(self):
+        """ hits, misses, maxsize and currsize of the decode cache."""
+        return self._decode_cached.cache_info()
+
+    def _decode(self, barcode_encoded: str) -> Optional[str]:
+        """ The decoded barcode, None if it can't be decoded."""
+        barcode_encoded_as_int = [self._barcode_pair_to_int[barcode_encoded[i:i + 2]]
                                   for i in range(0, len(barcode_encoded), 2)]
         if self._barcode_coder.check(barcode_encoded_as_int):
             return barcode_encoded[0:self._barcode_len]
-        else:
-            try:
-                barcode_as_int, rs_as_int = self._barcode_coder.decode(barcode_encoded_as_int, nostrip=True,
-                                                                       return_string=False)
-                if not self._barcode_coder.check(barcode_as_int + rs_as_int):
-                    raise RSCodecError
-            except RSCodecError:
-                raise RSCodecError
-            barcode = []
-            for i in barcode_as_int:
-                barcode += list(self._int_to_barcode_pairs[i])
-            return barcode
+        try:
+            barcode_as_int, rs_as_int = self._barcode_coder.decode(barcode_encoded_as_int, nostrip=True,
+                                                                   return_string=False)
+        except RSCodecError:
+            return None
+        if not self._barcode_coder.check(barcode_as_int + rs_as_int):
+            return None
+        return ''.join([self._int_to_barcode_pairs[i] for i in barcode_as_int])
 
 
 # class RSPayloadAdapter:
@@ -89,7 +212,7 @@ class RSBarcodeAdapter:
 
 
 class RSPayloadAdapter:
-    def __init__(self, bits_per_z, payload_len, payload_redundancy_len, payload_rs_len, vt_syndrome_n:int, vt_syndrome_k:int, k_mer_representative_to_z: Dict, z_to_k_mer_representative: Dict, binary_to_z: Dict, binary_to_k_mer_representation: Dict, bits_per_syndrome: int):
+    def __init__(self, bits_per_z, payload_len, payload_redundancy_len, payload_rs_len, vt_syndrome_n:int, vt_syndrome_k:int, k_mer_representative_to_z: Dict, z_to_k_mer_representative: Dict, binary_to_z: Dict, binary_to_k_mer_representation: Dict, bits_per_syndrome: int, backend: str = 'numpy'):
         ###########################
         self.vt_syndrome = None
         # # VT syndrome parameters for alphabet size 7
@@ -113,8 +236,8 @@ class RSPayloadAdapter:
                                       payload_len=payload_len,
                                       payload_redundancy_len=payload_redundancy_len,
                                       binary_to_k_mer_representation=binary_to_k_mer_representation)
-        self.k_mer_representative_to_z = k_mer_representative_to_z
-        self.binary_to_z = binary_to_z
+        self.k_mer_representative_to_z = z_values_to_int(k_mer_representative_to_z)
+        self.binary_to_z = z_values_to_int(binary_to_z)
         self.z_to_k_mer_representative = z_to_k_mer_representative
         self.binary_to_k_mer_representation = binary_to_k_mer_representation
         alphabet = ['Z{}'.format(i) for i in range(1, 2 ** bits_per_z + 1)]
@@ -126,13 +249,16 @@ class RSPayloadAdapter:
         generator = 2
         prim = ff.find_prime_polynomials(generator=generator, c_exp=c_exp, fast_primes=False, single=True)
 
-        self._payload_coder_rs = rs.RSCoder(n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
-        self.ff_globals = ff.get_globals()
+        self._payload_coder_rs = rs_coder(backend, n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
         self._payload_to_int = {''.join(vv): i for i, vv in enumerate(alphabet)}
         self._int_to_payload = {i: vv for vv, i in self._payload_to_int.items()}
+        self._block_coder = block_coder(self._payload_coder_rs, n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+        # Z of the integer value of bits_per_z bits (MSB first)
+        self._value_to_z = np.zeros(2 ** bits_per_z, dtype=np.int64)
+        for binary, z in self.binary_to_z.items():
+            self._value_to_z[uts.bits_to_int(binary)] = z
 
     def encode(self, payload, payload_encoded_after_vt_syndrome, binary_list, xs_array):
-        ff.set_globals(*self.ff_globals)
         # syndrome_array = []
         # xs_vector_array = []
         # xs_array = []
@@ -160,80 +286,122 @@ class RSPayloadAdapter:
                 xs_array.append(xs)
         return payload_encoded
 
+    def encode_block(self, values: np.ndarray) -> np.ndarray:
+        """ encode() of every row of values (rows, payload_len + payload_redundancy_len), the integer values of
+        the payload symbols, at once. Returns the encoded payloads as Z symbols."""
+        syndromes, _ = self.vt_syndrome.encode_block(values)
+        rs_as_gf = self._block_coder.parity_block(syndromes)
+        columns = [self._value_to_z[values[:, :self.payload_len]]]
+        chunk_mask = (1 << self.bits_per_syndrome) - 1
+        for info in values[:, -self.payload_redundancy_len:].T:
+            for j, i in enumerate(range(0, self.bits_per_z, self.bits_per_syndrome)[:self.payload_rs_len]):
+                b_i = (info >> (self.bits_per_z - i - self.bits_per_syndrome)) & chunk_mask
+                r_i = rs_as_gf[:, j]
+                columns.append(self._value_to_z[(r_i << self.bits_per_syndrome) | b_i][:, np.newaxis])
+        return np.hstack(columns)
+
     def decode(self, payload_encoded: list, erasures_pos: list):
-        ff.set_globals(*self.ff_globals)
         # payload_as_int = [self._payload_to_int[z] for z in payload_encoded]
         # if self._payload_coder.check_fast(payload_as_int):
         if self._payload_coder_rs.check_fast(payload_encoded):
             # return payload_encoded[0:self.payload_len]
             return payload_encoded
-        else:
-            try:
-                # Trying to correct erasure error
+        return self._decode_errata(payload_encoded, erasures_pos=erasures_pos)
 
-                # payload_as_gf, rs_as_gf = self._payload_coder.decode(payload_as_int, nostrip=True, return_string=False)
-                # TODO: check why when somtimes we don't succeed in correcting using erasure error,
-                #  we get rs_as_gf the size of 1 instead of size of 2
+    def decode_block(self, codewords: np.ndarray, erasures: np.ndarray) -> np.ndarray:
+        """ decode() of every row of codewords (rows, n), the VT syndromes of a payload each, erasures a boolean mask
+        of the same shape. One syndrome check over all the rows, only the rows that fail it are decoded."""
+        decoded = codewords.copy()
+        for row in np.flatnonzero(~self._block_coder.check_block(codewords)).tolist():
+            decoded[row] = self._decode_errata(codewords[row].tolist(),
+                                               erasures_pos=np.flatnonzero(erasures[row]).tolist())
+        return decoded
+
+    def _decode_errata(self, payload_encoded: list, erasures_pos: list):
+        """ The decoding of a payload that is no codeword, the payload as it is if it can't be decoded."""
+        try:
+            # Trying to correct erasure error
+
+            # payload_as_gf, rs_as_gf = self._payload_coder.decode(payload_as_int, nostrip=True, return_string=False)
+            # TODO: check why when somtimes we don't succeed in correcting using erasure error,
+            #  we get rs_as_gf the size of 1 instead of size of 2
+            payload_as_gf, rs_as_gf = self._payload_coder_rs.decode(payload_encoded,
+                                                                    erasures_pos=erasures_pos,
+                                                                    nostrip=True,
+                                                                    return_string=False)
+            # Didn't succeed in correcting the erasure error, thus try to correct it without erasure
+            if len(payload_as_gf + rs_as_gf) != self.payload_len + self.payload_rs_len:
                 payload_as_gf, rs_as_gf = self._payload_coder_rs.decode(payload_encoded,
-                                                                        erasures_pos=erasures_pos,
                                                                         nostrip=True,
                                                                         return_string=False)
-                # Didn't succeed in correcting the erasure error, thus try to correct it without erasure
-                if len(payload_as_gf + rs_as_gf) != self.payload_len + self.payload_rs_len:
-                    payload_as_gf, rs_as_gf = self._payload_coder_rs.decode(payload_encoded,
-                                                                            nostrip=True,
-                                                                            return_string=False)
 
-                    raise RSCodecError
-            except RSCodecError:
-                # return payload_encoded[0:self.payload_len]
-                return payload_encoded
-            # payload = [self._int_to_payload[i] for i in payload_as_gf]
-            # return payload
-            return payload_as_gf + rs_as_gf
+                raise RSCodecError
+        except RSCodecError:
+            # return payload_encoded[0:self.payload_len]
+            return payload_encoded
+        # payload = [self._int_to_payload[i] for i in payload_as_gf]
+        # return payload
+        return payload_as_gf + rs_as_gf
 
 
 class RSWideAdapter:
-    def __init__(self, bits_per_z, payload_len, payload_rs_len):
+    def __init__(self, bits_per_z, payload_len, payload_rs_len, backend: str = 'numpy'):
         self.bits_per_z = bits_per_z
         self.payload_len = payload_len
-        alphabet = ['Z{}'.format(i) for i in range(1, 2 ** bits_per_z + 1)]
         n = payload_len + payload_rs_len
         k = payload_len
         c_exp = bits_per_z
         generator = 3
         prim = ff.find_prime_polynomials(generator=generator, c_exp=c_exp, fast_primes=False, single=True)
 
-        self._payload_coder = rs.RSCoder(n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
-        self.ff_globals = ff.get_globals()
-        self._payload_to_int = {''.join(vv): i for i, vv in enumerate(alphabet)}
-        self._int_to_payload = {i: vv for vv, i in self._payload_to_int.items()}
+        self._payload_coder = rs_coder(backend, n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+        self._block_coder = block_coder(self._payload_coder, n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+
+    # Z symbols are 1..2**bits_per_z, the field element of Z{i} is i - 1
+    @staticmethod
+    def _z_to_gf(z: int) -> int:
+        return z - 1 if z != Z_ERASURE else 0
+
+    @staticmethod
+    def _gf_to_z(gf: int) -> int:
+        return int(gf) + 1
 
     def encode(self, payload):
-        ff.set_globals(*self.ff_globals)
-        payload_as_int = [self._payload_to_int[z] for z in payload]
-        ff.set_globals(*self.ff_globals)
+        payload_as_int = [self._z_to_gf(z) for z in payload]
         payload_encoded_as_polynomial = self._payload_coder.encode_fast(payload_as_int, return_string=False)
-        payload_encoded = [self._int_to_payload[z] for z in payload_encoded_as_polynomial]
+        payload_encoded = [self._gf_to_z(z) for z in payload_encoded_as_polynomial]
         return payload_encoded
 
+    def encode_block(self, block: np.ndarray) -> np.ndarray:
+        """ encode() of every column of block (payload_len, columns) at once, returns (payload_len + payload_rs_len, columns)."""
+        block_as_gf = np.where(block == Z_ERASURE, 0, block - 1)
+        rs_as_gf = self._block_coder.parity_block(block_as_gf.T).T
+        return np.vstack((block_as_gf, rs_as_gf)) + 1
+
     def decode(self, payload_encoded, erasures_pos: list) -> list:
-        ff.set_globals(*self.ff_globals)
-        # payload_as_int = [self._payload_to_int[z] for z in payload_encoded] # TODO: origin code, lets see if the new payload_as_int code is good enough
         # If erasure then append 0
-        payload_as_int = []
-        for z in payload_encoded:
-            if z == 'Z0':
-                payload_as_int.append(0)
-            else:
-                payload_as_int.append(self._payload_to_int[z])
+        payload_as_int = [self._z_to_gf(z) for z in payload_encoded]
 
         if self._payload_coder.check_fast(payload_as_int):
             return payload_encoded[0:self.payload_len]
-        else:
-            try:
-                payload_as_gf, rs_as_gf = self._payload_coder.decode(payload_as_int, erasures_pos=erasures_pos, nostrip=True, return_string=False)
-            except RSCodecError:
-                return payload_encoded[0:self.payload_len]
-            payload = [self._int_to_payload[i] for i in payload_as_gf]
-            return payload
+        return self._decode_errata(payload_encoded, payload_as_int, erasures_pos=erasures_pos)
+
+    def decode_block(self, codewords: np.ndarray, erasures: np.ndarray) -> List[list]:
+        """ decode() of every row of codewords (rows, n), the Z symbols of a column of a block each, erasures a boolean
+        mask of the same shape. One syndrome check over all the rows, only the rows that fail it are decoded."""
+        codewords_as_gf = np.where(codewords == Z_ERASURE, 0, codewords - 1)
+        is_codeword = self._block_coder.check_block(codewords_as_gf)
+        return [payload_encoded[0:self.payload_len] if codeword
+                else self._decode_errata(payload_encoded, payload_as_int,
+                                         erasures_pos=np.flatnonzero(row_erasures).tolist())
+                for payload_encoded, payload_as_int, row_erasures, codeword in
+                zip(codewords.tolist(), codewords_as_gf.tolist(), erasures, is_codeword.tolist())]
+
+    def _decode_errata(self, payload_encoded: list, payload_as_int: list, erasures_pos: list) -> list:
+        """ The decoding of a column that is no codeword, its first payload_len symbols if it can't be decoded."""
+        try:
+            payload_as_gf, rs_as_gf = self._payload_coder.decode(payload_as_int, erasures_pos=erasures_pos, nostrip=True, return_string=False)
+        except RSCodecError:
+            return payload_encoded[0:self.payload_len]
+        payload = [self._gf_to_z(i) for i in payload_as_gf]
+        return payload
@@ -0,0 +1,343 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+from unireedsolomon.unireedsolomon import RSCodecError
+
+#################################################################
+# @ Class: GaloisField
+# @ Description: GF(2**c_exp), c_exp <= 8: the log / antilog tables of a
+#                generator and a prime polynomial, as unireedsolomon's
+#                init_lut builds them, held by the instance instead of
+#                module globals, so fields of different sizes can be used
+#                side by side (and from several threads). Field elements
+#                are plain ints; a division by zero is zero, as in GF2int.
+#################################################################
+
+
+class GaloisField:
+    def __init__(self, generator: int = 3, prim: int = 0x11b, c_exp: int = 8):
+        if not 0 < c_exp <= 8:
+            raise ValueError(f'c_exp must be between 1 and 8, not {c_exp}')
+        self.generator = generator
+        self.prim = prim
+        self.c_exp = c_exp
+        self.charac = 2 ** c_exp - 1
+        exptable = [1]
+        for _ in range(self.charac):
+            exptable.append(self._multiply_slow(exptable[-1], generator))
+        self.log = [-1] * (self.charac + 1)
+        for i, x in enumerate(exptable[:-1]):
+            self.log[x] = i
+        # doubled, so a sum of two logs needs no modulo
+        self.exp = exptable[:-1] * 2
+        self.exp_array = np.array(self.exp, dtype=np.int64)
+        self.log_array = np.array([max(x, 0) for x in self.log], dtype=np.int64)
+
+    def _multiply_slow(self, a: int, b: int) -> int:
+        # carry-less multiplication modulo the prime polynomial, to build the tables
+        r = 0
+        while b:
+            if b & 1:
+                r ^= a
+            b >>= 1
+            a <<= 1
+            if a & (self.charac + 1):
+                a ^= self.prim
+        return r
+
+    def multiply(self, a: int, b: int) -> int:
+        if a == 0 or b == 0:
+            return 0
+        return self.exp[self.log[a] + self.log[b]]
+
+    def divide(self, a: int, b: int) -> int:
+        if a == 0 or b == 0:
+            return 0
+        return self.exp[(self.log[a] - self.log[b]) % self.charac]
+
+    def power(self, a: int, power: int) -> int:
+        return self.exp[(self.log[a] * power) % self.charac]
+
+    def inverse(self, a: int) -> int:
+        return self.exp[self.charac - self.log[a]]
+
+    def multiply_block(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        product = self.exp_array[self.log_array[a] + self.log_array[b]]
+        return np.where((a == 0) | (b == 0), 0, product)
+
+
+#################################################################
+# @ Class: RSCodec
+# @ Description: Reed-Solomon codec over a GaloisField, with the
+#                interface and the exact results of unireedsolomon's
+#                RSCoder (encode, encode_fast, check, check_fast and the
+#                errors-and-erasures decode), on plain ints instead of
+#                GF2int and Polynomial objects and without its global
+#                field tables. The *_block methods work on 2-D arrays, a
+#                codeword per row. Polynomials are lists of coefficients,
+#                the highest degree first, without leading zeros (like
+#                Polynomial).
+#################################################################
+
+
+def _strip(coefficients: List[int]) -> List[int]:
+    for i, coefficient in enumerate(coefficients):
+        if coefficient != 0:
+            return coefficients[i:]
+    return [0]
+
+
+class RSCodec:
+    def __init__(self, n: int, k: int, generator: int = 3, prim: int = 0x11b, fcr: int = 1, c_exp: int = 8):
+        self.field = GaloisField(generator=generator, prim=prim, c_exp=c_exp)
+        self.charac = self.field.charac
+        if n < 0 or k < 0:
+            raise ValueError('n and k must be positive')
+        if n > self.charac:
+            raise ValueError(f'n must be at most {self.charac}')
+        if not k < n:
+            raise ValueError('Codeword length n must be greater than message length k')
+        self.n = n
+        self.k = k
+        self.generator = generator
+        self.prim = prim
+        self.fcr = fcr
+        self.c_exp = c_exp
+
+        # g(x) = (x - a**fcr)...(x - a**(fcr + n - k - 1))
+        self._g = [1]
+        for i in range(n - k):
+            self._g = self._poly_mul(self._g, [1, self._generator_pow(i + fcr)])
+        self._parity_matrix = np.array([self.encode_fast([0] * i + [1] + [0] * (k - i - 1))[k:] for i in range(k)],
+                                       dtype=np.int64)
+
+    ###########################
+    # Polynomials over the field
+    ###########################
+
+    def _generator_pow(self, power: int) -> int:
+        return self.field.power(self.generator, power)
+
+    def _poly_add(self, p: List[int], q: List[int]) -> List[int]:
+        diff = len(p) - len(q)
+        p = [0] * -diff + p
+        q = [0] * diff + q
+        return _strip([x ^ y for x, y in zip(p, q)])
+
+    def _poly_mul(self, p: List[int], q: List[int]) -> List[int]:
+        terms = [0] * (len(p) + len(q))
+        l1l2 = len(p) + len(q) - 2
+        for i1, c1 in enumerate(p):
+            if c1 == 0:
+                continue
+            for i2, c2 in enumerate(q):
+                if c2 != 0:
+                    terms[-(l1l2 - (i1 + i2) + 1)] ^= self.field.multiply(c1, c2)
+        return _strip(terms)
+
+    def _poly_scale(self, p: List[int], scalar: int) -> List[int]:
+        return _strip([self.field.multiply(c, scalar) for c in p])
+
+    def _poly_div_scalar(self, p: List[int], scalar: int) -> List[int]:
+        return _strip([self.field.divide(c, scalar) for c in p])
+
+    def _poly_eval(self, p: List[int], x: int) -> int:
+        y = p[0]
+        for c in p[1:]:
+            y = self.field.multiply(y, x) ^ c
+        return y
+
+    @staticmethod
+    def _poly_mod_x_power(p: List[int], power: int) -> List[int]:
+        """ p mod x**power: the terms of degree < power."""
+        return _strip(p[-power:])
+
+    @staticmethod
+    def _coefficient(p: List[int], degree: int) -> int:
+        return p[-(degree + 1)] if degree < len(p) else 0
+
+    def _remainder(self, p: List[int]) -> List[int]:
+        """ p mod g(x), g being monic (synthetic division)."""
+        out = list(p)
+        for i in range(len(p) - (len(self._g) - 1)):
+            coef = out[i]
+            if coef != 0:
+                for j in range(1, len(self._g)):
+                    out[i + j] ^= self.field.multiply(self._g[j], coef)
+        return _strip(out[-(len(self._g) - 1):])
+
+    ###########################
+    # RSCoder interface
+    ###########################
+
+    def encode(self, message, poly=False, k=None, return_string=True) -> List[int]:
+        self._check_call(message, poly=poly, k=k)
+        if len(message) > self.k:
+            raise ValueError(f'Message length is max {self.k}. Message was {len(message)}')
+        codeword = _strip(list(message)) + [0] * (self.n - self.k)
+        remainder = self._remainder(codeword)
+        codeword = self._poly_add(codeword, remainder)
+        return [0] * max(0, self.n - len(codeword)) + codeword
+
+    encode_fast = encode
+
+    def check(self, r, k=None) -> bool:
+        self._check_call(r, k=k)
+        return not any(self._syndromes(list(r)))
+
+    check_fast = check
+
+    def decode(self, r, nostrip=False, k=None, erasures_pos=None, only_erasures=False,
+               return_string=True) -> Tuple[List[int], List[int]]:
+        """ Errors-and-erasures decoding (Berlekamp-Massey, Chien search, Forney), step by step as RSCoder.decode."""
+        self._check_call(r, k=k)
+        n, k = self.n, self.k
+        r = list(r)
+        rp = _strip(list(r))
+        if erasures_pos:
+            erasures_pos = [len(r) - 1 - x for x in erasures_pos]
+
+        # syndrome polynomial, zeros kept: S_(n-k-1) ... S_0 and a zero constant term
+        sz = self._syndromes(r)[::-1] + [0]
+        if not any(sz):
+            return self._undecoded(r, nostrip)
+
+        erasures_loc = None
+        erasures_eval = None
+        erasures_count = 0
+        if erasures_pos:
+            erasures_count = len(erasures_pos)
+            erasures_loc = [1]
+            for i in erasures_pos:
+                erasures_loc = self._poly_mul(erasures_loc, [self._generator_pow(i), 1])
+            erasures_eval = self._poly_mod_x_power(self._poly_mul(sz, erasures_loc), n - k + 1)
+
+        if only_erasures:
+            # the errata are the erasures: the erasure locator is the errata locator
+            if erasures_loc is None:
+                raise ValueError('only_erasures decoding needs erasures_pos')
+            sigma = erasures_loc
+        else:
+            sigma = self._berlekamp_massey(sz, erasures_loc=erasures_loc, erasures_eval=erasures_eval,
+                                           erasures_count=erasures_count)
+        omega = self._poly_mod_x_power(self._poly_mul(sz, sigma), n - k + 1)
+
+        # Chien search, over all the 2**c_exp - 1 non-zero points
+        X = []
+        j = []
+        for l in range(1, self.charac + 1):
+            if self._poly_eval(sigma, self._generator_pow(l)) == 0:
+                X.append(self._generator_pow(-l))
+                j.append(self.charac - l)
+        if len(j) != len(sigma) - 1:
+            raise RSCodecError('Too many (or few) errors found by Chien Search for the errata locator polynomial!')
+        if len(j) > n - k:
+            return self._undecoded(r, nostrip)
+
+        # Forney
+        error = [0] * self.charac
+        for l, Xl in enumerate(X):
+            Xl_inv = self.field.inverse(Xl)
+            sigma_prime = 1
+            for jj in range(len(X)):
+                if jj != l:
+                    sigma_prime = self.field.multiply(sigma_prime, 1 ^ self.field.multiply(Xl_inv, X[jj]))
+            Yl = self.field.divide(self.field.multiply(self.field.power(Xl, 1 - self.fcr), self._poly_eval(omega, Xl_inv)), sigma_prime)
+            error[j[l]] = Yl
+
+        c = self._poly_add(rp, _strip(error[::-1]))
+        if len(c) > len(r):
+            c = rp
+        ret = c[:-(n - k)]
+        ecc = c[-(n - k):]
+        if nostrip:
+            ret = [0] * max(0, k - len(ret)) + ret
+        return ret, ecc
+
+    def _check_call(self, r, poly=False, k=None) -> None:
+        if isinstance(r, str) or poly:
+            raise TypeError(f'RSCodec takes lists of field elements (ints), not {type(r).__name__} or polynomials')
+        if k is not None and k != self.k:
+            raise ValueError(f'RSCodec has k={self.k}, it can not code with k={k}')
+
+    def _undecoded(self, r: List[int], nostrip: bool) -> Tuple[List[int], List[int]]:
+        ret = r[:-(self.n - self.k)]
+        ecc = r[-(self.n - self.k):]
+        if not nostrip:
+            ret = next((ret[i:] for i, x in enumerate(ret) if x != 0), None)
+        return ret, ecc
+
+    def _syndromes(self, r: List[int]) -> List[int]:
+        """ S_l = r(a**(l + fcr)), l = 0..n-k-1."""
+        return [self._poly_eval(r, self._generator_pow(l + self.fcr)) for l in range(self.n - self.k)]
+
+    def _berlekamp_massey(self, s: List[int], erasures_loc: Optional[List[int]], erasures_eval: Optional[List[int]],
+                          erasures_count: int) -> List[int]:
+        """ The errata locator polynomial sigma; omega is recomputed from sigma by the caller."""
+        n, k = self.n, self.k
+        if erasures_loc is not None:
+            sigma, B = list(erasures_loc), list(erasures_loc)
+            omega, A = list(erasures_eval), list(erasures_eval)
+        else:
+            sigma, B = [1], [1]
+            omega, A = [1], [0]
+        L, M = 0, 0
+        synd_shift = max(len(s) - (n - k), 0)
+        s2 = self._poly_add([1], s)
+        for l in range(n - k - erasures_count):
+            K = erasures_count + l + synd_shift
+            product = self._poly_mul(s2, sigma)
+            delta = self._coefficient(product, K)
+            new_sigma = self._poly_add(sigma, self._poly_scale(B + [0], delta))
+            new_omega = self._poly_add(omega, self._poly_scale(A + [0], delta))
+            if delta == 0 or 2 * L > K + erasures_count or (2 * L == K + erasures_count and M == 0):
+                B = _strip(B + [0])
+                A = _strip(A + [0])
+            else:
+                B = self._poly_div_scalar(sigma, delta)
+                A = self._poly_div_scalar(omega, delta)
+                L = K - L
+                M = 1 - M
+            sigma, omega = new_sigma, new_omega
+        return sigma
+
+    ###########################
+    # Blocks: a message / codeword per row
+    ###########################
+
+    def parity_block(self, messages: np.ndarray) -> np.ndarray:
+        """ The parity symbols (rows, n - k) of the messages (rows, k). Encoding is linear, so the parity of a message
+        is the GF sum of its symbols times the parity of the matching unit message."""
+        products = self.field.multiply_block(messages[:, :, np.newaxis], self._parity_matrix[np.newaxis, :, :])
+        return np.bitwise_xor.reduce(products, axis=1)
+
+    def encode_block(self, messages: np.ndarray) -> np.ndarray:
+        return np.hstack((messages, self.parity_block(messages)))
+
+    def syndromes_block(self, codewords: np.ndarray) -> np.ndarray:
+        """ The syndromes S_0..S_(n-k-1) (rows, n - k) of the codewords (rows, length)."""
+        degrees = np.arange(codewords.shape[1] - 1, -1, -1)
+        powers = np.arange(self.fcr, self.fcr + self.n - self.k)
+        point_logs = (self.field.log[self.generator] * np.outer(powers, degrees)) % self.charac
+        logs = self.field.log_array[codewords][:, np.newaxis, :] + point_logs[np.newaxis, :, :]
+        terms = np.where(codewords[:, np.newaxis, :] == 0, 0, self.field.exp_array[logs])
+        return np.bitwise_xor.reduce(terms, axis=2)
+
+    def check_block(self, codewords: np.ndarray) -> np.ndarray:
+        """ check() of every row of codewords: whether all its syndromes are zero."""
+        return ~self.syndromes_block(codewords).any(axis=1)
+
+    def decode_block(self, codewords: np.ndarray, erasures: Optional[np.ndarray] = None,
+                     only_erasures: bool = False) -> List[Optional[Tuple[List[int], List[int]]]]:
+        """ decode(nostrip=True) of every row of codewords (rows, n), erasures a boolean mask of the same shape, None
+        for the rows decode() raises RSCodecError for. The syndromes of all the rows are computed at once; the rows
+        with zero syndromes are returned as they are, only the others go through the errata decoding."""
+        decoded = [self._undecoded(row, nostrip=True) for row in codewords.tolist()]
+        for row in np.flatnonzero(~self.check_block(codewords)).tolist():
+            erasures_pos = np.flatnonzero(erasures[row]).tolist() if erasures is not None else None
+            try:
+                decoded[row] = self.decode(codewords[row].tolist(), nostrip=True, erasures_pos=erasures_pos,
+                                           only_erasures=only_erasures)
+            except RSCodecError:
+                decoded[row] = None
+        return decoded
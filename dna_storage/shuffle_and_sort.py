@@ -2,10 +2,12 @@ import os
 from pathlib import Path
 import sqlite3
 
-from unireedsolomon.unireedsolomon import RSCodecError
+import numpy as np
 
 from dna_storage.config import PathLike
+from dna_storage.oligo_pool import parse_pool_line, pool_line, sample_pool
 from dna_storage.rs_adapter import RSBarcodeAdapter
+from dna_storage.utils import seed_sequence
 
 
 def shuffle(shuffle_db_file: PathLike, input_file: PathLike, output_file: PathLike):
@@ -46,9 +48,19 @@ def sample_oligos_from_file(input_file: PathLike, output_file: PathLike, number_
                 return
 
 
+def sample_oligos_from_counted_pool(input_file: PathLike, output_file: PathLike, number_of_oligos: int,
+                                    number_of_blocks: int = 1, seed=None):
+    """ Samples number_of_oligos * number_of_blocks copies of a count-compressed pool without replacement, from the
+    copy counts, so no shuffle is needed. seed None draws a fresh seed; the seed is written to output_file.seed."""
+    sample_pool(input_file=input_file, output_file=output_file, number_of_oligos=number_of_oligos * number_of_blocks,
+                rng=np.random.default_rng(seed_sequence(seed, results_file=output_file)))
+
+
 def sort_oligo_file(barcode_len: int, barcode_rs_len: int,
                     sort_db_file: PathLike, input_file: PathLike, output_file: PathLike,
-                    barcode_coder: RSBarcodeAdapter):
+                    barcode_coder: RSBarcodeAdapter, chunk_size: int = 2 ** 20):
+    """ The barcodes of the reads are decoded chunk_size bytes of the input at a time (see
+    RSBarcodeAdapter.decode_block), the reads whose barcode can't be decoded are dropped."""
     try:
         os.remove(sort_db_file)
     except OSError:
@@ -63,19 +75,14 @@ def sort_oligo_file(barcode_len: int, barcode_rs_len: int,
                      (barcode text, data text)''')
 
     with open(input_file, 'r') as f:
-        for idx, line in enumerate(f):
-            line = line.rstrip()
-            barcode = line[:barcode_len+barcode_rs_len]
-            payload = line[barcode_len+barcode_rs_len:]
-
-            barcode_list = [c for c in barcode]
-            try:
-                barcode_decoded = barcode_coder.decode(barcode_encoded=barcode_list)
-            except RSCodecError:
-                continue
-
-            barcode_decoded = ''.join(barcode_decoded)
-            c.execute("INSERT INTO sort_table VALUES ('" + barcode_decoded + "', '" + payload + "')")
+        for lines in iter(lambda: f.readlines(chunk_size), []):
+            reads = [parse_pool_line(line) for line in lines]
+            barcodes_decoded = barcode_coder.decode_block([read[:barcode_len+barcode_rs_len] for read, _ in reads])
+            for (read, count), barcode_decoded in zip(reads, barcodes_decoded):
+                if barcode_decoded is None:
+                    continue
+                payload = pool_line(read[barcode_len+barcode_rs_len:], count)
+                c.execute("INSERT INTO sort_table VALUES ('" + barcode_decoded + "', '" + payload + "')")
 
     c.execute("SELECT * FROM sort_table ORDER BY barcode")
     with open(output_file, 'w+') as f:
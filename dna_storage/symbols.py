@@ -0,0 +1,62 @@
+from typing import Dict, List, Sequence, Tuple, TypeVar
+
+#################################################################
+# Integer symbols
+#
+# Inside the Encoder, Synthesizer, Decoder and the RS adapters the
+# symbols are integers: 'Z17' is 17 and 'X3' is 3. 0 is the erasure
+# symbol ('Z0' / 'X0'). The string names are only used when reading
+# and writing the pipeline files.
+#################################################################
+
+Z_ERASURE = 0
+X_ERASURE = 0
+X_DUMMY = -1
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+def z_name(z: int) -> str:
+    return f'Z{z}'
+
+
+def z_from_name(name: str) -> int:
+    return int(name[1:])
+
+
+def x_name(x: int) -> str:
+    return f'X{x}'
+
+
+def x_from_name(name: str) -> int:
+    return int(name[1:])
+
+
+def x_tuple_from_names(x_tuple: Sequence[str]) -> Tuple[int, ...]:
+    return tuple(x_from_name(x) for x in x_tuple)
+
+
+def z_keys_to_int(z_dict: Dict[str, V]) -> Dict[int, V]:
+    return {z_from_name(z): value for z, value in z_dict.items()}
+
+
+def z_values_to_int(z_dict: Dict[K, str]) -> Dict[K, int]:
+    return {key: z_from_name(z) for key, z in z_dict.items()}
+
+
+def oligo_to_line(barcode: str, z_list: Sequence[int]) -> str:
+    return ','.join([barcode] + [z_name(z) for z in z_list])
+
+
+def line_to_oligo(line: str) -> Tuple[str, List[int]]:
+    line_list = line.strip('\n').split(',')
+    return line_list[0], [z_from_name(z) for z in line_list[1:]]
+
+
+def x_tuple_keys_to_int(x_tuple_dict: Dict[Tuple[str, ...], V]) -> Dict[Tuple[int, ...], V]:
+    return {x_tuple_from_names(x_tuple): value for x_tuple, value in x_tuple_dict.items()}
+
+
+def x_tuple_values_to_int(x_tuple_dict: Dict[K, Tuple[str, ...]]) -> Dict[K, Tuple[int, ...]]:
+    return {key: x_tuple_from_names(x_tuple) for key, x_tuple in x_tuple_dict.items()}
@@ -1,10 +1,19 @@
+import codecs
+import math
+import mmap
 import os
+from multiprocessing import Pool
 from random import choice
 from string import ascii_letters
+from typing import Tuple, Optional, Iterator, List
 
 import numpy as np
 
+from dna_storage.binary_format import open_binary_writer, z_fill_trailer_bits
 from dna_storage.config import PathLike
+from dna_storage.utils import dna_sequence_to_index
+
+INPUT_MODES = ('text', 'bytes')
 
 
 class TextFileToBinaryFile:
@@ -13,74 +22,162 @@ class TextFileToBinaryFile:
                  payload_len: int,
                  bits_per_z: int,
                  oligos_per_block_len: int,
-                 k_mer: int):
+                 k_mer: int,
+                 binary_format: str = 'packed',
+                 input_mode: str = 'text',
+                 chunk_size: int = 2 ** 20,
+                 number_of_processes: int = 1):
         self.input_file = input_file
         self.output_file = output_file
         self.payload_len = payload_len
         self.bits_per_z = bits_per_z
         self.oligos_per_block_len = oligos_per_block_len
         self.k_mer = k_mer
+        self.binary_format = binary_format
+        if input_mode not in INPUT_MODES:
+            raise ValueError(f'Unknown input mode {input_mode}, expected one of {INPUT_MODES}')
+        self.input_mode = input_mode
+        self.chunk_size = chunk_size
+        self.number_of_processes = number_of_processes
 
     def run(self):
-        with open(self.input_file, 'r', encoding='utf-8') as input_file, open(self.output_file, 'w', encoding='utf-8') as output_file:
-            oligo_len_binary = int(self.payload_len * self.bits_per_z)
-            accumulation = ''
-            number_of_binary_oligos_written = 0
-            for line in input_file:
-                text_data = line
-                binary_data = text_to_bits(text_data)
-                accumulation += binary_data
-                while len(accumulation) >= oligo_len_binary:
-                    to_write = accumulation[:oligo_len_binary]
-                    accumulation = accumulation[oligo_len_binary:]
-                    output_file.write(to_write + '\n')
-                    number_of_binary_oligos_written += 1
-            z_fill = 0
+        if self.number_of_processes > 1 and self.raw_bytes_are_the_input():
+            return self.run_parallel()
+        oligo_len_binary = int(self.payload_len * self.bits_per_z)
+        converter = BytesToBitRows(record_bits=oligo_len_binary)
+        with open_binary_writer(self.output_file, record_bits=oligo_len_binary,
+                                binary_format=self.binary_format) as output_file:
+            for data in self.iter_input_buffers():
+                output_file.write_rows(converter.push(data))
 
             # pad the last oligo to have length "oligo_len_binary"
-            if len(accumulation) > 0:
-                binary_data_padded, z_fill = self.transform_text_to_binary_string(binary_data=accumulation)
-                output_file.write(binary_data_padded + '\n')
-                number_of_binary_oligos_written += 1
+            last_row, z_fill = converter.flush()
+            output_file.write_rows(last_row)
+            self.write_padding_and_trailer(output_file=output_file,
+                                           number_of_binary_oligos_written=converter.number_of_rows,
+                                           z_fill=z_fill)
 
-            # pad to a multiplication of "oligos_per_block_for_rs"
-            zeros_block, number_of_missing_rows_to_block = self.zero_pad_to_blocks_of_size(number_of_binary_oligos_written=number_of_binary_oligos_written, oligo_len_binary=oligo_len_binary)
-            if zeros_block != '':
-                output_file.write(zeros_block + '\n')
+    def raw_bytes_are_the_input(self) -> bool:
+        """ run_parallel converts the raw file bytes. In 'text' mode they are the input only without '\\r', which
+        the text reader translates to '\\n', so such a text input is converted serially."""
+        if self.input_mode == 'bytes' or os.path.getsize(self.input_file) == 0:
+            return True
+        with open(self.input_file, 'rb') as input_file, \
+                mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_input:
+            return mapped_input.find(b'\r') == -1
 
-            n_zeros = (number_of_missing_rows_to_block * oligo_len_binary) + z_fill
-            z_fill_text = "{0:b}".format(n_zeros).rjust(oligo_len_binary, '0')
-            output_file.write(z_fill_text + '\n')
+    def run_parallel(self):
+        """ Every row is a function of its byte offset only, so the input bytes are split at row aligned
+        offsets and converted in a process pool. Works on the raw file bytes, see raw_bytes_are_the_input."""
+        if not self.raw_bytes_are_the_input():
+            raise ValueError(f'{self.input_file} has \'\\r\' newlines, a text input with them is converted serially')
+        oligo_len_binary = int(self.payload_len * self.bits_per_z)
+        with open_binary_writer(self.output_file, record_bits=oligo_len_binary,
+                                binary_format=self.binary_format) as output_file, \
+                Pool(self.number_of_processes) as pool:
+            number_of_binary_oligos_written = 0
+            z_fill = 0
+            # only the last range can end in a partial row, so it is the only one with z_fill != 0
+            for packed_rows, z_fill in pool.imap(bytes_range_to_packed_rows, self.aligned_byte_ranges()):
+                output_file.write_packed_rows(packed_rows)
+                number_of_binary_oligos_written += packed_rows.shape[0]
+            self.write_padding_and_trailer(output_file=output_file,
+                                           number_of_binary_oligos_written=number_of_binary_oligos_written,
+                                           z_fill=z_fill)
 
-    def transform_text_to_binary_string(self, binary_data: str):
+    def aligned_byte_ranges(self) -> List[Tuple[PathLike, int, int, int]]:
         oligo_len_binary = int(self.payload_len * self.bits_per_z)
-        binary_data_len = len(binary_data)
+        bytes_per_aligned_rows = oligo_len_binary // math.gcd(oligo_len_binary, 8)
+        range_len = max(bytes_per_aligned_rows, self.chunk_size - self.chunk_size % bytes_per_aligned_rows)
+        file_size = os.path.getsize(self.input_file)
+        return [(self.input_file, start, min(start + range_len, file_size), oligo_len_binary)
+                for start in range(0, file_size, range_len)]
 
-        number_of_binary_oligos = np.ceil(binary_data_len / oligo_len_binary)
-        total_binary_len = int(number_of_binary_oligos * oligo_len_binary)
+    def iter_input_buffers(self) -> Iterator[bytes]:
+        if self.input_mode == 'bytes':
+            # raw bytes are sliced straight out of the memory mapped file, without any text decoding
+            if os.path.getsize(self.input_file) == 0:
+                return
+            with open(self.input_file, 'rb') as input_file, \
+                    mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_input:
+                for offset in range(0, len(mapped_input), self.chunk_size):
+                    yield mapped_input[offset:offset + self.chunk_size]
+        elif self.input_mode == 'text':
+            with open(self.input_file, 'r', encoding='utf-8') as input_file:
+                for text_data in iter(lambda: input_file.read(self.chunk_size), ''):
+                    yield text_data.encode('utf-8', 'surrogatepass')
+        else:
+            raise ValueError(f'Unknown input mode {self.input_mode}, expected one of {INPUT_MODES}')
 
-        binary_data_padded = binary_data.ljust(total_binary_len, '0')
-        z_fill = total_binary_len - binary_data_len
+    def write_padding_and_trailer(self, output_file, number_of_binary_oligos_written: int, z_fill: int) -> None:
+        oligo_len_binary = int(self.payload_len * self.bits_per_z)
+        # pad to a multiplication of "oligos_per_block_for_rs"
+        number_of_missing_rows_to_block = self.number_of_missing_rows_to_block(
+            number_of_binary_oligos_written=number_of_binary_oligos_written)
+        output_file.write_rows(np.zeros((number_of_missing_rows_to_block, oligo_len_binary), dtype=np.uint8))
 
-        return binary_data_padded, z_fill
+        n_zeros = (number_of_missing_rows_to_block * oligo_len_binary) + z_fill
+        output_file.write_rows(z_fill_trailer_bits(n_zeros=n_zeros, record_bits=oligo_len_binary))
+        output_file.close(number_of_padding_rows=number_of_missing_rows_to_block, z_fill=z_fill)
 
-    def zero_pad_to_blocks_of_size(self, number_of_binary_oligos_written: int, oligo_len_binary: int):
+    def number_of_missing_rows_to_block(self, number_of_binary_oligos_written: int) -> int:
         excess_lines = number_of_binary_oligos_written % self.oligos_per_block_len
-        number_of_missing_rows_to_block = self.oligos_per_block_len - excess_lines - 1
         # -1 because we write an extra lines. the number of zeros we appended to the last line of real data
-        zeros_array = ['0'*oligo_len_binary for _ in range(number_of_missing_rows_to_block)]
-        zeros_block = '\n'.join(zeros_array)
-        return zeros_block, number_of_missing_rows_to_block
+        return self.oligos_per_block_len - excess_lines - 1
+
+
+def bytes_range_to_packed_rows(byte_range: Tuple[PathLike, int, int, int]) -> Tuple[np.ndarray, int]:
+    input_file, start, end, record_bits = byte_range
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    converter = BytesToBitRows(record_bits=record_bits)
+    rows = converter.push(data)
+    last_row, z_fill = converter.flush()
+    return np.packbits(np.concatenate((rows, last_row)), axis=1), z_fill
+
+
+class BytesToBitRows:
+    """ Streams byte buffers into (n, record_bits) bit rows, carrying the bits that do not fill a row."""
+    def __init__(self, record_bits: int):
+        self.record_bits = record_bits
+        self.number_of_bits = 0
+        self.number_of_rows = 0
+        self._carry = np.zeros(0, dtype=np.uint8)
+
+    def push(self, data) -> np.ndarray:
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        self.number_of_bits += bits.size
+        if self._carry.size > 0:
+            bits = np.concatenate((self._carry, bits))
+        n_rows = bits.size // self.record_bits
+        self._carry = bits[n_rows * self.record_bits:].copy()
+        self.number_of_rows += n_rows
+        return bits[:n_rows * self.record_bits].reshape(n_rows, self.record_bits)
+
+    def flush(self) -> Tuple[np.ndarray, int]:
+        """ Returns the zero padded last row (no rows if the data filled the last one) and its z_fill."""
+        z_fill = -self._carry.size % self.record_bits
+        if self._carry.size == 0:
+            return np.zeros((0, self.record_bits), dtype=np.uint8), z_fill
+        last_row = np.zeros((1, self.record_bits), dtype=np.uint8)
+        last_row[0, :self._carry.size] = self._carry
+        self._carry = np.zeros(0, dtype=np.uint8)
+        self.number_of_rows += 1
+        return last_row, z_fill
 
 
 class DecoderResultToBinary:
     def __init__(self, input_file: PathLike,
                  output_file: PathLike,
-                 barcode_len: int) -> None:
-
+                 barcode_len: int,
+                 barcode_index_range: Optional[Tuple[int, int]] = None) -> None:
+        """ barcode_index_range keeps only the rows of one segment of an appended pool (see PoolManifest),
+        so its own padding trailer is the last row."""
         self.input_file = input_file
         self.output_file = output_file
         self.barcode_len = barcode_len
+        self.barcode_index_range = barcode_index_range
 
     def run(self) -> None:
         with open(self.input_file, 'r', encoding='utf-8') as input_file, open(self.output_file, 'w', encoding='utf-8') as output_file:
@@ -88,84 +185,96 @@ class DecoderResultToBinary:
                 barcode_and_payload = line.strip()
                 barcode, payload = barcode_and_payload[:self.barcode_len], barcode_and_payload[
                                                         self.barcode_len:]
+                if self.barcode_index_range is not None:
+                    first_barcode_index, stop_barcode_index = self.barcode_index_range
+                    if not first_barcode_index <= dna_sequence_to_index(barcode) < stop_barcode_index:
+                        continue
                 output_file.write(payload + '\n')
 
 
-class BinaryResultToText:
+class BinaryResultToBytes:
     def __init__(self, input_file: PathLike,
                  output_file: PathLike,
                  barcode_len: int,
                  payload_len: int,
-                 bits_per_z: int) -> None:
+                 bits_per_z: int,
+                 chunk_size: int = 2 ** 20) -> None:
 
         self.input_file = input_file
         self.output_file = output_file
         self.barcode_len = barcode_len
         self.payload_len = payload_len
         self.bits_per_z = bits_per_z
-        open(self.output_file, 'w').close()
+        self.chunk_size = chunk_size
 
     def run(self) -> None:
+        with open(self.output_file, 'wb') as output_file:
+            for data in self.iter_payload_bytes():
+                output_file.write(data)
+
+    def iter_payload_bytes(self) -> Iterator[bytes]:
+        # The input file is only read, the padding is skipped by stopping after payload_bits_len bits
+        bits_left = self.payload_bits_len()
+        carry = np.zeros(0, dtype=np.uint8)
+        with open(self.input_file, 'rb') as input_file:
+            for lines in iter(lambda: input_file.readlines(self.chunk_size), []):
+                bits = np.frombuffer(b''.join(line.strip() for line in lines), dtype=np.uint8) - ord('0')
+                if bits_left is not None:
+                    bits = bits[:bits_left]
+                    bits_left -= bits.size
+                if carry.size > 0:
+                    bits = np.concatenate((carry, bits))
+                n_bytes = bits.size // 8
+                carry = bits[n_bytes * 8:]
+                yield np.packbits(bits[:n_bytes * 8]).tobytes()
+                if bits_left == 0:
+                    break
+
+    def payload_bits_len(self) -> Optional[int]:
+        """ The number of data bits before the padding, read from the z_fill trailer (the last row).
+        None if there is no valid trailer, then all the bits are decoded."""
         oligo_len_binary = int(self.payload_len * self.bits_per_z)
-        with open(self.input_file, 'r+', encoding='utf-8') as input_file:
-            if os.name == 'nt':
-                newline_size = 2
+        with open(self.input_file, 'rb') as input_file:
+            line_size = len(input_file.readline())
+            file_size = input_file.seek(0, os.SEEK_END)
+            if line_size == 0:
+                return None
+            if file_size % line_size == 0:
+                number_of_rows = file_size // line_size
             else:
-                newline_size = 1
-            failed_on_seek = False
-            try:
-                input_file.seek(0, os.SEEK_END)
-                input_file.seek(input_file.tell() - oligo_len_binary - 1*newline_size, os.SEEK_SET)
-            except ValueError:
                 input_file.seek(0)
-                failed_on_seek = True
-
-            if not failed_on_seek:
-                for idx, line in enumerate(input_file):
-                    if idx == 0:
-                        payload = line.strip()
-                        try:
-                            z_fill = int(payload, 2)
-                            padded_rows_with_zeros, padded_zeros_in_first_line = divmod(z_fill, oligo_len_binary)
-                            last_line_backslash_n = 1
-                            truncate_length = (padded_zeros_in_first_line + (last_line_backslash_n * newline_size) +
-                                               (padded_rows_with_zeros + 1) * (oligo_len_binary + newline_size))
-                            input_file.seek(0, os.SEEK_END)
-                            input_file.seek(input_file.tell() - truncate_length, os.SEEK_SET)
-                            input_file.truncate()
-                        except ValueError:
-                            pass
-                        input_file.seek(0)
-                        break
-
-        with open(self.input_file, 'r+', encoding='utf-8') as input_file, open(self.output_file, 'w', encoding='utf-8') as output_file:
-            accumulation = ''
-            utf_chars_sizes = [32, 24, 16, 8]
-            for idx, line in enumerate(input_file):
-                payload = line.strip()
-
-                accumulation += payload
-                stop = False
-                while len(accumulation) >= utf_chars_sizes[0] and stop is False:
-                    for size in utf_chars_sizes:
-                        try:
-                            bits = accumulation[:size]
-                            text = text_from_bits(bits)
-                            accumulation = accumulation[size:]
-                            if text != '\x00':
-                                output_file.write(text)
-                            break
-                        except UnicodeDecodeError:
-                            if size == utf_chars_sizes[-1]:
-                                stop = True
-                                break
-
-            if len(accumulation) > 0:
-                try:
-                    text = text_from_bits(accumulation)
-                    output_file.write(text)
-                except UnicodeDecodeError:
-                    pass
+                number_of_rows = sum(chunk.count(b'\n') for chunk in iter(lambda: input_file.read(self.chunk_size), b''))
+            input_file.seek(max(0, file_size - 2 * line_size))
+            trailer = input_file.read().splitlines()[-1].strip()
+        try:
+            n_zeros = int(trailer, 2)
+        except ValueError:
+            return None
+        payload_bits_len = (number_of_rows - 1) * oligo_len_binary - n_zeros
+        if payload_bits_len < 0:
+            return None
+        return payload_bits_len
+
+
+class BinaryResultToText(BinaryResultToBytes):
+    def __init__(self, input_file: PathLike,
+                 output_file: PathLike,
+                 barcode_len: int,
+                 payload_len: int,
+                 bits_per_z: int,
+                 errors: str = 'replace',
+                 chunk_size: int = 2 ** 20) -> None:
+        super().__init__(input_file=input_file, output_file=output_file, barcode_len=barcode_len,
+                         payload_len=payload_len, bits_per_z=bits_per_z, chunk_size=chunk_size)
+        self.errors = errors
+
+    def run(self) -> None:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors=self.errors)
+        with open(self.output_file, 'w', encoding='utf-8') as output_file:
+            for data in self.iter_payload_bytes():
+                # zero bytes come from dummy payloads of missing oligos, they are not part of the text
+                output_file.write(decoder.decode(data).replace('\x00', ''))
+            output_file.write(decoder.decode(b'', final=True).replace('\x00', ''))
 
 
 def generate_random_text_file(size_kb: int, file: PathLike) -> None:
@@ -174,8 +283,8 @@ def generate_random_text_file(size_kb: int, file: PathLike) -> None:
         f.write(text)
 
 def text_to_bits(text: str, encoding: str = 'utf-8', errors: str = 'surrogatepass') -> str:
-    bits = bin(int.from_bytes(text.encode(encoding, errors), 'big'))[2:]
-    return bits.zfill(8 * ((len(bits) + 7) // 8))
+    bits = np.unpackbits(np.frombuffer(text.encode(encoding, errors), dtype=np.uint8)) + ord('0')
+    return bits.tobytes().decode('ascii')
 
 
 def text_from_bits(bits: str, encoding: str = 'utf-8', errors: str = 'surrogatepass') -> str:
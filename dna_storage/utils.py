@@ -1,6 +1,10 @@
-from typing import Tuple, Sequence, Generator
+from pathlib import Path
+from typing import Tuple, Sequence, Generator, List, Optional, Union
 import itertools
 
+import numpy as np
+
+DNA_SYMBOLS = ('A', 'C', 'G', 'T')
 
 def dna_sequence_generator(sequence_len=12, symbols=('A', 'C', 'G', 'T')) -> Tuple[str]:
     barcodes = itertools.product(symbols, repeat=sequence_len)
@@ -11,10 +15,81 @@ def dna_sequence_generator(sequence_len=12, symbols=('A', 'C', 'G', 'T')) -> Tup
             return
 
 
+#################################################################
+# Barcode indexing
+#
+# Barcode i is the i-th sequence of dna_sequence_generator, i.e. i written
+# in base len(symbols) with sequence_len digits, most significant first
+# ('A' = 0, 'C' = 1, 'G' = 2, 'T' = 3). So any barcode can be computed from
+# its index, and back, without stepping the generator.
+#################################################################
+
+def index_to_dna_sequence(index: int, sequence_len: int = 12, symbols: Sequence[str] = DNA_SYMBOLS) -> str:
+    base = len(symbols)
+    if not 0 <= index < base ** sequence_len:
+        raise ValueError(f'Index {index} is out of range for sequences of length {sequence_len}')
+    letters = []
+    for _ in range(sequence_len):
+        index, digit = divmod(index, base)
+        letters.append(symbols[digit])
+    return ''.join(reversed(letters))
+
+
+def dna_sequence_to_index(sequence: Sequence[str], symbols: Sequence[str] = DNA_SYMBOLS) -> int:
+    base = len(symbols)
+    symbol_to_digit = {symbol: digit for digit, symbol in enumerate(symbols)}
+    index = 0
+    for letter in sequence:
+        index = index * base + symbol_to_digit[letter]
+    return index
+
+
+def index_range_to_digits(start: int, stop: int, sequence_len: int = 12, base: int = 4) -> np.ndarray:
+    """ The base digits of the indices start..stop-1, as a (stop - start, sequence_len) uint8 array."""
+    if not 0 <= start <= stop <= base ** sequence_len:
+        raise ValueError(f'Range {start}..{stop} is out of range for sequences of length {sequence_len}')
+    indices = np.arange(start, stop, dtype=np.int64)
+    weights = base ** np.arange(sequence_len - 1, -1, -1, dtype=np.int64)
+    return ((indices[:, None] // weights) % base).astype(np.uint8)
+
+
+def index_range_to_dna_sequences(start: int, stop: int, sequence_len: int = 12,
+                                 symbols: Sequence[str] = DNA_SYMBOLS) -> List[str]:
+    digits = index_range_to_digits(start, stop, sequence_len=sequence_len, base=len(symbols))
+    letters = np.frombuffer(''.join(symbols).encode('ascii'), dtype=np.uint8)
+    data = letters[digits].tobytes().decode('ascii')
+    return [data[pos:pos + sequence_len] for pos in range(0, len(data), sequence_len)]
+
+
+def dna_sequences_to_indices(sequences: Sequence[str], symbols: Sequence[str] = DNA_SYMBOLS) -> np.ndarray:
+    """ Inverse of index_range_to_dna_sequences for equal length sequences, -1 for a sequence with a foreign letter."""
+    if len(sequences) == 0:
+        return np.zeros(0, dtype=np.int64)
+    sequence_len = len(sequences[0])
+    letters = np.frombuffer(''.join(sequences).encode('ascii'), dtype=np.uint8).reshape(len(sequences), sequence_len)
+    letter_to_digit = np.full(256, -1, dtype=np.int64)
+    for digit, symbol in enumerate(symbols):
+        letter_to_digit[ord(symbol)] = digit
+    digits = letter_to_digit[letters]
+    weights = len(symbols) ** np.arange(sequence_len - 1, -1, -1, dtype=np.int64)
+    indices = digits @ weights
+    indices[(digits < 0).any(axis=1)] = -1
+    return indices
+
+
 def chunker(seq: Sequence, size: int) -> Generator:
     return (seq[pos:pos + size] for pos in range(0, len(seq), size))
 
 
+def seed_sequence(seed: Optional[int], results_file: Union[Path, str]) -> np.random.SeedSequence:
+    """ The SeedSequence of seed, a fresh one when seed is None. Its entropy is written to results_file.seed, so the
+    random draws of results_file can be repeated with that seed."""
+    root_seed = np.random.SeedSequence(seed)
+    with open(f'{results_file}.seed', 'w', encoding='utf-8') as f:
+        f.write(f'{root_seed.entropy}\n')
+    return root_seed
+
+
 def decimal_to_bits(decimal_number, amount_bits=None):
     if decimal_number < 0:
         raise ValueError("Only non-negative integers are supported.")
@@ -29,6 +104,13 @@ def decimal_to_bits(decimal_number, amount_bits=None):
     return binary_representation
 
 
+def bits_to_int(bits: Sequence[int]) -> int:
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
 def iterate_over_bit_chunks(binary_info, chunk_size=3):
     """
     Iterates over a binary string in chunks of a specified size.
@@ -1,4 +1,5 @@
-from typing import Dict, List, Tuple, Any
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any, Union
 
 import dna_storage.vt_syndrome_utils as vtsu
 
@@ -9,23 +10,48 @@ import numpy as np
 
 
 class VTSyndrome:
+    # up to this n the decoding looks up tables over all the 2**n codeword bitmasks, above it works them out per call
+    dense_table_max_n = 16
+
     def __init__(self, n: int, k: int,
                  bits_per_syndrome: int,
                  payload_len: int,
                  payload_redundancy_len: int,
-                 binary_to_k_mer_representation: Dict):
+                 binary_to_k_mer_representation: Dict,
+                 cache_dir: Optional[Union[Path, str]] = None):
         self.binary_to_k_mer_representation = binary_to_k_mer_representation
         self.n = n
         self.k = k
         self.bits_per_syndrome = bits_per_syndrome
 
-        self.vt_syndrome_utils = vtsu.VTSyndromeUtils(n=n, k=k, bits_per_syndrome=bits_per_syndrome)
+        self.vt_syndrome_utils = vtsu.VTSyndromeUtils(n=n, k=k, bits_per_syndrome=bits_per_syndrome,
+                                                      cache_dir=cache_dir)
 
-        self._input_bits = self.closest_power_of_2()
+        # an input symbol is a syndrome and the index of a codeword of that syndrome
+        self._input_bits = 2 * bits_per_syndrome
         self.vt_syn_table = self.vt_syndrome_utils.generate_table()
 
         self.payload_len = payload_len - payload_redundancy_len
 
+        # lookup arrays indexed by the integer value of an input symbol (its _input_bits bits, MSB first):
+        # the syndrome and the codeword as a bitmask, bit i set for X{i+1}
+        values = np.arange(2 ** self._input_bits)
+        self._value_to_syndrome = values >> (self._input_bits - self.bits_per_syndrome)
+        index_mask = (1 << (self._input_bits - self.bits_per_syndrome)) - 1
+        # the rows of the syndromes 0..2**bits_per_syndrome-1 all hold 2**bits_per_syndrome codewords
+        codewords = np.stack(self.vt_syndrome_utils.table_rows()[:2 ** self.bits_per_syndrome]).astype(np.int64)
+        codewords = codewords[self._value_to_syndrome, values & index_mask]
+        self._value_to_codeword_bitmask = codewords @ (1 << np.arange(self.n))
+
+        # for a small n, indexed by every possible codeword bitmask: its syndrome, and the codeword decode() makes of
+        # it for every RS syndrome (mod n, which is all decode() uses of it); None otherwise
+        self._bitmask_to_syndrome = None
+        self.decode_table = None
+        if self.n <= self.dense_table_max_n:
+            bitmasks = np.arange(2 ** self.n, dtype=np.int64)
+            self._bitmask_to_syndrome = self._weight_and_syndrome(bitmasks)[1]
+            self.decode_table = self._decode_arithmetic(bitmasks[:, np.newaxis], np.arange(self.n)[np.newaxis, :])
+
     def codeword_to_syndrome(self, codeword: tuple[int, ...]) -> int:
         syndrome_sum = sum(i * bit for i, bit in enumerate(codeword))
         return np.mod(syndrome_sum, self.n)
@@ -68,6 +94,41 @@ class VTSyndrome:
 
         return syndrome_array, xs_array
 
+    def encode_block(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ encode() of every row of values (rows, symbols), the integer values of the input symbols, at once.
+        Returns the syndromes and the codeword bitmasks, both (rows, payload_len)."""
+        values = values[:, :self.payload_len]
+        return self._value_to_syndrome[values], self._value_to_codeword_bitmask[values]
+
+    def syndrome_block(self, codeword_bitmasks: np.ndarray) -> np.ndarray:
+        """ codeword_to_syndrome() of an array of codeword bitmasks."""
+        if self._bitmask_to_syndrome is not None:
+            return self._bitmask_to_syndrome[codeword_bitmasks]
+        return self._weight_and_syndrome(codeword_bitmasks)[1]
+
+    def decode_block(self, codeword_bitmasks: np.ndarray, syn_outputs_from_rs: np.ndarray) -> np.ndarray:
+        """ decode() of arrays of codeword bitmasks and RS syndromes, returns the decoded codeword bitmasks: a codeword
+        with k - 1 ones gets the one at the position that makes its syndrome the RS syndrome."""
+        if self.decode_table is not None:
+            return self.decode_table[codeword_bitmasks, np.mod(syn_outputs_from_rs, self.n)]
+        return self._decode_arithmetic(codeword_bitmasks, syn_outputs_from_rs)
+
+    def _decode_arithmetic(self, codeword_bitmasks: np.ndarray, syn_outputs_from_rs: np.ndarray) -> np.ndarray:
+        """ decode_block() without the dense tables, for any n."""
+        weight, syndrome = self._weight_and_syndrome(codeword_bitmasks)
+        missing_bit = np.mod(syn_outputs_from_rs - syndrome, self.n)
+        return np.where(weight == self.k - 1, codeword_bitmasks | (1 << missing_bit), codeword_bitmasks)
+
+    def _weight_and_syndrome(self, codeword_bitmasks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ The number of ones and the syndrome of every codeword bitmask."""
+        weight = np.zeros_like(codeword_bitmasks)
+        syndrome = np.zeros_like(codeword_bitmasks)
+        for position in range(self.n):
+            bit = (codeword_bitmasks >> position) & 1
+            weight += bit
+            syndrome += position * bit
+        return weight, syndrome % self.n
+
     def decode(self, codeword: tuple[int, ...], syn_output_from_rs: int):
         current_syn = self.codeword_to_syndrome(codeword=codeword)
 
@@ -1,23 +1,75 @@
-from itertools import combinations
-from typing import List, Tuple
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 
 import dna_storage.utils as uts
 
+# the tables already built in this process, keyed by (n, k, bits_per_syndrome)
+_tables: Dict[Tuple[int, int, int], List[np.ndarray]] = {}
+
 
 def convert_to_x_tuple(x_list) -> tuple[str, ...]:
     return tuple(f'X{i + 1}' for i, bit in enumerate(x_list) if bit == 1)
 
 
+def combination_chunks(n: int, k: int, chunk_size: int = 2 ** 16) -> Iterator[np.ndarray]:
+    """ The positions of the ones of every word of n bits with k ones, (words, k), in the order of
+    itertools.combinations(range(n), k), chunk_size words at a time."""
+    # cumulative_counts[column][c]: the number of words whose position in this column is below c, given the positions
+    # of the columns before it (the words with c in it place their k - column - 1 other ones after c)
+    cumulative_counts = [np.concatenate([[0], np.cumsum([math.comb(n - c - 1, k - column - 1) for c in range(n)])])
+                         .astype(np.int64) for column in range(k)]
+    total = math.comb(n, k)
+    for first_rank in range(0, total, chunk_size):
+        # the words of these ranks in combinations order, column by column: the position of a column is the one
+        # whose words, after the position of the previous column, contain the rank
+        ranks = np.arange(first_rank, min(first_rank + chunk_size, total), dtype=np.int64)
+        positions = np.empty((len(ranks), k), dtype=np.int64)
+        first_position = np.zeros(len(ranks), dtype=np.int64)
+        for column, counts in enumerate(cumulative_counts):
+            ranks = ranks + counts[first_position]
+            positions[:, column] = np.searchsorted(counts, ranks, side='right') - 1
+            ranks = ranks - counts[positions[:, column]]
+            first_position = positions[:, column] + 1
+        yield positions
+
+
+def syndrome_counts(n: int, k: int) -> List[int]:
+    """ The number of words of n bits with k ones of every syndrome 0..n-1, counted without enumerating them."""
+    # counts[ones][syndrome] over the positions seen so far
+    counts = [[0] * n for _ in range(k + 1)]
+    counts[0][0] = 1
+    for position in range(n):
+        for ones in range(min(position + 1, k), 0, -1):
+            for syndrome in range(n):
+                counts[ones][(syndrome + position) % n] += counts[ones - 1][syndrome]
+    return counts[k]
+
+
+def max_bits_per_syndrome(n: int, k: int) -> int:
+    """ The bits of the syndrome and of the codeword index of a Z symbol: the most bits b such that the 2**b syndromes
+    0..2**b-1 exist (2**b <= n) and each has at least 2**b codewords."""
+    counts = syndrome_counts(n=n, k=k)
+    bits = n.bit_length() - 1
+    while bits > 0 and min(counts[:2 ** bits]) < 2 ** bits:
+        bits -= 1
+    return bits
+
+
 class VTSyndromeUtils:
-    def __init__(self, n: int, k: int, bits_per_syndrome: int):
+    def __init__(self, n: int, k: int, bits_per_syndrome: int, cache_dir: Optional[Union[Path, str]] = None):
         self.n = n
         self.k = k
         self.bits_per_syndrome = bits_per_syndrome
+        self.cache_file = None
+        if cache_dir is not None:
+            self.cache_file = Path(cache_dir) / f'vt_table_n{n}_k{k}_b{bits_per_syndrome}.npz'
 
     def print_table(self, vt_syn_table: List[List[List[int]]]) -> None:
-        for i in range(8):
+        for i in range(len(vt_syn_table)):
             print(vt_syn_table[i])
             print(len(vt_syn_table[i]))
 
@@ -38,13 +90,51 @@ class VTSyndromeUtils:
         return np.mod(syndrome_sum, self.n)
 
     def generate_table(self) -> List[List[tuple[int, ...]]]:
-        table = [[], [], [], [], [], [], [], []]
-        for ones_positions in combinations(range(self.n), self.k):
-            bits = self.create_word(ones_positions)
-            syndrome_index = self.codeword_to_syndrome(codeword=bits)
-            if len(table[syndrome_index]) < self.n:
-                table[syndrome_index].append(bits)
-        return table
+        """ The codewords (n bits, k ones) of every syndrome 0..n-1, in combinations order, at most
+        2**bits_per_syndrome per syndrome as the index of a codeword has bits_per_syndrome bits."""
+        return [[tuple(codeword) for codeword in row.tolist()] for row in self.table_rows()]
+
+    def table_rows(self) -> List[np.ndarray]:
+        key = (self.n, self.k, self.bits_per_syndrome)
+        if key not in _tables:
+            if self.cache_file is not None and os.path.exists(self.cache_file):
+                _tables[key] = self.load_table_rows()
+            else:
+                _tables[key] = self.build_table_rows()
+                if self.cache_file is not None:
+                    self.save_table_rows(_tables[key])
+        return _tables[key]
+
+    def build_table_rows(self) -> List[np.ndarray]:
+        # the codewords are enumerated until every syndrome has all the codewords of its row
+        row_lens = np.minimum(syndrome_counts(n=self.n, k=self.k), 2 ** self.bits_per_syndrome)
+        rows = [[np.zeros((0, self.k), dtype=np.int64)] for _ in range(self.n)]
+        lens = np.zeros(self.n, dtype=np.int64)
+        for positions in combination_chunks(n=self.n, k=self.k):
+            syndromes = positions.sum(axis=1) % self.n
+            for syndrome in np.flatnonzero(lens < row_lens):
+                row = positions[syndromes == syndrome][:row_lens[syndrome] - lens[syndrome]]
+                rows[syndrome].append(row)
+                lens[syndrome] += len(row)
+            if (lens == row_lens).all():
+                break
+        return [self.positions_to_codewords(np.concatenate(row)) for row in rows]
+
+    def positions_to_codewords(self, positions: np.ndarray) -> np.ndarray:
+        codewords = np.zeros((len(positions), self.n), dtype=np.uint8)
+        codewords[np.arange(len(positions))[:, np.newaxis], positions] = 1
+        return codewords
+
+    def load_table_rows(self) -> List[np.ndarray]:
+        with np.load(self.cache_file) as cache:
+            return np.split(cache['codewords'], np.cumsum(cache['row_lens'])[:-1])
+
+    def save_table_rows(self, rows: List[np.ndarray]) -> None:
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = f'{self.cache_file}.tmp'
+        with open(temp_file, 'wb') as f:
+            np.savez(f, codewords=np.concatenate(rows), row_lens=np.array([len(row) for row in rows]))
+        os.replace(temp_file, self.cache_file)
 
     def generate_z_list_from_table(self) -> Tuple[dict, dict, dict, dict, dict, dict, dict]:
         table = self.generate_table()
@@ -28,7 +28,8 @@ def subset_size_and_error_plot(number_of_oligos_per_barcode: int = 20,
     plt.ion()
     errors = [0.01, 0.001, 0.0001, 0]
     results = {}
-    sizes_and_bit_sizes = [(3, 9), (5, 12), (7, 13)]
+    # sizes_and_bit_sizes = [(3, 9), (5, 12), (7, 13)]  # no VT code of the 8 k-mer shrink dict has these
+    sizes_and_bit_sizes = [(4, 6)]
     res_file = pathlib.Path(
         f'data/testing/output/error_results_n_oligos_{number_of_oligos_per_barcode}_n_sampled_{number_of_sampled_oligos_from_file}.pk')
     if not res_file.is_file():
@@ -149,7 +150,7 @@ def run_pipe_with_config(config):
 
 def test_full_flow():
     from dna_storage.config import build_config
-    config = build_config(bits_per_z=13, subset_size=7)
+    config = build_config()
     with open('./data/testing/input_text.dna', 'r', encoding='utf-8') as input_file:
         input_data = input_file.read()
     main(config)
@@ -0,0 +1,206 @@
+import os
+
+import pytest
+
+from dna_storage import utils
+from dna_storage.config import build_config
+from dna_storage.encoder import Encoder
+from dna_storage.pool_manifest import PoolManifest
+from dna_storage.symbols import oligo_to_line
+from dna_storage.text_handling import TextFileToBinaryFile
+
+
+def build_encoder(config, **kwargs) -> Encoder:
+    return Encoder(barcode_len=config['barcode_len'],
+                   barcode_rs_len=config['barcode_rs_len'],
+                   payload_len=config['payload_len'],
+                   payload_rs_len=config['payload_rs_len'],
+                   binary_file_name=config['binary_file_name'],
+                   shrink_dict=config['shrink_dict'],
+                   k_mer=config['k_mer'],
+                   k_mer_representative_to_z=config['algorithm_config']['k_mer_representative_to_z'],
+                   binary_to_z=config['algorithm_config']['binary_to_z'],
+                   subset_size=config['algorithm_config']['subset_size'],
+                   oligos_per_block_len=config['oligos_per_block_len'],
+                   oligos_per_block_rs_len=config['oligos_per_block_rs_len'],
+                   bits_per_z=config['algorithm_config']['bits_per_z'],
+                   barcode_coder=config['barcode_coder'],
+                   payload_coder_rs=config['payload_coder_rs'],
+                   wide_coder=config['wide_coder'],
+                   payload_coder_vt_syndrome=config['payload_coder_vt_syndrome'],
+                   results_file=config['encoder_results_file'],
+                   results_file_without_rs_wide=config['encoder_results_file_without_rs_wide'],
+                   z_to_binary=config['algorithm_config']['z_to_binary'],
+                   z_to_k_mer_in_binary_representative=config['algorithm_config']['z_to_k_mer_representative'],
+                   **kwargs)
+
+
+def encoder_config(tmp_path, name: str):
+    input_file = tmp_path / 'input_text.dna'
+    if not input_file.exists():
+        input_file.write_text('inbal preuss\nשלום dna storage 😀\n' * 60, encoding='utf-8')
+    output_dir = tmp_path / name
+    output_dir.mkdir()
+    config = build_config(input_text_file=input_file, output_dir=output_dir)
+    TextFileToBinaryFile(input_file=input_file, output_file=config['binary_file_name'],
+                         payload_len=config['payload_len'], bits_per_z=config['algorithm_config']['bits_per_z'],
+                         oligos_per_block_len=config['oligos_per_block_len'], k_mer=config['k_mer']).run()
+    return config
+
+
+def test_parallel_encoding_is_byte_identical(tmp_path):
+    serial_config = encoder_config(tmp_path, 'serial')
+    parallel_config = encoder_config(tmp_path, 'parallel')
+
+    serial_number_of_blocks = build_encoder(serial_config).run()
+    parallel_number_of_blocks = build_encoder(parallel_config, number_of_processes=3, blocks_per_task=1).run()
+
+    assert serial_number_of_blocks == parallel_number_of_blocks > 1
+    for key in ['encoder_results_file', 'encoder_results_file_without_rs_wide']:
+        assert parallel_config[key].read_bytes() == serial_config[key].read_bytes()
+    number_of_oligos = serial_number_of_blocks * (serial_config['oligos_per_block_len']
+                                                  + serial_config['oligos_per_block_rs_len'])
+    assert len(serial_config['encoder_results_file'].read_text(encoding='utf-8').splitlines()) == number_of_oligos
+
+
+def test_stream_yields_the_oligos_of_the_results_file(tmp_path):
+    config = encoder_config(tmp_path, 'stream')
+    encoder = build_encoder(config)
+    oligos = list(encoder.stream())
+
+    lines = config['encoder_results_file'].read_text(encoding='utf-8').splitlines()
+    assert [oligo_to_line(oligo.barcode, oligo.payload) for oligo in oligos] == lines
+    assert [oligo.barcode_index for oligo in oligos] == list(range(len(lines)))
+    assert [oligo.barcode[:config['barcode_len']] for oligo in oligos] == \
+        utils.index_range_to_dna_sequences(0, len(lines), sequence_len=config['barcode_len'])
+    assert encoder.number_of_blocks == build_encoder(encoder_config(tmp_path, 'run')).run()
+
+
+def test_resumed_encoding_matches_an_uninterrupted_one(tmp_path):
+    full_config = encoder_config(tmp_path, 'full')
+    number_of_blocks = build_encoder(full_config).run()
+
+    config = encoder_config(tmp_path, 'resumed')
+    encoder = build_encoder(config, checkpoint_interval_blocks=2)
+    oligos = encoder.stream()
+    oligos_per_block = config['oligos_per_block_len'] + config['oligos_per_block_rs_len']
+    for _ in range(3 * oligos_per_block + 5):  # interrupted in the middle of the 4th block
+        next(oligos)
+    del oligos
+    with open(config['encoder_results_file'], 'a', encoding='utf-8') as f:
+        f.write('AAAA,Z1,Z2\n')  # a partially written block
+
+    resumed_number_of_blocks = build_encoder(config, checkpoint_interval_blocks=2, resume=True).run()
+
+    assert resumed_number_of_blocks == number_of_blocks
+    for key in ['encoder_results_file', 'encoder_results_file_without_rs_wide']:
+        assert config[key].read_bytes() == full_config[key].read_bytes()
+
+
+def test_checkpoint_is_only_resumed_with_its_input(tmp_path):
+    config = encoder_config(tmp_path, 'stale')
+    checkpoint_file = f"{config['encoder_results_file']}.checkpoint"
+    build_encoder(config, checkpoint_interval_blocks=1).run()
+    assert not os.path.exists(checkpoint_file)
+
+    oligos = build_encoder(config, checkpoint_interval_blocks=1).stream()
+    for _ in range(config['oligos_per_block_len'] + config['oligos_per_block_rs_len'] + 1):
+        next(oligos)
+    del oligos
+    assert os.path.exists(checkpoint_file)
+    # the pipeline writes every input to the same binary file
+    new_input_file = tmp_path / 'new_input_text.dna'
+    new_input_file.write_text('other data\n' * 70, encoding='utf-8')
+    TextFileToBinaryFile(input_file=new_input_file, output_file=config['binary_file_name'],
+                         payload_len=config['payload_len'], bits_per_z=config['algorithm_config']['bits_per_z'],
+                         oligos_per_block_len=config['oligos_per_block_len'], k_mer=config['k_mer']).run()
+    with pytest.raises(ValueError):
+        build_encoder(config, checkpoint_interval_blocks=1, resume=True)
+
+
+def test_append_encodes_new_blocks_after_the_existing_pool(tmp_path):
+    config = encoder_config(tmp_path, 'pool')
+    first_number_of_blocks = build_encoder(config).run()
+    pool = config['encoder_results_file'].read_text(encoding='utf-8')
+
+    new_input_file = tmp_path / 'new_input_text.dna'
+    new_input_file.write_text('more data for the pool\n' * 30, encoding='utf-8')
+    new_binary_file = tmp_path / 'new_binary.dna'
+    TextFileToBinaryFile(input_file=new_input_file, output_file=new_binary_file,
+                         payload_len=config['payload_len'], bits_per_z=config['algorithm_config']['bits_per_z'],
+                         oligos_per_block_len=config['oligos_per_block_len'], k_mer=config['k_mer']).run()
+    number_of_blocks = build_encoder({**config, 'binary_file_name': new_binary_file}, append=True).run()
+
+    oligos_per_block = config['oligos_per_block_len'] + config['oligos_per_block_rs_len']
+    lines = config['encoder_results_file'].read_text(encoding='utf-8').splitlines()
+    assert ''.join(line + '\n' for line in lines[:first_number_of_blocks * oligos_per_block]) == pool
+    assert len(lines) == number_of_blocks * oligos_per_block
+    assert [line.split(',')[0][:config['barcode_len']] for line in lines] == \
+        utils.index_range_to_dna_sequences(0, len(lines), sequence_len=config['barcode_len'])
+
+    manifest = PoolManifest(manifest_file=f"{config['encoder_results_file']}.manifest",
+                            oligos_per_block_len=config['oligos_per_block_len'],
+                            oligos_per_block_rs_len=config['oligos_per_block_rs_len'])
+    state = manifest.load()
+    assert state['number_of_blocks'] == number_of_blocks > first_number_of_blocks
+    assert state['next_barcode_index'] == len(lines)
+    assert [segment['first_block_index'] for segment in state['segments']] == [0, first_number_of_blocks]
+    assert manifest.barcode_index_range(segment_index=1) == (first_number_of_blocks * oligos_per_block, len(lines))
+
+
+def test_resumed_append_keeps_its_place_in_the_pool(tmp_path):
+    config = encoder_config(tmp_path, 'pool')
+    first_number_of_blocks = build_encoder(config, checkpoint_interval_blocks=2).run()
+
+    new_input_file = tmp_path / 'new_input_text.dna'
+    new_input_file.write_text('more data for the pool\n' * 30, encoding='utf-8')
+    new_config = {**config, 'binary_file_name': tmp_path / 'new_binary.dna'}
+    TextFileToBinaryFile(input_file=new_input_file, output_file=new_config['binary_file_name'],
+                         payload_len=config['payload_len'], bits_per_z=config['algorithm_config']['bits_per_z'],
+                         oligos_per_block_len=config['oligos_per_block_len'], k_mer=config['k_mer']).run()
+    # the checkpoint of the first run is not in the way of resuming the append
+    number_of_blocks = build_encoder(new_config, checkpoint_interval_blocks=2, append=True, resume=True).run()
+    pool = config['encoder_results_file'].read_bytes()
+    # resumed again after its segment is in the manifest
+    assert build_encoder(new_config, checkpoint_interval_blocks=2, append=True, resume=True).run() == number_of_blocks
+
+    assert config['encoder_results_file'].read_bytes() == pool
+    state = PoolManifest(manifest_file=f"{config['encoder_results_file']}.manifest",
+                         oligos_per_block_len=config['oligos_per_block_len'],
+                         oligos_per_block_rs_len=config['oligos_per_block_rs_len']).load()
+    assert state['number_of_blocks'] == number_of_blocks > first_number_of_blocks
+    assert [segment['first_block_index'] for segment in state['segments']] == [0, first_number_of_blocks]
+
+
+def test_resumed_append_must_agree_with_the_given_place(tmp_path):
+    config = encoder_config(tmp_path, 'pool')
+    first_number_of_blocks = build_encoder(config).run()
+    new_input_file = tmp_path / 'new_input_text.dna'
+    new_input_file.write_text('more data for the pool\n' * 30, encoding='utf-8')
+    new_config = {**config, 'binary_file_name': tmp_path / 'new_binary.dna'}
+    TextFileToBinaryFile(input_file=new_input_file, output_file=new_config['binary_file_name'],
+                         payload_len=config['payload_len'], bits_per_z=config['algorithm_config']['bits_per_z'],
+                         oligos_per_block_len=config['oligos_per_block_len'], k_mer=config['k_mer']).run()
+    with pytest.raises(ValueError):
+        build_encoder(new_config, append=True, block_index_offset=first_number_of_blocks - 1)
+    with pytest.raises(ValueError):
+        build_encoder(new_config, block_index_offset=first_number_of_blocks)
+
+    oligos = build_encoder(new_config, checkpoint_interval_blocks=1, append=True,
+                           block_index_offset=first_number_of_blocks + 2).stream()
+    next(oligos)
+    del oligos
+    # a stale checkpoint does not turn a fresh run into an append, or move it
+    with pytest.raises(ValueError):
+        build_encoder(new_config, checkpoint_interval_blocks=1, resume=True, append=False)
+    with pytest.raises(ValueError):
+        build_encoder(new_config, checkpoint_interval_blocks=1, resume=True, append=True,
+                      block_index_offset=first_number_of_blocks)
+
+    encoder = build_encoder(new_config, checkpoint_interval_blocks=1, resume=True)
+    assert (encoder.append, encoder.block_index_offset) == (True, first_number_of_blocks + 2)
+    encoder.run()
+    state = PoolManifest(manifest_file=f"{config['encoder_results_file']}.manifest",
+                         oligos_per_block_len=config['oligos_per_block_len'],
+                         oligos_per_block_rs_len=config['oligos_per_block_rs_len']).load()
+    assert [segment['first_block_index'] for segment in state['segments']] == [0, first_number_of_blocks + 2]
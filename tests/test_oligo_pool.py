@@ -0,0 +1,95 @@
+from collections import Counter
+
+import numpy as np
+
+from dna_storage.config import build_config
+from dna_storage.decoder import Decoder
+from dna_storage.oligo_pool import parse_pool_line, pool_line, sample_pool
+from tests.test_synthesizer import build_synthesizer, write_oligos
+
+
+def expand_pool(text):
+    return Counter({read: count for read, count in map(parse_pool_line, text.splitlines())})
+
+
+def build_decoder(config, tmp_path) -> Decoder:
+    algorithm_config = config['algorithm_config']
+    return Decoder(barcode_len=config['barcode_len'],
+                   barcode_total_len=config['barcode_total_len'],
+                   payload_len=config['payload_len'],
+                   payload_total_len=config['payload_total_len'],
+                   payload_rs_len=config['payload_rs_len'],
+                   input_file=tmp_path / 'sorted.dna',
+                   shrink_dict=config['shrink_dict'],
+                   min_number_of_oligos_per_barcode=config['min_number_of_oligos_per_barcode'],
+                   k_mer=config['k_mer'],
+                   k_mer_representative_to_z=algorithm_config['k_mer_representative_to_z'],
+                   z_to_k_mer_representative=algorithm_config['z_to_k_mer_representative'],
+                   z_to_binary=algorithm_config['z_to_binary'],
+                   k_mer_representation_to_kmer_vector_representation=algorithm_config[
+                       'k_mer_representation_to_kmer_vector_representation'],
+                   kmer_vector_representation_to_mer_representation=algorithm_config[
+                       'kmer_vector_representation_to_mer_representation'],
+                   subset_size=algorithm_config['subset_size'],
+                   oligos_per_block_len=config['oligos_per_block_len'],
+                   oligos_per_block_rs_len=config['oligos_per_block_rs_len'],
+                   drop_if_not_exact_number_of_chunks=config['drop_if_not_exact_number_of_chunks'],
+                   barcode_coder=config['barcode_coder'],
+                   payload_coder_rs=config['payload_coder_rs'],
+                   wide_coder=config['wide_coder'],
+                   payload_coder_vt_syndrome=config['payload_coder_vt_syndrome'],
+                   results_file=tmp_path / 'decoder.dna',
+                   results_file_z_before_rs_payload=tmp_path / 'z_before_rs_payload.dna',
+                   results_file_z_after_rs_payload=tmp_path / 'z_after_rs_payload.dna',
+                   results_file_z_after_rs_wide=tmp_path / 'z_after_rs_wide.dna')
+
+
+def test_pool_lines():
+    assert pool_line('ACGT', 1) == 'ACGT'
+    assert parse_pool_line('ACGT\n') == ('ACGT', 1)
+    assert parse_pool_line(pool_line('ACGT', 37) + '\n') == ('ACGT', 37)
+
+
+def test_count_compressed_synthesis_expands_to_the_plain_synthesis(tmp_path):
+    config = build_config()
+    rng = np.random.default_rng(2)
+    oligos = [(''.join(rng.choice(list('ACGT'), size=16)), rng.integers(1, 65, size=7).tolist()) for _ in range(10)]
+    write_oligos(tmp_path / 'input.dna', oligos)
+    pools = []
+    for count_compressed in [False, True]:
+        results_file = tmp_path / f'synthesis.{count_compressed}.dna'
+        synthesizer = build_synthesizer(config, tmp_path / 'input.dna', results_file,
+                                        letter_substitution_error_ratio=0.01,
+                                        letter_deletion_error_ratio=0.01,
+                                        letter_insertion_error_ratio=0.01)
+        synthesizer.count_compressed = count_compressed
+        synthesizer.synthesize()
+        pools.append(results_file.read_text())
+    assert expand_pool(pools[1]) == Counter(pools[0].splitlines())
+
+
+def test_sample_pool_draws_the_number_of_oligos(tmp_path):
+    (tmp_path / 'pool.dna').write_text('AAAA 50\nCCCC\nGGGG 30\nTTTT 19\n')
+    sample_pool(tmp_path / 'pool.dna', tmp_path / 'sample.dna', number_of_oligos=40, rng=np.random.default_rng(0))
+    sample = expand_pool((tmp_path / 'sample.dna').read_text())
+    assert sum(sample.values()) == 40
+    assert all(sample[read] <= count for read, count in expand_pool('AAAA 50\nCCCC\nGGGG 30\nTTTT 19\n').items())
+    assert set(sample) <= {'AAAA', 'CCCC', 'GGGG', 'TTTT'}
+
+    sample_pool(tmp_path / 'pool.dna', tmp_path / 'sample.dna', number_of_oligos=1000, rng=np.random.default_rng(0))
+    assert (tmp_path / 'sample.dna').read_text() == (tmp_path / 'pool.dna').read_text()
+
+
+def test_payload_histogram_of_counts_matches_the_expanded_payloads(tmp_path):
+    config = build_config()
+    decoder = build_decoder(config, tmp_path)
+    k_mers = sorted(config['shrink_dict'])
+    rng = np.random.default_rng(3)
+    payloads = [''.join(rng.choice(k_mers, size=config['payload_total_len'])) for _ in range(5)]
+    counts = [3, 1, 7, 2, 5]
+    expanded = [payload for payload, count in zip(payloads, counts) for _ in range(count)]
+
+    assert decoder.dna_to_unique_payload(payloads, counts) == decoder.dna_to_unique_payload(expanded)
+    shrunk, shrunk_counts = decoder.shrink_payload(payloads, counts)
+    assert decoder.payload_histogram(shrunk, shrunk_counts) == decoder.payload_histogram(
+        decoder.shrink_payload(expanded, [1] * len(expanded))[0])
@@ -0,0 +1,24 @@
+import gzip
+
+from dna_storage.oligo_writer import open_oligo_writer
+
+
+def test_oligo_writer_fans_out_and_writes_on_flush(tmp_path):
+    results_file = tmp_path / 'results.dna'
+    without_rs_wide_file = tmp_path / 'without_rs_wide.dna'
+    compressed_file = tmp_path / 'results.dna.gz'
+    oligos = [f'AACGTTGCAAGT,Z{z},Z1,Z2,Z3,Z4,Z5,Z6' for z in range(1, 8)]
+
+    with open_oligo_writer(results_file=results_file, results_file_without_rs_wide=without_rs_wide_file,
+                           results_file_compressed=compressed_file) as writer:
+        for idx, oligo in enumerate(oligos):
+            writer.write(oligo, 'results', 'results_compressed')
+            if idx < 5:
+                writer.write(oligo, 'without_rs_wide')
+        assert results_file.read_text(encoding='utf-8') == ''
+        writer.flush()
+        assert results_file.read_text(encoding='utf-8') == '\n'.join(oligos) + '\n'
+
+    assert without_rs_wide_file.read_text(encoding='utf-8') == '\n'.join(oligos[:5]) + '\n'
+    with gzip.open(compressed_file, 'rt', encoding='utf-8') as f:
+        assert f.read() == '\n'.join(oligos) + '\n'
@@ -0,0 +1,180 @@
+from concurrent.futures import ThreadPoolExecutor
+import pickle
+
+import numpy as np
+from unireedsolomon.unireedsolomon import RSCodecError
+
+from dna_storage import utils
+from dna_storage.config import build_config
+from dna_storage.rs_adapter import RSBarcodeAdapter, RSWideAdapter
+from dna_storage.symbols import Z_ERASURE
+from tests.test_oligo_pool import build_decoder
+
+
+def test_encoded_barcode_table_matches_encode():
+    barcode_coder = RSBarcodeAdapter(bits_per_z=6, barcode_len=12, barcode_rs_len=4)
+    barcodes = utils.index_range_to_dna_sequences(4090, 4130, sequence_len=12)
+
+    assert barcode_coder.encode_range(4090, 4130) == [barcode_coder.encode(barcode) for barcode in barcodes]
+
+
+def test_encoded_barcode_table_cache_is_reused(tmp_path):
+    expected = RSBarcodeAdapter(bits_per_z=6, barcode_len=12, barcode_rs_len=4,
+                                cache_dir=tmp_path).encode_range(100, 164)
+
+    def fail(barcode):
+        raise AssertionError(f'{barcode} should have been read from the cache')
+
+    barcode_coder = RSBarcodeAdapter(bits_per_z=6, barcode_len=12, barcode_rs_len=4, cache_dir=tmp_path)
+    barcode_coder._encoded_barcode_table.encode_barcode = fail
+    assert barcode_coder.encode_range(100, 164) == expected
+
+
+def test_wide_encode_block_matches_column_encode():
+    rng = np.random.default_rng(0)
+    for payload_len, payload_rs_len in [(30, 2), (42, 6)]:
+        wide_coder = RSWideAdapter(bits_per_z=6, payload_len=payload_len, payload_rs_len=payload_rs_len)
+        block = rng.integers(1, 2 ** 6 + 1, size=(payload_len, 7))
+        expected = np.array([wide_coder.encode(payload=list(block[:, col])) for col in range(block.shape[1])]).T
+
+        assert np.array_equal(wide_coder.encode_block(block), expected)
+
+
+def test_payload_encode_block_matches_row_encode():
+    config = build_config()
+    payload_coder = config['payload_coder_rs']
+    vt_syndrome = config['payload_coder_vt_syndrome']
+    bits_per_z = config['algorithm_config']['bits_per_z']
+    values = np.random.default_rng(0).integers(0, 2 ** bits_per_z, size=(50, config['payload_len']))
+    expected = []
+    for row in values:
+        binary_list = [utils.decimal_to_bits(int(value), amount_bits=bits_per_z) for value in row]
+        payload = [payload_coder.binary_to_z[tuple(int(bit) for bit in binary)] for binary in binary_list]
+        syndromes, xs_array = vt_syndrome.encode(binary_list=binary_list)
+        expected.append(payload_coder.encode(payload=payload, payload_encoded_after_vt_syndrome=syndromes,
+                                             binary_list=binary_list, xs_array=xs_array))
+
+    assert payload_coder.encode_block(values).tolist() == expected
+    syndromes, codeword_bitmasks = vt_syndrome.encode_block(values)
+    for row, row_syndromes, row_bitmasks in zip(values, syndromes, codeword_bitmasks):
+        for value, syndrome, bitmask in zip(row, row_syndromes, row_bitmasks):
+            bits = tuple(int(bit) for bit in utils.decimal_to_bits(int(value), amount_bits=bits_per_z))
+            assert syndrome == vt_syndrome.get_syn_from_input_bits(bits)
+            assert bitmask == utils.bits_to_int(vt_syndrome.encode_message(bits)[::-1])
+
+
+def test_adapters_of_different_fields_run_in_threads():
+    rng = np.random.default_rng(0)
+    barcodes = utils.index_range_to_dna_sequences(0, 50, sequence_len=12)
+    payload_columns = rng.integers(1, 2 ** 6 + 1, size=(50, 30))
+    decoded = {}
+    for backend in ['numpy', 'unireedsolomon']:
+        barcode_coder = RSBarcodeAdapter(bits_per_z=6, barcode_len=12, barcode_rs_len=4, backend=backend)
+        wide_coder = RSWideAdapter(bits_per_z=6, payload_len=30, payload_rs_len=2, backend=backend)
+        barcodes_encoded = [barcode_coder.encode(barcode) for barcode in barcodes]
+        received_barcodes = [barcode[:3] + ('A' if barcode[3] != 'A' else 'C') + barcode[4:]
+                             for barcode in barcodes_encoded]
+        columns = [wide_coder.encode(payload=list(column)) for column in payload_columns]
+        received_columns = [[1] + column[1:] for column in columns]
+
+        def decode_barcode(i):
+            return ''.join(barcode_coder.decode(received_barcodes[i]))
+
+        def decode_column(i):
+            return wide_coder.decode(received_columns[i], erasures_pos=[0])
+
+        # the legacy backend is single-threaded: only the NumPy one runs in the threads
+        decoded[backend] = [(decode_barcode(i), decode_column(i)) for i in range(50)]
+        if backend == 'numpy':
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                barcodes_decoded = executor.map(decode_barcode, range(50))
+                columns_decoded = executor.map(decode_column, range(50))
+                assert list(zip(barcodes_decoded, columns_decoded)) == decoded[backend]
+
+    assert decoded['unireedsolomon'] == decoded['numpy']
+    assert [barcode for barcode, _ in decoded['numpy']] == barcodes
+    assert [column for _, column in decoded['numpy']] == payload_columns.tolist()
+
+
+def test_barcode_decode_cache_counts_hits():
+    barcode_coder = RSBarcodeAdapter(bits_per_z=6, barcode_len=12, barcode_rs_len=4, decode_cache_size=4)
+    barcode = barcode_coder.encode('ACGTACGTACGT')
+    received = [barcode, 'T' + barcode[1:], 'TT' + barcode[2:-2] + 'TT', barcode]
+    decoded = [barcode_coder.decode(list(barcode_encoded)) for barcode_encoded in received]
+
+    assert decoded[0] == decoded[1] == decoded[3] == list('ACGTACGTACGT')
+    info = barcode_coder.decode_cache_info()
+    assert (info.hits, info.misses) == (1, 3)
+    uncached = RSBarcodeAdapter(bits_per_z=6, barcode_len=12, barcode_rs_len=4, decode_cache_size=0)
+    for barcode_encoded, barcode_decoded in zip(received, decoded):
+        assert uncached.decode(barcode_encoded) == barcode_decoded
+
+
+def test_barcode_adapter_pickles_with_a_new_decode_cache():
+    barcode_coder = RSBarcodeAdapter(bits_per_z=6, barcode_len=12, barcode_rs_len=4)
+    barcode = barcode_coder.encode('ACGTACGTACGT')
+    barcode_coder.decode(barcode)
+    copy = pickle.loads(pickle.dumps(barcode_coder))
+
+    assert copy.decode('T' + barcode[1:]) == list('ACGTACGTACGT')
+    assert copy.encode_range(0, 8) == barcode_coder.encode_range(0, 8)
+    assert (copy.decode_cache_info().hits, copy.decode_cache_info().misses) == (0, 1)
+
+
+def test_adapter_decode_blocks_match_row_decodes():
+    rng = np.random.default_rng(1)
+    barcode_coder = RSBarcodeAdapter(bits_per_z=6, barcode_len=12, barcode_rs_len=4)
+    barcodes = barcode_coder.encode_range(0, 40)
+    received_barcodes = [barcode if i % 3 == 0 else
+                         ''.join(rng.choice(list('ACGT'), size=i % 4)) + barcode[i % 4:] for i, barcode in
+                         enumerate(barcodes)] + [barcodes[0][:-2], barcodes[1] + 'AC']
+    expected = []
+    for barcode in received_barcodes:
+        try:
+            expected.append(''.join(barcode_coder.decode(barcode)))
+        except RSCodecError:
+            expected.append(None)
+    assert barcode_coder.decode_block(received_barcodes) == expected
+    assert None in expected
+
+    wide_coder = RSWideAdapter(bits_per_z=6, payload_len=30, payload_rs_len=2)
+    columns = wide_coder.encode_block(rng.integers(1, 2 ** 6 + 1, size=(30, 50))).T
+    columns[::2, 4] = rng.integers(1, 2 ** 6 + 1, size=25)
+    columns[1::3, 7] = Z_ERASURE
+    columns[::5, 11] = rng.integers(1, 2 ** 6 + 1, size=10)
+    erasures = columns == Z_ERASURE
+    assert wide_coder.decode_block(columns, erasures) == [
+        wide_coder.decode(column, erasures_pos=np.flatnonzero(row_erasures).tolist())
+        for column, row_erasures in zip(columns.tolist(), erasures)]
+
+    payload_coder = build_config()['payload_coder_rs']
+    n = payload_coder.payload_len + payload_coder.payload_rs_len
+    codewords = payload_coder._block_coder.encode_block(
+        rng.integers(0, 2 ** payload_coder.bits_per_syndrome, size=(50, payload_coder.payload_len)))
+    codewords[::2, 1] ^= 1
+    codewords[::3, n - 1] ^= 2
+    erasures = np.zeros(codewords.shape, dtype=bool)
+    erasures[1::4, 0] = True
+    assert payload_coder.decode_block(codewords, erasures).tolist() == [
+        list(payload_coder.decode(codeword, erasures_pos=np.flatnonzero(row_erasures).tolist()))
+        for codeword, row_erasures in zip(codewords.tolist(), erasures)]
+
+
+def test_decoder_block_error_correction_matches_row_calls(tmp_path):
+    config = build_config()
+    decoder = build_decoder(config, tmp_path)
+    rng = np.random.default_rng(2)
+    payloads = rng.integers(1, 2 ** config['algorithm_config']['bits_per_z'] + 1,
+                            size=(40, config['payload_total_len'])).tolist()
+    payload_k_mer_reps = [[decoder.z_to_k_mer_representative[z] for z in payload] for payload in payloads]
+    for i, (payload, payload_k_mer_rep) in enumerate(zip(payloads, payload_k_mer_reps)):
+        for col in range(i % 4):
+            payload[col] = Z_ERASURE
+            payload_k_mer_rep[col] = (0,) + payload_k_mer_rep[col][1:]
+    assert decoder.error_correction_payload_block(payloads, payload_k_mer_reps) == [
+        decoder.error_correction_payload(payload=payload, payload_k_mer_rep=payload_k_mer_rep)
+        for payload, payload_k_mer_rep in zip(payloads, payload_k_mer_reps)]
+
+    columns = np.array(payloads[:config['oligos_per_block_len'] + config['oligos_per_block_rs_len']]).T
+    assert decoder.error_correction_wide_block(columns) == [
+        decoder.error_correction_payload(payload=column, payload_or_wide='wide')[0] for column in columns.tolist()]
@@ -0,0 +1,85 @@
+import random
+
+import numpy as np
+import pytest
+from unireedsolomon.unireedsolomon import rs, ff, RSCodecError
+
+from dna_storage.rs_engine import RSCodec
+
+
+def _decode_or_error(coder, r, erasures_pos, only_erasures=False):
+    try:
+        ret, ecc = coder.decode(list(r), nostrip=True, erasures_pos=erasures_pos, only_erasures=only_erasures,
+                                return_string=False)
+    except RSCodecError:
+        return 'RSCodecError'
+    return [int(x) for x in ret], [int(x) for x in ecc]
+
+
+def test_rs_codec_matches_unireedsolomon():
+    rnd = random.Random(0)
+    # the barcode, payload and wide coders of the prod config
+    for n, k, generator, c_exp in [(8, 6, 3, 4), (7, 5, 2, 3), (32, 30, 3, 6)]:
+        prim = ff.find_prime_polynomials(generator=generator, c_exp=c_exp, fast_primes=False, single=True)
+        reference = rs.RSCoder(n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+        ff_globals = ff.get_globals()
+        coder = RSCodec(n=n, k=k, generator=generator, prim=prim, c_exp=c_exp)
+        for _ in range(300):
+            ff.set_globals(*ff_globals)
+            message = [rnd.randrange(2 ** c_exp) for _ in range(k)]
+            codeword = coder.encode_fast(message)
+            assert codeword == [int(x) for x in reference.encode_fast(message, return_string=False)]
+            r = list(codeword)
+            for pos in rnd.sample(range(n), rnd.randrange(n - k + 3)):
+                r[pos] = rnd.randrange(2 ** c_exp)
+            erasures_pos = sorted(rnd.sample(range(n), rnd.randrange(n - k + 2))) if rnd.random() < 0.5 else None
+            assert coder.check(r) == reference.check(r)
+            assert _decode_or_error(coder, r, erasures_pos) == _decode_or_error(reference, r, erasures_pos)
+            if erasures_pos:
+                assert (_decode_or_error(coder, r, erasures_pos, only_erasures=True) ==
+                        _decode_or_error(reference, r, erasures_pos, only_erasures=True))
+
+
+def test_rs_codec_encode_block_matches_row_calls():
+    coder = RSCodec(n=32, k=30, generator=3, prim=73, c_exp=6)
+    rng = np.random.default_rng(0)
+    codewords = coder.encode_block(rng.integers(0, 64, size=(40, 30)))
+    assert codewords.tolist() == [coder.encode(list(row)) for row in codewords[:, :30].tolist()]
+    assert all(coder.check(row) for row in codewords.tolist())
+
+
+def test_rs_codec_check_and_decode_blocks_match_row_calls():
+    coder = RSCodec(n=32, k=30, generator=3, prim=73, c_exp=6)
+    rng = np.random.default_rng(1)
+    received = coder.encode_block(rng.integers(0, 64, size=(60, 30)))
+    received[::2, 5] ^= 17
+    received[1::3, [3, 8, 20]] = rng.integers(0, 64, size=(20, 3))
+    erasures = np.zeros(received.shape, dtype=bool)
+    erasures[1::4, 9] = True
+    received[erasures] = 0
+
+    assert coder.check_block(received).tolist() == [coder.check(row) for row in received.tolist()]
+    expected = [_decode_or_error(coder, row, np.flatnonzero(row_erasures).tolist())
+                for row, row_erasures in zip(received.tolist(), erasures)]
+    assert [decoded if decoded is not None else 'RSCodecError'
+            for decoded in coder.decode_block(received, erasures=erasures)] == expected
+    # some rows are corrected
+    assert any(decoded != 'RSCodecError' and decoded[0] + decoded[1] != row
+               for decoded, row in zip(expected, received.tolist()))
+
+
+def test_rs_codec_only_erasures_corrects_n_minus_k_erasures():
+    coder = RSCodec(n=8, k=4, generator=3, prim=19, c_exp=4)
+    codeword = coder.encode([3, 1, 4, 1])
+    received = list(codeword)
+    for pos in [0, 2, 5, 7]:
+        received[pos] = 0
+    ret, ecc = coder.decode(received, nostrip=True, erasures_pos=[0, 2, 5, 7], only_erasures=True)
+    assert ret + ecc == codeword
+
+    with pytest.raises(ValueError):
+        coder.decode(received, only_erasures=True)
+    with pytest.raises(ValueError):
+        coder.encode([3, 1, 4], k=3)
+    with pytest.raises(TypeError):
+        coder.check('abcdefgh')
@@ -0,0 +1,17 @@
+from dna_storage.symbols import Z_ERASURE, line_to_oligo, oligo_to_line, x_tuple_keys_to_int, z_values_to_int
+
+
+def test_oligo_line_round_trip():
+    line = 'AACGTTGCAAGT,Z1,Z64,Z0,Z17,Z3,Z42,Z8'
+    barcode, z_list = line_to_oligo(line + '\n')
+
+    assert barcode == 'AACGTTGCAAGT'
+    assert z_list == [1, 64, Z_ERASURE, 17, 3, 42, 8]
+    assert oligo_to_line(barcode, z_list) == line
+
+
+def test_config_dicts_convert_to_integer_symbols():
+    k_mer_representative_to_z = {('X1', 'X2', 'X3', 'X4'): 'Z1', ('X5', 'X6', 'X7', 'X8'): 'Z64'}
+
+    assert z_values_to_int(k_mer_representative_to_z) == {('X1', 'X2', 'X3', 'X4'): 1, ('X5', 'X6', 'X7', 'X8'): 64}
+    assert x_tuple_keys_to_int(k_mer_representative_to_z) == {(1, 2, 3, 4): 'Z1', (5, 6, 7, 8): 'Z64'}
@@ -0,0 +1,144 @@
+import numpy as np
+
+from dna_storage.config import build_config
+from dna_storage.mock_synthesizer import Synthesizer, oligo_rng
+from dna_storage.symbols import oligo_to_line, x_tuple_from_names, z_values_to_int
+
+
+def build_synthesizer(config, input_file, results_file, **synthesis_config) -> Synthesizer:
+    return Synthesizer(input_file=input_file,
+                       results_file=results_file,
+                       synthesis_config={**config['synthesis'], **synthesis_config},
+                       barcode_total_len=config['barcode_total_len'],
+                       subset_size=config['algorithm_config']['subset_size'],
+                       z_to_k_mer_representative=config['algorithm_config']['z_to_k_mer_representative'],
+                       k_mer_to_dna=config['algorithm_config']['k_mer_to_dna'],
+                       k_mer=config['k_mer'])
+
+
+def write_oligos(input_file, oligos):
+    input_file.write_text(''.join(oligo_to_line(barcode, payload) + '\n' for barcode, payload in oligos))
+
+
+def test_synthesized_k_mers_are_in_the_subset_of_their_z(tmp_path):
+    config = build_config()
+    oligos = [('ACGTACGTACGTAAAA', [1, 5, 64, 17, 2, 33, 40]), ('TTTTACGTACGTCCCC', [64, 63, 1, 2, 3, 4, 5])]
+    write_oligos(tmp_path / 'input.dna', oligos)
+    synthesizer = build_synthesizer(config, tmp_path / 'input.dna', tmp_path / 'synthesis.dna')
+    synthesizer.synthesize()
+
+    k_mer = config['k_mer']
+    k_mer_to_dna = config['algorithm_config']['k_mer_to_dna']
+    z_to_subset_dna = {z: {k_mer_to_dna[x] for x in x_tuple}
+                       for x_tuple, z in z_values_to_int(config['algorithm_config']['k_mer_representative_to_z']).items()}
+    reads = (tmp_path / 'synthesis.dna').read_text().splitlines()
+    assert len(reads) > 2 * 10
+    copies = {barcode: 0 for barcode, _ in oligos}
+    for read in reads:
+        barcode, payload = read[:config['barcode_total_len']], read[config['barcode_total_len']:]
+        copies[barcode] += 1
+        z_list = dict(oligos)[barcode]
+        assert len(payload) == len(z_list) * k_mer
+        for i, z in enumerate(z_list):
+            assert payload[i * k_mer:(i + 1) * k_mer] in z_to_subset_dna[z]
+    assert all(copy_count > 0 for copy_count in copies.values())
+
+
+def test_synthesis_is_reproducible_with_a_seed(tmp_path):
+    config = build_config()
+    write_oligos(tmp_path / 'input.dna', [('ACGTACGTACGTAAAA', [1, 5, 64, 17, 2, 33, 40])])
+    results = []
+    for name in ['a', 'b']:
+        synthesizer = build_synthesizer(config, tmp_path / 'input.dna', tmp_path / f'{name}.dna',
+                                        letter_substitution_error_ratio=0.05,
+                                        letter_deletion_error_ratio=0.05,
+                                        letter_insertion_error_ratio=0.05)
+        synthesizer.synthesize()
+        results.append((tmp_path / f'{name}.dna').read_text())
+    assert results[0] == results[1]
+    assert len(set(results[0].splitlines())) > 1
+
+
+def test_a_fresh_seed_is_written_and_repeats_the_synthesis(tmp_path):
+    config = build_config()
+    write_oligos(tmp_path / 'input.dna', [('ACGTACGTACGTAAAA', [1, 5, 64, 17, 2, 33, 40])])
+    error_ratios = {'letter_substitution_error_ratio': 0.05, 'letter_deletion_error_ratio': 0.05,
+                    'letter_insertion_error_ratio': 0.05}
+    build_synthesizer(config, tmp_path / 'input.dna', tmp_path / 'a.dna', seed=None, **error_ratios).synthesize()
+    seed = int((tmp_path / 'a.dna.seed').read_text())
+    build_synthesizer(config, tmp_path / 'input.dna', tmp_path / 'b.dna', seed=seed, **error_ratios).synthesize()
+
+    assert (tmp_path / 'a.dna').read_text() == (tmp_path / 'b.dna').read_text()
+
+
+def test_insertion_deletion_substitution_block(tmp_path):
+    config = build_config()
+    k_mer = config['k_mer']
+    k_mers = set(config['algorithm_config']['k_mer_to_dna'].values())
+    rng = np.random.default_rng(0)
+    payload = rng.choice(sorted(k_mers), size=(50, 7))
+    mat = np.frombuffer(''.join(payload.ravel()).encode('ascii'), dtype=np.uint8).reshape(50, 7 * k_mer)
+
+    def reads(group_size, **error_ratios):
+        synthesis_config = {'letter_substitution_error_ratio': 0, 'letter_deletion_error_ratio': 0,
+                            'letter_insertion_error_ratio': 0, **error_ratios}
+        synthesizer = build_synthesizer(config, tmp_path / 'input.dna', tmp_path / 'synthesis.dna', **synthesis_config)
+        letters, valid = synthesizer.insertion_deletion_substitution(mat, group_size=group_size, rng=rng)
+        return [row[row_valid].tobytes().decode('ascii') for row, row_valid in zip(letters, valid)]
+
+    originals = [''.join(row) for row in payload]
+    assert reads(k_mer) == originals
+    assert reads(1, letter_deletion_error_ratio=1) == [''] * 50
+    for read, row in zip(reads(k_mer, letter_insertion_error_ratio=1), payload):
+        groups = [read[pos:pos + k_mer] for pos in range(0, len(read), k_mer)]
+        assert groups[::2] == list(row) and set(groups[1::2]) <= k_mers
+    for read, original in zip(reads(1, letter_substitution_error_ratio=1), originals):
+        assert len(read) == len(original) and all(a != b for a, b in zip(read, original))
+    for read, row in zip(reads(k_mer, letter_deletion_error_ratio=0.5), payload):
+        groups = iter(row)
+        assert all(group in groups for group in [read[pos:pos + k_mer] for pos in range(0, len(read), k_mer)])
+
+
+def test_get_x_list_matches_k_mer_representative_to_z(tmp_path):
+    config = build_config()
+    synthesizer = build_synthesizer(config, tmp_path / 'input.dna', tmp_path / 'synthesis.dna')
+    z_to_x_tuple = {z: x_tuple_from_names(x_tuple) for x_tuple, z in
+                    z_values_to_int(config['algorithm_config']['k_mer_representative_to_z']).items()}
+    payload = [1, 64, 17, 2, 33, 17]
+
+    assert synthesizer.get_x_list(payload) == [z_to_x_tuple[z] for z in payload]
+
+
+def test_synthesis_does_not_depend_on_the_number_of_processes(tmp_path):
+    config = build_config()
+    rng = np.random.default_rng(1)
+    oligos = [(''.join(rng.choice(list('ACGT'), size=16)), rng.integers(1, 65, size=7).tolist()) for _ in range(30)]
+    write_oligos(tmp_path / 'input.dna', oligos)
+    results = []
+    for number_of_processes, oligos_per_task in [(1, 64), (2, 1), (3, 4)]:
+        results_file = tmp_path / f'synthesis.{number_of_processes}.dna'
+        synthesizer = build_synthesizer(config, tmp_path / 'input.dna', results_file,
+                                        letter_substitution_error_ratio=0.01,
+                                        letter_deletion_error_ratio=0.01,
+                                        letter_insertion_error_ratio=0.01)
+        synthesizer.number_of_processes = number_of_processes
+        synthesizer.oligos_per_task = oligos_per_task
+        synthesizer.synthesize()
+        results.append(results_file.read_text())
+    assert results[0] == results[1] == results[2]
+
+    root_seed = np.random.SeedSequence(0)
+    children = np.random.SeedSequence(0).spawn(3)
+    assert oligo_rng(root_seed, 2).random() == np.random.default_rng(children[2]).random()
+
+
+def test_synthesis_with_the_default_config_is_deterministic(tmp_path):
+    config = build_config()
+    write_oligos(tmp_path / 'input.dna', [('ACGTACGTACGTAAAA', [1, 5, 64, 17, 2, 33, 40]),
+                                          ('TTTTACGTACGTCCCC', [64, 63, 1, 2, 3, 4, 5])])
+    results = []
+    for name in ['a', 'b']:
+        build_synthesizer(config, tmp_path / 'input.dna', tmp_path / f'{name}.dna').synthesize()
+        results.append((tmp_path / f'{name}.dna').read_text())
+    assert results[0] == results[1]
+    assert (tmp_path / 'a.dna.seed').read_text() == (tmp_path / 'b.dna.seed').read_text()
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from dna_storage.binary_format import BinaryFileReader, is_packed_binary_file
+from dna_storage.text_handling import TextFileToBinaryFile, BinaryResultToText, BinaryResultToBytes, DecoderResultToBinary
+from dna_storage.utils import index_range_to_dna_sequences
+
+
+def text_file_to_binary_rows(tmp_path, text: str, binary_format: str, oligos_per_block_len: int = 30):
+    input_file = tmp_path / 'input_text.dna'
+    input_file.write_text(text, encoding='utf-8')
+    output_file = tmp_path / f'binary.{binary_format}.dna'
+    TextFileToBinaryFile(input_file=input_file, output_file=output_file, payload_len=6, bits_per_z=6,
+                         oligos_per_block_len=oligos_per_block_len, k_mer=3, binary_format=binary_format).run()
+    reader = BinaryFileReader(output_file, record_bits=36)
+    return output_file, reader, np.concatenate(list(reader.iter_rows(rows_per_chunk=7)))
+
+
+def test_packed_and_text_binary_formats_hold_the_same_rows(tmp_path):
+    text = 'inbal preuss\nשלום dna storage 😀\n' * 40
+    packed_file, packed_reader, packed_rows = text_file_to_binary_rows(tmp_path, text, 'packed')
+    text_file, _, text_rows = text_file_to_binary_rows(tmp_path, text, 'text')
+
+    assert is_packed_binary_file(packed_file)
+    assert not is_packed_binary_file(text_file)
+    assert np.array_equal(packed_rows, text_rows)
+    assert np.array_equal(np.concatenate(list(BinaryFileReader(text_file, record_bits=36).iter_rows(first_row=25))),
+                          packed_rows[25:])
+    assert packed_rows.shape[0] % 30 == 0
+    assert packed_file.stat().st_size < text_file.stat().st_size / 6
+
+    n_bits = len(text.encode('utf-8')) * 8
+    data_rows = -(-n_bits // 36)
+    assert packed_reader.z_fill == data_rows * 36 - n_bits
+    assert packed_reader.number_of_padding_rows == packed_rows.shape[0] - data_rows - 1
+    n_zeros = int(''.join(map(str, packed_rows[-1])), 2)
+    assert n_zeros == packed_reader.number_of_padding_rows * 36 + packed_reader.z_fill
+
+
+def test_bit_rows_do_not_depend_on_the_read_chunk_size(tmp_path):
+    text = 'dna storage using shortmers ✓\n' * 25
+    input_file = tmp_path / 'input_text.dna'
+    input_file.write_text(text, encoding='utf-8')
+    rows = []
+    for chunk_size in [1, 7, 2 ** 20]:
+        output_file = tmp_path / f'binary.{chunk_size}.dna'
+        TextFileToBinaryFile(input_file=input_file, output_file=output_file, payload_len=6, bits_per_z=6,
+                             oligos_per_block_len=30, k_mer=3, chunk_size=chunk_size).run()
+        rows.append(np.concatenate(list(BinaryFileReader(output_file).iter_rows())))
+
+    expected_bits = ''.join(format(byte, '08b') for byte in text.encode('utf-8'))
+    assert ''.join(map(str, rows[0].ravel()))[:len(expected_bits)] == expected_bits
+    assert all(np.array_equal(rows[0], other) for other in rows[1:])
+
+
+def test_binary_result_to_text_strips_the_padding_without_touching_its_input(tmp_path):
+    text = 'inbal preuss\nשלום dna storage 😀\n' * 40
+    binary_file, _, _ = text_file_to_binary_rows(tmp_path, text, 'text')
+    binary_data = binary_file.read_bytes()
+    output_file = tmp_path / 'text_results_file.dna'
+    BinaryResultToText(input_file=binary_file, output_file=output_file, barcode_len=12, payload_len=6,
+                       bits_per_z=6, chunk_size=64).run()
+
+    assert output_file.read_text(encoding='utf-8') == text
+    assert binary_file.read_bytes() == binary_data
+
+
+def test_raw_bytes_round_trip_is_bytes_exact(tmp_path):
+    data = bytes(range(256)) * 7 + b'\x00\x00\xff\r\n'
+    input_file = tmp_path / 'archive.tar.gz'
+    input_file.write_bytes(data)
+    binary_file = tmp_path / 'binary.dna'
+    TextFileToBinaryFile(input_file=input_file, output_file=binary_file, payload_len=6, bits_per_z=6,
+                         oligos_per_block_len=30, k_mer=3, binary_format='text', input_mode='bytes',
+                         chunk_size=100).run()
+    output_file = tmp_path / 'archive.out'
+    BinaryResultToBytes(input_file=binary_file, output_file=output_file, barcode_len=12, payload_len=6,
+                        bits_per_z=6).run()
+
+    assert output_file.read_bytes() == data
+
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_parallel_conversion_matches_the_serial_one(tmp_path, newline):
+    text = f'inbal preuss{newline}שלום dna storage 😀{newline}' * 200
+    _, serial_reader, serial_rows = text_file_to_binary_rows(tmp_path, text, 'packed')
+    parallel_file = tmp_path / 'binary.parallel.dna'
+    TextFileToBinaryFile(input_file=tmp_path / 'input_text.dna', output_file=parallel_file, payload_len=6,
+                         bits_per_z=6, oligos_per_block_len=30, k_mer=3, chunk_size=100,
+                         number_of_processes=3).run()
+    parallel_reader = BinaryFileReader(parallel_file)
+
+    assert np.array_equal(np.concatenate(list(parallel_reader.iter_rows())), serial_rows)
+    assert parallel_reader.z_fill == serial_reader.z_fill
+    assert parallel_reader.number_of_padding_rows == serial_reader.number_of_padding_rows
+
+
+def test_unknown_input_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        TextFileToBinaryFile(input_file=tmp_path / 'input_text.dna', output_file=tmp_path / 'binary.dna', payload_len=6,
+                             bits_per_z=6, oligos_per_block_len=30, k_mer=3, input_mode='latin-1')
+
+
+def test_decoder_result_to_binary_keeps_one_barcode_range(tmp_path):
+    decoder_results_file = tmp_path / 'decoder_results_file.dna'
+    barcodes = index_range_to_dna_sequences(0, 8, sequence_len=12)
+    decoder_results_file.write_text(''.join(f'{barcode}{idx:036b}\n' for idx, barcode in enumerate(barcodes)),
+                                    encoding='utf-8')
+    binary_results_file = tmp_path / 'binary_results_file.dna'
+    DecoderResultToBinary(input_file=decoder_results_file, output_file=binary_results_file, barcode_len=12,
+                          barcode_index_range=(3, 6)).run()
+
+    assert binary_results_file.read_text(encoding='utf-8') == ''.join(f'{idx:036b}\n' for idx in range(3, 6))
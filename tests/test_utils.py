@@ -0,0 +1,20 @@
+import numpy as np
+
+from dna_storage import utils
+
+
+def test_barcode_index_api_matches_the_sequential_generator():
+    generator = utils.dna_sequence_generator(sequence_len=6)
+    barcodes = [''.join(next(generator)) for _ in range(4 ** 6)]
+
+    assert utils.index_range_to_dna_sequences(0, 4 ** 6, sequence_len=6) == barcodes
+    assert utils.index_range_to_dna_sequences(100, 132, sequence_len=6) == barcodes[100:132]
+    assert all(utils.index_to_dna_sequence(idx, sequence_len=6) == barcode for idx, barcode in enumerate(barcodes))
+    assert all(utils.dna_sequence_to_index(barcode) == idx for idx, barcode in enumerate(barcodes))
+    assert np.array_equal(utils.dna_sequences_to_indices(barcodes), np.arange(4 ** 6))
+
+
+def test_barcode_index_api_edges():
+    assert utils.index_to_dna_sequence(4 ** 12 - 1) == 'T' * 12
+    assert utils.index_range_to_dna_sequences(5, 5) == []
+    assert list(utils.dna_sequences_to_indices(['ACGN', 'ACGT'])) == [-1, 27]
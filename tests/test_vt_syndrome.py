@@ -0,0 +1,99 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from dna_storage import utils
+from dna_storage import vt_syndrome_utils
+from dna_storage.config import build_config
+from dna_storage.symbols import Z_ERASURE
+from dna_storage.vt_syndrome_utils import VTSyndromeUtils
+from tests.test_oligo_pool import build_decoder
+
+
+def test_vt_decode_block_matches_decode():
+    vt_syndrome = build_config()['payload_coder_vt_syndrome']
+    bitmasks = np.arange(2 ** vt_syndrome.n)
+    codewords = [tuple(int(bit) for bit in reversed(utils.decimal_to_bits(int(bitmask), amount_bits=vt_syndrome.n)))
+                 for bitmask in bitmasks]
+
+    assert vt_syndrome.syndrome_block(bitmasks).tolist() == [vt_syndrome.codeword_to_syndrome(codeword)
+                                                              for codeword in codewords]
+    for syn_output_from_rs in range(2 ** vt_syndrome.bits_per_syndrome):
+        decoded = vt_syndrome.decode_block(bitmasks, np.full(len(bitmasks), syn_output_from_rs))
+        expected = [utils.bits_to_int(vt_syndrome.decode(codeword, syn_output_from_rs)[::-1]) for codeword in codewords]
+        assert decoded.tolist() == expected
+
+
+def test_vt_dense_tables_match_the_arithmetic(tmp_path):
+    config = build_config()
+    vt_syndrome = config['payload_coder_vt_syndrome']
+    assert vt_syndrome.decode_table is not None
+    bitmasks = np.repeat(np.arange(2 ** vt_syndrome.n), 2 ** vt_syndrome.bits_per_syndrome)
+    syn_outputs_from_rs = np.tile(np.arange(2 ** vt_syndrome.bits_per_syndrome), 2 ** vt_syndrome.n)
+
+    assert (vt_syndrome.syndrome_block(bitmasks) == vt_syndrome._weight_and_syndrome(bitmasks)[1]).all()
+    assert (vt_syndrome.decode_block(bitmasks, syn_outputs_from_rs) ==
+            vt_syndrome._decode_arithmetic(bitmasks, syn_outputs_from_rs)).all()
+
+    decoder = build_decoder(config, tmp_path)
+    z = decoder.vt_decode_to_z(bitmasks, syn_outputs_from_rs)
+    assert (z == decoder._vt_decode_to_z_search(bitmasks, syn_outputs_from_rs)).all()
+    assert set(z.tolist()) - {Z_ERASURE}
+
+
+def test_generate_table_matches_combinations():
+    for n, k, bits_per_syndrome in [(8, 4, 3), (10, 5, 3), (12, 6, 4), (8, 1, 3)]:
+        expected = [[] for _ in range(n)]
+        for ones_positions in itertools.combinations(range(n), k):
+            codeword = tuple(int(i in ones_positions) for i in range(n))
+            syndrome = sum(i * bit for i, bit in enumerate(codeword)) % n
+            if len(expected[syndrome]) < 2 ** bits_per_syndrome:
+                expected[syndrome].append(codeword)
+
+        assert VTSyndromeUtils(n=n, k=k, bits_per_syndrome=bits_per_syndrome).generate_table() == expected
+
+
+def test_generate_table_is_cached_on_disk(tmp_path, monkeypatch):
+    expected = VTSyndromeUtils(n=10, k=4, bits_per_syndrome=3, cache_dir=tmp_path).generate_table()
+    assert (tmp_path / 'vt_table_n10_k4_b3.npz').exists()
+
+    def fail(n, k):
+        raise AssertionError('the table should have been read from the cache')
+
+    monkeypatch.setattr(vt_syndrome_utils, '_tables', {})
+    monkeypatch.setattr(vt_syndrome_utils, 'combination_chunks', fail)
+    assert VTSyndromeUtils(n=10, k=4, bits_per_syndrome=3, cache_dir=tmp_path).generate_table() == expected
+
+
+def test_bits_per_syndrome_follows_the_syndrome_counts():
+    for n, k in [(8, 4), (8, 3), (10, 5), (16, 8)]:
+        expected = [0] * n
+        for ones_positions in itertools.combinations(range(n), k):
+            expected[sum(ones_positions) % n] += 1
+        assert vt_syndrome_utils.syndrome_counts(n=n, k=k) == expected
+    assert [vt_syndrome_utils.max_bits_per_syndrome(n=8, k=k) for k in range(1, 8)] == [0, 1, 2, 3, 2, 1, 0]
+    assert vt_syndrome_utils.max_bits_per_syndrome(n=16, k=8) == 4
+
+
+def test_build_config_rejects_bits_per_z_of_another_vt_code():
+    assert build_config(subset_size=4, bits_per_z=6)['bits_per_syndrome'] == 3
+    with pytest.raises(ValueError):
+        build_config(subset_size=7, bits_per_z=13)
+
+
+def test_combination_chunks_enumerate_the_combinations_in_order():
+    chunks = list(vt_syndrome_utils.combination_chunks(n=9, k=4, chunk_size=10))
+    assert [len(chunk) for chunk in chunks] == [10] * 12 + [6]
+    assert [tuple(row) for row in np.concatenate(chunks).tolist()] == list(itertools.combinations(range(9), 4))
+    for n, k in [(1, 1), (6, 1), (6, 6), (11, 5)]:
+        rows = np.concatenate(list(vt_syndrome_utils.combination_chunks(n=n, k=k, chunk_size=7))).tolist()
+        assert [tuple(row) for row in rows] == list(itertools.combinations(range(n), k))
+
+
+def test_table_of_a_large_n_stops_enumerating_once_full():
+    rows = VTSyndromeUtils(n=32, k=16, bits_per_syndrome=5).table_rows()
+    assert [len(row) for row in rows] == [32] * 32
+    for syndrome, row in enumerate(rows):
+        assert (row.sum(axis=1) == 16).all()
+        assert ((row @ np.arange(32)) % 32 == syndrome).all()